@@ -1,5 +1,7 @@
 import streamlit as st
-import plotly.graph_objects as go
+
+# plotly is imported inside each chart helper: pages that import this module
+# only pay for it when a chart is actually drawn.
 
 def kpi_tiles(total_kg: float, energy_kg: float, travel_kg: float, food_kg: float):
     c1, c2, c3, c4 = st.columns(4)
@@ -9,6 +11,7 @@ def kpi_tiles(total_kg: float, energy_kg: float, travel_kg: float, food_kg: floa
     c4.metric("Food", f"{food_kg:.1f} kg")
 
 def donut_breakdown(d: dict, title: str = ""):
+    import plotly.graph_objects as go
     labels = list(d.keys()); values = [float(v) for v in d.values()]
     fig = go.Figure(data=[go.Pie(labels=labels, values=values, hole=.58)])
     fig.update_traces(
@@ -20,6 +23,7 @@ def donut_breakdown(d: dict, title: str = ""):
     st.plotly_chart(fig, use_container_width=True)
 
 def trend_line(points):
+    import plotly.graph_objects as go
     xs = [p["x"] for p in points]; ys = [p["y"] for p in points]
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=xs, y=ys, mode="lines+markers", name="Monthly CO₂"))
@@ -27,6 +31,7 @@ def trend_line(points):
     st.plotly_chart(fig, use_container_width=True)
 
 def gauge(score: int):
+    import plotly.graph_objects as go
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
         value=score,
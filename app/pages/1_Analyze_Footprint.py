@@ -940,7 +940,11 @@ if st.session_state.get('run_computation', False) and 'form_values' in locals()
 
             
             # Call your backend API
-            r = requests.post(f"{API}/footprint/compute", json=payload, timeout=10)
+            # the profile label lets the backend prefetch the tips page 2 will ask for
+            r = requests.post(
+                f"{API}/footprint/compute", json=payload, timeout=10,
+                params={"profile": st.session_state.get("selected_profile") or "Your Profile"},
+            )
             if r.status_code == 200:
                 result = r.json()
                 # Use our improved scoring if the API returns unrealistic scores
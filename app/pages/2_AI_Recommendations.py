@@ -9,7 +9,9 @@ Notes:
 """
 import os
 import json
+import contextlib
 import random
+import uuid
 import requests
 import html
 import streamlit as st
@@ -36,15 +38,35 @@ for c in CANDIDATES:
         API_BASE_CANDIDATES.append(c)
 
 RECO_ENDPOINTS = ["{base}/reco/generate"]
+RECO_STREAM_ENDPOINTS = ["{base}/reco/generate/stream"]
 CHAT_ENDPOINTS = ["{base}/reco/chat"]
+CHAT_STREAM_ENDPOINTS = ["{base}/reco/chat/stream"]
+SIMILAR_ENDPOINTS = ["{base}/footprint/similar"]
+FEEDBACK_ENDPOINTS = ["{base}/reco/feedback"]
+
+# Per-category streaming only pays off when the backend runs parallel prompts
+# (RECO_PARALLEL_TIPS); otherwise the page asks /reco/generate for the whole list
+PARALLEL_TIPS = os.environ.get("RECO_PARALLEL_TIPS", "").strip().lower() in ("1", "true", "yes", "on")
 
 # Prefer local import (fast path) if backend code is available in same venv/project
 LOCAL_BACKEND_AVAILABLE = False
 _local_generate_tips = None
 _local_generate_chat = None
+_local_stream_chat = None
+_local_tip_events = None
+_local_tip_feedback = None
+_local_record_impressions = None
+_local_deadline = None
 try:
     from backend.services.recommender import generate_tips as _local_generate_tips
+    from backend.services.recommender import iter_tip_events as _local_tip_events
     from backend.services.recommender import generate_chat_response as _local_generate_chat
+    from backend.services.recommender import stream_chat_tokens as _local_stream_chat
+    from backend.services.recommender import record_tip_feedback as _local_tip_feedback
+    from backend.services.recommender import record_impressions as _local_record_impressions
+    from backend.core import deadline as _local_deadline
+    from backend.core.config import settings as _local_settings
+    PARALLEL_TIPS = _local_settings.RECO_PARALLEL_TIPS
     LOCAL_BACKEND_AVAILABLE = True
 except Exception:
     LOCAL_BACKEND_AVAILABLE = False
@@ -52,11 +74,30 @@ except Exception:
 # -----------------------
 # Helpers: call backend or local function
 # -----------------------
+def _client_headers(deadline_s=None):
+    # All Streamlit sessions share one server IP, so identify the browser session
+    # explicitly — the backend rate-limits per client.
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    headers = {"X-Client-Id": st.session_state.client_id}
+    if deadline_s:
+        # the backend stops generating once we would have given up anyway
+        headers["X-Deadline-Ms"] = str(int(deadline_s * 1000))
+    return headers
+
+
+def _deadline_scope(seconds):
+    """Same deadline for the in-process backend path."""
+    return _local_deadline.scope(seconds) if _local_deadline else contextlib.nullcontext()
+
+
 def call_reco_backend(payload, timeout=6):
     # try local
     if LOCAL_BACKEND_AVAILABLE and _local_generate_tips:
         try:
-            tips = _local_generate_tips(payload)
+            with _deadline_scope(timeout):
+                tips = _local_generate_tips(payload)
+                _local_record_impressions(tips if isinstance(tips, list) else [], payload)
             # Normalize local return shapes
             if isinstance(tips, list):
                 return {"success": True, "recommendations": tips, "source": "local (groq)"}
@@ -72,7 +113,7 @@ def call_reco_backend(payload, timeout=6):
         for tmpl in RECO_ENDPOINTS:
             url = tmpl.format(base=base)
             try:
-                r = requests.post(url, json=payload, timeout=timeout)
+                r = requests.post(url, json=payload, headers=_client_headers(timeout), timeout=timeout)
                 if r.status_code == 200:
                     try:
                         j = r.json()
@@ -91,11 +132,79 @@ def call_reco_backend(payload, timeout=6):
     return {"success": False, "error": "No reachable recommendation backend."}
 
 
+def stream_reco_backend(payload, timeout=8):
+    """Yield ``(event, data)`` from /reco/generate/stream: a ``tips`` event per
+    category (highest-impact first) and a final ``done`` with the ranked list.
+
+    Yields nothing if no backend could be reached.
+    """
+    if LOCAL_BACKEND_AVAILABLE and _local_tip_events:
+        try:
+            with _deadline_scope(timeout):
+                yield from _local_tip_events(payload)
+            return
+        except Exception:
+            pass
+
+    for base in API_BASE_CANDIDATES:
+        for tmpl in RECO_STREAM_ENDPOINTS:
+            url = tmpl.format(base=base)
+            try:
+                with requests.post(url, json=payload, headers=_client_headers(timeout), timeout=timeout, stream=True) as r:
+                    if r.status_code != 200:
+                        continue
+                    event = "message"
+                    for line in r.iter_lines(decode_unicode=True):
+                        if line and line.startswith("event: "):
+                            event = line[7:]
+                        elif line and line.startswith("data: "):
+                            yield event, json.loads(line[6:])
+                            event = "message"
+                    return
+            except Exception:
+                continue
+
+
+def fetch_similar_households(totals, timeout=2):
+    """ "Households like you" summary from /footprint/similar, or None."""
+    body = {k: float(totals.get(k, 0) or 0) for k in ("total", "energy", "travel", "food", "goods")}
+    for base in API_BASE_CANDIDATES:
+        for tmpl in SIMILAR_ENDPOINTS:
+            try:
+                r = requests.post(tmpl.format(base=base), json=body, timeout=timeout)
+                if r.status_code == 200 and r.json().get("k"):
+                    return r.json()
+            except Exception:
+                continue
+    return None
+
+
+def send_tip_feedback(rec, checkbox_key, totals, timeout=2):
+    """Checkbox callback: tell the backend a tip was (un)marked as done."""
+    body = {k: float(totals.get(k, 0) or 0) for k in ("total", "energy", "travel", "food", "goods")}
+    body.update(tip_id=rec.get("id"), title=rec.get("title"), done=bool(st.session_state.get(checkbox_key)))
+    if LOCAL_BACKEND_AVAILABLE and _local_tip_feedback:
+        try:
+            _local_tip_feedback(body)
+            return
+        except Exception:
+            pass
+    for base in API_BASE_CANDIDATES:
+        for tmpl in FEEDBACK_ENDPOINTS:
+            try:
+                r = requests.post(tmpl.format(base=base), json=body, headers=_client_headers(), timeout=timeout)
+                if r.status_code == 200:
+                    return
+            except Exception:
+                continue
+
+
 def call_chat_backend(payload, timeout=8):
     # try local
     if LOCAL_BACKEND_AVAILABLE and _local_generate_chat:
         try:
-            resp = _local_generate_chat(payload)
+            with _deadline_scope(timeout):
+                resp = _local_generate_chat(payload)
             if isinstance(resp, dict):
                 text = resp.get("response") or resp.get("reply") or str(resp)
             else:
@@ -108,7 +217,7 @@ def call_chat_backend(payload, timeout=8):
         for tmpl in CHAT_ENDPOINTS:
             url = tmpl.format(base=base)
             try:
-                r = requests.post(url, json=payload, timeout=timeout)
+                r = requests.post(url, json=payload, headers=_client_headers(timeout), timeout=timeout)
                 if r.status_code == 200:
                     try:
                         j = r.json()
@@ -122,6 +231,37 @@ def call_chat_backend(payload, timeout=8):
     return {"success": False, "error": "No reachable chat backend."}
 
 
+def stream_chat_backend(payload, timeout=8):
+    """Yield answer fragments as they are generated (SSE from /reco/chat/stream).
+
+    Yields nothing if no backend could be reached, so callers can fall back
+    to call_chat_backend().
+    """
+    if LOCAL_BACKEND_AVAILABLE and _local_stream_chat:
+        try:
+            with _deadline_scope(timeout):
+                yield from _local_stream_chat(payload)
+            return
+        except Exception:
+            pass
+
+    for base in API_BASE_CANDIDATES:
+        for tmpl in CHAT_STREAM_ENDPOINTS:
+            url = tmpl.format(base=base)
+            try:
+                with requests.post(url, json=payload, headers=_client_headers(timeout), timeout=timeout, stream=True) as r:
+                    if r.status_code != 200:
+                        continue
+                    for line in r.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data: "):
+                            token = json.loads(line[6:]).get("token")
+                            if token:
+                                yield token
+                    return
+            except Exception:
+                continue
+
+
 # -----------------------
 # Small helper to compute totals from a custom profile dictionary
 # Mirrors the calculation approach used in Analyzer (lightweight)
@@ -288,6 +428,28 @@ with c3:
 with c4:
     st.metric("Profile", profile)
 
+# -----------------------
+# Households like you (nearest stored runs)
+# -----------------------
+similar = result.get("similar") if isinstance(result, dict) else None
+if not similar and totals.get("total", 0) > 0:
+    similar_key = json.dumps(totals, sort_keys=True, default=str)
+    if st.session_state.get("similar_key") != similar_key:
+        st.session_state.similar_key = similar_key
+        st.session_state.similar = fetch_similar_households(totals)
+    similar = st.session_state.get("similar")
+if similar and similar.get("k"):
+    s1, s2, s3 = st.columns(3)
+    with s1:
+        st.metric(f"Similar households ({similar['k']})", f"{similar['median_total_kg']} kg/month")
+    with s2:
+        st.metric("You could save", f"{similar['savings_kg_month']} kg/month")
+    with s3:
+        st.metric("Of them emit less than you", f"{round(similar.get('share_emitting_less', 0) * 100)}%")
+    gaps = {k: v for k, v in (similar.get("savings_by_category") or {}).items() if v > 0}
+    if gaps:
+        st.caption("Households like you emit less in: " + ", ".join(f"{k.title()} (−{v} kg)" for k, v in sorted(gaps.items(), key=lambda kv: -kv[1])))
+
 st.markdown("---")
 
 # -----------------------
@@ -336,7 +498,22 @@ if "ai_recommendations" not in st.session_state:
         "score": score,
         "profile": profile
     }
-    resp = call_reco_backend(payload)
+    resp, partial = None, []
+    if PARALLEL_TIPS:
+        # Show each category's tips as soon as it is generated (highest-impact first)
+        preview = st.empty()
+        for event, data in stream_reco_backend(payload):
+            if event == "tips":
+                partial += data.get("tips") or []
+                preview.markdown("⏳ Generating recommendations…\n\n" + "\n".join(
+                    f"- **{html.escape(str(t.get('category', 'General')))}** — {html.escape(str(t.get('title', '')))}"
+                    for t in partial
+                ))
+            elif event == "done":
+                resp = {"success": True, "recommendations": data.get("tips") or partial, "source": data.get("source")}
+        preview.empty()
+    if resp is None:
+        resp = {"success": True, "recommendations": partial} if partial else call_reco_backend(payload)
     if resp.get("success"):
         raw = resp.get("recommendations") or []
         normalized = []
@@ -482,7 +659,10 @@ for rec in reco_list:
         st.markdown("<div style='color:var(--muted);margin-top:6px'>Mark this as implemented to track progress.</div>", unsafe_allow_html=True)
     with action_cols[1]:
         # Use st.checkbox with key -> Streamlit will keep state in st.session_state[checkbox_key]
-        checked_val = st.checkbox("Done", value=st.session_state.get(checkbox_key, False), key=checkbox_key)
+        checked_val = st.checkbox(
+            "Done", value=st.session_state.get(checkbox_key, False), key=checkbox_key,
+            on_change=send_tip_feedback, args=(rec, checkbox_key, totals),
+        )
 
     # close card container
     st.markdown("</div>", unsafe_allow_html=True)
@@ -581,6 +761,9 @@ st.markdown("""
 
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+# The backend keeps the transcript; we only send this id (chat_history is for display)
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = uuid.uuid4().hex
 
 
 for m in st.session_state.chat_history:
@@ -619,18 +802,26 @@ if send and user_input.strip():
         "profile": profile,
         "breakdown": breakdown,
         "score": score,
-        "chat_history": st.session_state.chat_history,
+        "conversation_id": st.session_state.conversation_id,
     }
 
-    chat_resp = call_chat_backend(chat_payload)
-    if chat_resp.get("success"):
-        assistant_text = chat_resp.get("response") or "No response returned by AI backend."
-    else:
-        # If AI fails, give a helpful fallback using computed totals if available
-        assistant_text = (
-            f"I couldn't reach the AI backend right now. Based on your Analyzer, start with reducing "
-            f"{(highest_category or 'your main source')}. Example: {reco_list[0]['title'] if reco_list else 'Start with a home energy audit.'}"
-        )
+    # Render the answer token by token while it is being generated
+    placeholder = st.empty()
+    assistant_text = ""
+    for token in stream_chat_backend(chat_payload):
+        assistant_text += token
+        placeholder.markdown(f"<div class='chat-assistant'>{html.escape(assistant_text)}</div>", unsafe_allow_html=True)
+
+    if not assistant_text:
+        chat_resp = call_chat_backend(chat_payload)
+        if chat_resp.get("success"):
+            assistant_text = chat_resp.get("response") or "No response returned by AI backend."
+        else:
+            # If AI fails, give a helpful fallback using computed totals if available
+            assistant_text = (
+                f"I couldn't reach the AI backend right now. Based on your Analyzer, start with reducing "
+                f"{(highest_category or 'your main source')}. Example: {reco_list[0]['title'] if reco_list else 'Start with a home energy audit.'}"
+            )
 
     st.session_state.chat_history.append({"role": "assistant", "content": assistant_text})
 
@@ -648,6 +839,7 @@ with cols[0]:
 with cols[1]:
     if st.button("Clear Chat"):
         st.session_state.chat_history = []
+        st.session_state.conversation_id = uuid.uuid4().hex
         st.rerun()
 with cols[2]:
     st.markdown("Model: llama-3.1-8b-instant (Groq)")
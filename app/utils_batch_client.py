@@ -0,0 +1,94 @@
+"""
+Client helpers for the columnar batch endpoints (/footprint/compute/batch,
+/footprint/export).
+
+Responses are requested as Arrow or MessagePack when the library is
+installed and decoded straight into NumPy arrays; JSON is the fallback.
+"""
+import json
+
+import numpy as np
+import requests
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+
+def default_accept() -> str:
+    if pa is not None:
+        return f"{ARROW}, {MSGPACK};q=0.9, {JSON};q=0.5"
+    if msgpack is not None:
+        return f"{MSGPACK}, {JSON};q=0.5"
+    return JSON
+
+
+def decode_columns(content_type: str, body: bytes) -> dict:
+    """Decode a columnar response body into ``{name: np.ndarray}``."""
+    content_type = (content_type or JSON).split(";")[0].strip().lower()
+
+    if content_type == ARROW:
+        table = pa.ipc.open_stream(body).read_all()
+        out = {}
+        for name in table.column_names:
+            col = table.column(name)
+            if col.num_chunks == 1:
+                # numeric columns come back as a view over the IPC buffer
+                out[name] = col.chunk(0).to_numpy(zero_copy_only=False)
+            else:
+                out[name] = col.to_numpy()
+        return out
+
+    if content_type == MSGPACK:
+        data = msgpack.unpackb(body, raw=False)
+        out = {}
+        for name, col in data["columns"].items():
+            if col["dtype"] == "object":
+                out[name] = np.asarray(col["data"], dtype=object)
+            else:
+                out[name] = np.frombuffer(col["data"], dtype=np.dtype(col["dtype"]))
+        return out
+
+    data = json.loads(body)
+    return {name: np.asarray(values) for name, values in data["columns"].items()}
+
+
+def compute_batch(base_url: str, rows, timeout: float = 30) -> dict:
+    """POST rows (list of LifestyleInput-like dicts) and return result columns."""
+    if msgpack is not None:
+        body = msgpack.packb({"rows": list(rows)}, use_bin_type=True)
+        content_type = MSGPACK
+    else:
+        body = json.dumps({"rows": list(rows)})
+        content_type = JSON
+
+    r = requests.post(
+        f"{base_url.rstrip('/')}/footprint/compute/batch",
+        data=body,
+        headers={"Content-Type": content_type, "Accept": default_accept()},
+        timeout=timeout,
+    )
+    r.raise_for_status()
+    return decode_columns(r.headers.get("content-type"), r.content)
+
+
+def export_runs(base_url: str, limit: int = 100_000, timeout: float = 30) -> dict:
+    """Fetch stored footprint runs as columns."""
+    r = requests.get(
+        f"{base_url.rstrip('/')}/footprint/export",
+        params={"limit": limit},
+        headers={"Accept": default_accept()},
+        timeout=timeout,
+    )
+    r.raise_for_status()
+    return decode_columns(r.headers.get("content-type"), r.content)
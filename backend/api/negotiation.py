@@ -0,0 +1,212 @@
+# backend/api/negotiation.py
+"""
+Content negotiation for the columnar (batch) endpoints.
+
+Batch results are float-heavy columns, so besides JSON we can answer with
+MessagePack (raw little-endian buffers per column) or an Arrow IPC stream
+built directly on top of the NumPy buffers. Both encoders are optional:
+if the library is not installed the media type is simply not offered.
+"""
+import importlib
+import importlib.util
+import json
+from functools import lru_cache
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+
+# -----------------------------
+# Optional encoders (imported on first use; pyarrow alone costs ~100 ms)
+# -----------------------------
+@lru_cache(maxsize=None)
+def _optional(module: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def available_media_types():
+    types = [JSON]
+    if _installed("msgpack"):
+        types.append(MSGPACK)
+    if _installed("pyarrow"):
+        types.append(ARROW)
+    return types
+
+
+# -----------------------------
+# Accept header parsing
+# -----------------------------
+def _parse_accept(header: str):
+    prefs = []
+    for i, part in enumerate(header.split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        media = fields[0].lower()
+        if not media:
+            continue
+        q = 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        prefs.append((q, -i, media))
+    # highest q first, then original order
+    prefs.sort(reverse=True)
+    return [(media, q) for q, _, media in prefs]
+
+
+def negotiate(request: Request) -> str:
+    """Pick the best supported response media type (JSON if nothing matches)."""
+    header = request.headers.get("accept", "")
+    supported = available_media_types()
+    for media, q in _parse_accept(header):
+        if q <= 0:
+            continue
+        if media in supported:
+            return media
+        if media in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+# -----------------------------
+# Response encoding
+# -----------------------------
+def _to_arrow(columns: dict):
+    import numpy as np
+    pa = _optional("pyarrow")
+
+    arrays, names = [], []
+    for name, col in columns.items():
+        col = np.ascontiguousarray(col)
+        if col.dtype.kind in "fiu":
+            # wrap the NumPy buffer as-is; no per-element conversion or copy
+            arr = pa.Array.from_buffers(pa.from_numpy_dtype(col.dtype), len(col), [None, pa.py_buffer(col)])
+        elif col.dtype.kind == "b":
+            # Arrow bools are bit-packed, NumPy's are one byte each
+            arr = pa.array(col)
+        else:
+            arr = pa.array(col.tolist())
+        arrays.append(arr)
+        names.append(name)
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
+
+
+def _to_msgpack(columns: dict) -> bytes:
+    import numpy as np
+    msgpack = _optional("msgpack")
+
+    packed = {}
+    for name, col in columns.items():
+        col = np.asarray(col)
+        if col.dtype.kind in "fiub":
+            col = np.ascontiguousarray(col, dtype=col.dtype.newbyteorder("<"))
+            packed[name] = {"dtype": col.dtype.str, "data": col.tobytes()}
+        else:
+            packed[name] = {"dtype": "object", "data": col.tolist()}
+    n = len(next(iter(columns.values()))) if columns else 0
+    return msgpack.packb({"rows": n, "columns": packed}, use_bin_type=True)
+
+
+def columnar_response(columns: dict, request: Request) -> Response:
+    """Encode ``{name: ndarray}`` in whatever format the client asked for."""
+    import numpy as np
+
+    media = negotiate(request)
+    if media == ARROW:
+        return Response(content=_to_arrow(columns).to_pybytes(), media_type=ARROW)
+    if media == MSGPACK:
+        return Response(content=_to_msgpack(columns), media_type=MSGPACK)
+
+    n = len(next(iter(columns.values()))) if columns else 0
+    body = {"rows": n, "columns": {name: np.asarray(col).tolist() for name, col in columns.items()}}
+    return Response(content=json.dumps(body), media_type=JSON)
+
+
+# -----------------------------
+# Request decoding
+# -----------------------------
+def _rows_to_columns(rows):
+    keys = []
+    for row in rows:
+        keys += [k for k in row if k not in keys]
+    # missing values default like the scalar calculator does
+    return {
+        k: [row.get(k, "mixed" if k == "diet" else 0) for row in rows]
+        for k in keys
+    }
+
+
+async def read_columns(request: Request) -> dict:
+    """Decode a batch request body (JSON / MessagePack / Arrow) into columns.
+
+    Row-oriented (``[{...}, ...]`` or ``{"rows": [...]}``) and column-oriented
+    (``{"columns": {...}}``) payloads are both accepted.
+    """
+    import numpy as np
+
+    content_type = request.headers.get("content-type", JSON).split(";")[0].strip().lower()
+    body = await request.body()
+    pa = _optional("pyarrow") if content_type == ARROW else None
+    msgpack = _optional("msgpack") if content_type == MSGPACK else None
+
+    try:
+        if content_type == ARROW:
+            if pa is None:
+                raise HTTPException(status_code=415, detail="Arrow support is not installed")
+            table = pa.ipc.open_stream(body).read_all()
+            return {name: table.column(name).to_numpy() for name in table.column_names}
+
+        if content_type == MSGPACK:
+            if msgpack is None:
+                raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+            data = msgpack.unpackb(body, raw=False)
+        else:
+            data = json.loads(body or b"[]")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode batch body: {e}")
+
+    if isinstance(data, dict) and "columns" in data:
+        if not isinstance(data["columns"], dict):
+            raise HTTPException(status_code=400, detail="columns must be an object")
+        columns = {}
+        for name, col in data["columns"].items():
+            if isinstance(col, dict) and "data" in col:
+                if col.get("dtype") == "object":
+                    columns[name] = col["data"]
+                else:
+                    try:
+                        dtype = np.dtype(col.get("dtype"))
+                        if dtype.kind not in "biuf":
+                            raise ValueError(f"unsupported dtype {dtype}")
+                        columns[name] = np.frombuffer(col["data"], dtype=dtype)
+                    except (TypeError, ValueError) as e:
+                        raise HTTPException(status_code=400, detail=f"Bad column {name!r}: {e}")
+            else:
+                columns[name] = col
+        return columns
+    if isinstance(data, dict) and "rows" in data:
+        data = data["rows"]
+    if isinstance(data, list):
+        return _rows_to_columns([r for r in data if isinstance(r, dict)])
+
+    raise HTTPException(status_code=400, detail="Batch body must be a list of rows or a columns object")
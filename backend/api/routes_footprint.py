@@ -1,23 +1,37 @@
-from fastapi import APIRouter, Depends   # ✅ Must be first before using router
+from fastapi import APIRouter, Depends, HTTPException, Query, Request   # ✅ Must be first before using router
 from sqlalchemy.orm import Session
 
 from backend.core.schemas import LifestyleInput, FootprintResult, FootprintTotals, TrendPoint
 from backend.db.session import get_db
 from backend.db import models
 from backend.services.calculator import compute_footprint as compute_totals
+from backend.services.calculator import compute_footprint_batch
+from backend.services.benchmark import compare_to_benchmark
 from backend.services.scoring import green_score as score_from_total
+from backend.services.scoring import green_score_batch
 from backend.services.forecasting import naive_forecast_series as forecast_series
 from backend.db.models import Leaderboard
+from backend.api.negotiation import columnar_response, read_columns
+from backend.core.config import settings
+from backend.services.neighbours import neighbours
+from backend.services.recommender import prefetch_tips
+import calendar
+import datetime
+import logging
 import random
 
+log = logging.getLogger(__name__)
+
 # ✅ You must define the router right after import
 router = APIRouter(prefix="/footprint", tags=["Footprint"])
 
 @router.post("/compute", response_model=FootprintResult)
-def compute_footprint(payload: LifestyleInput, db: Session = Depends(get_db)):
+def compute_footprint(payload: LifestyleInput, profile: str = None, db: Session = Depends(get_db)):
+    """``profile`` (query) is the label page 2 will send, so the speculative
+    tips generation below matches its /reco/generate request."""
     totals = compute_totals(payload.model_dump())
     score = score_from_total(totals["total"])
-    trend = forecast_series(totals["total"])
+    trend = _trend_points(forecast_series(totals["total"]))
 
     # Save run for leaderboard
     run = models.FootprintRun(
@@ -41,10 +55,102 @@ def compute_footprint(payload: LifestyleInput, db: Session = Depends(get_db)):
     db.add(entry)
 
     db.commit()
+    similar = _similar(totals, exclude=run.id)
+    neighbours.add(run.id, totals)
+    try:
+        # the user is about to open AI Recommendations: start on the tips now
+        prefetch_tips({**totals, "profile": profile or "your lifestyle"})
+    except Exception as e:
+        log.warning("tip prefetch failed", extra={"error": str(e)})
 
     # ✅ MUST RETURN FOOTPRINT DATA (otherwise leaderboard breaks)
     return {
+        "inputs": payload,
         "totals": totals,
         "score": score,
-        "trend": trend
+        "trend": trend,
+        "similar": similar,
+        "benchmark": _benchmark(totals),
     }
+
+
+def _trend_points(values):
+    # forecast values are one per month, starting with the current month
+    month = datetime.date.today().month
+    return [{"x": calendar.month_abbr[(month - 1 + i) % 12 + 1], "y": y} for i, y in enumerate(values)]
+
+
+def _similar(totals: dict, exclude: int = None):
+    if not settings.NN_ENABLED:
+        return None
+    try:
+        return neighbours.similar(totals, exclude=exclude)
+    except Exception as e:
+        # the comparison is a nice-to-have; never fail the compute call over it
+        log.warning("similar-households lookup failed", extra={"error": str(e)})
+        return None
+
+
+def _benchmark(totals: dict):
+    try:
+        return compare_to_benchmark(totals["total"], totals)
+    except Exception as e:
+        log.warning("benchmark comparison failed", extra={"error": str(e)})
+        return None
+
+
+# ---------------------------------------------------
+# "Households like you" for arbitrary totals
+# ---------------------------------------------------
+@router.post("/similar")
+def similar_households(totals: FootprintTotals, k: int = 0):
+    result = neighbours.similar(totals.model_dump(), k or None)
+    return result or {"k": 0}
+
+
+# ---------------------------------------------------
+# Batch compute (columnar; JSON / MessagePack / Arrow)
+# ---------------------------------------------------
+@router.post("/compute/batch")
+async def compute_footprint_batch_route(request: Request):
+    columns = await read_columns(request)
+    try:
+        totals = compute_footprint_batch(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    totals["score"] = green_score_batch(totals["total"])
+    return columnar_response(totals, request)
+
+
+# ---------------------------------------------------
+# Export stored runs (columnar)
+# ---------------------------------------------------
+EXPORT_MAX_ROWS = 100_000
+
+
+@router.get("/export")
+def export_runs(request: Request, limit: int = Query(EXPORT_MAX_ROWS, ge=1, le=EXPORT_MAX_ROWS), db: Session = Depends(get_db)):
+    import numpy as np
+
+    rows = (
+        db.query(
+            models.FootprintRun.id,
+            models.FootprintRun.total_kg,
+            models.FootprintRun.energy_kg,
+            models.FootprintRun.travel_kg,
+            models.FootprintRun.food_kg,
+            models.FootprintRun.goods_kg,
+            models.FootprintRun.score,
+        )
+        .order_by(models.FootprintRun.id.desc())
+        .limit(limit)
+        .all()
+    )
+    names = ("id", "total", "energy", "travel", "food", "goods", "score")
+    if rows:
+        data = np.array([tuple(0 if v is None else v for v in r) for r in rows], dtype=np.float64)
+    else:
+        data = np.empty((0, len(names)), dtype=np.float64)
+    columns = {name: np.ascontiguousarray(data[:, i]) for i, name in enumerate(names)}
+    columns["id"] = columns["id"].astype(np.int64)
+    return columnar_response(columns, request)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from backend.core.config import settings
+from backend.services.warmup import is_ready, readiness_report
+
+router = APIRouter(tags=["Health"])
+
+
+# ---------------------------------------------------
+# Liveness: the process is up and serving
+# ---------------------------------------------------
+@router.get(f"{settings.API_PREFIX}/health")
+def health():
+    return {"status": "ok"}
+
+
+# ---------------------------------------------------
+# Readiness: warm-up finished, safe to route traffic here
+# ---------------------------------------------------
+@router.get("/ready")
+def ready():
+    report = readiness_report()
+    return JSONResponse(status_code=200 if is_ready() else 503, content=report)
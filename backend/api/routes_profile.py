@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from backend.api.negotiation import columnar_response, read_columns
+from backend.services.calculator import batch_length, compute_footprint_batch, numeric_column
+from backend.services.profile_clf import AXES, get_classifier
+
+router = APIRouter(prefix="/profile", tags=["Profile"])
+
+
+# ---------------------------------------------------
+# Household-profile classification (columnar; JSON / MessagePack / Arrow)
+# ---------------------------------------------------
+@router.post("/classify")
+async def classify_profiles(request: Request):
+    """Classify a batch of footprints.
+
+    Rows may carry category totals (energy, travel, food, goods) or the raw
+    calculator inputs (electricityKwh, carKm, ...), which are converted first.
+    """
+    import numpy as np
+
+    clf = get_classifier()
+    if clf is None:
+        raise HTTPException(status_code=503, detail="Profile classifier has not been trained")
+    columns = await read_columns(request)
+    try:
+        if not any(a in columns for a in AXES):
+            columns = compute_footprint_batch(columns)
+        n = batch_length(columns)
+        totals = {a: numeric_column(columns, a, n) for a in AXES}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    idx, confidence = clf.predict_batch(totals)
+    labels = np.asarray(clf.labels, dtype=object)
+    peer_avg = np.array([clf.peer_avg.get(label, np.nan) for label in clf.labels])[idx]
+    total = sum(totals.values())
+    return columnar_response({
+        "profile_id": idx.astype(np.int32),
+        "profile": labels[idx],
+        "confidence": np.round(confidence, 3),
+        "peer_avg_kg_month": peer_avg,
+        "delta_pct_vs_peers": np.round((total - peer_avg) / peer_avg * 100, 1),
+    }, request)
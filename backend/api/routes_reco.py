@@ -1,51 +1,296 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from backend.services.recommender import (
+    category_order,
+    category_tips,
+    merge_tip_groups,
+    store_tips,
+    totals_from_payload,
+    enrich_in_background,
     generate_tips,
-    generate_chat_response
+    instant_tips,
+    stored_tips,
+    aprefetched_tips,
+    recommend_actions,
+    record_impressions,
+    record_tip_feedback,
+    tips_prompt_key,
+    generate_chat_response,
+    faq_chat_answer,
+    astream_chat_tokens,
+    fallback_tips_for,
+    fallback_chat_for,
+    llm,
+    tip_batcher,
 )
+from backend.services.bandit import get_bandit
+from backend.services.conversations import new_conversation_id
+from backend.services.faq_router import router as faq_router
+from backend.services.llm_gateway import gateway, PRIORITY_CHAT, PRIORITY_TIPS
+from backend.services.llm_ledger import ledger
+from backend.services.neighbours import neighbours
+from backend.services.prefetch import prefetcher
+from backend.services.tip_corpus import corpus
+from backend.services.reco_cache import cache as reco_cache
+from backend.services.singleflight import flights
+from backend.core import deadline
+from backend.core.config import settings
 from backend.core.schemas import TipsResponse
+from backend.core.security import rate_limit
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/reco", tags=["Recommendations"])
 
 # ---------------------------------------------------
 # Recommendation API
 # ---------------------------------------------------
-@router.post("/generate", response_model=TipsResponse)
-def generate_recommendations(inputs: dict):
+@router.post("/generate", response_model=TipsResponse, dependencies=[Depends(rate_limit("tips"))])
+async def generate_recommendations(inputs: dict):
     try:
-        tips = generate_tips(inputs)
-
-        if not isinstance(tips, list):
-            raise ValueError("AI returned non-list")
-
-        tips = [t for t in tips if isinstance(t, dict)]
-
-        return TipsResponse(tips=tips)
+        tips, source = await _generate(inputs)
+        return TipsResponse(tips=tips, source=source)
 
     except Exception as e:
-        print("Error in /reco/generate:", e)
+        log.exception("/reco/generate failed")
         raise HTTPException(
             status_code=500,
             detail=f"AI recommendation error: {str(e)}"
         )
 
 
+async def _generate(inputs: dict):
+    """``(tips, source)`` for /reco/generate (and the non-parallel stream)."""
+    # cache, offline grid, then the corpus of earlier generations; only
+    # misses queue for the LLM. SQLite lookups stay off the event loop.
+    tips, source = await asyncio.to_thread(stored_tips, inputs)
+    if not tips:
+        prompt_key = tips_prompt_key(inputs)
+        # started by /footprint/compute; waits for it while it is running
+        tips, source = await aprefetched_tips(inputs, prompt_key), "prefetch"
+    if not tips and settings.RECO_RULES_FAST_PATH:
+        # instant answer from the compiled rules; LLM output lands in the cache later
+        tips, source = await asyncio.to_thread(recommend_actions, inputs), "rules"
+        if settings.RECO_LLM_ENRICHMENT:
+            enrich_in_background(inputs)
+    if not tips and not llm.available():
+        # every provider's breaker is open: answer now instead of queueing for a failure
+        tips, source = await asyncio.to_thread(recommend_actions, inputs) or fallback_tips_for(inputs), "rules"
+    if not tips and settings.RECO_MICROBATCH_ENABLED:
+        source = "llm"
+        # joins the current batch window; one gateway job serves the whole batch.
+        # A user the batch missed (None) goes on to its own gateway call below.
+        try:
+            tips = await flights.ado(
+                "route-batch:" + prompt_key,
+                tip_batcher.acall,
+                inputs,
+                timeout=settings.LLM_QUEUE_DEADLINE_S + settings.RECO_MICROBATCH_TIMEOUT_S,
+                fallback=lambda: fallback_tips_for(inputs),
+            )
+        except Exception as e:
+            log.warning("tips micro-batch failed", extra={"error": str(e)})
+            tips = None
+    if not tips:
+        source = "llm"
+        # identical in-flight prompts wait here instead of each taking a gateway
+        # slot; the shared call runs without this request's deadline
+        try:
+            tips = await flights.ado(
+                "route-tips:" + prompt_key,
+                gateway.acall,
+                generate_tips, inputs,
+                cache_checked=True,
+                priority=PRIORITY_TIPS,
+                fallback=lambda: fallback_tips_for(inputs),
+            )
+        except deadline.DeadlineExceeded:
+            tips, source = fallback_tips_for(inputs), "fallback"
+
+    if not isinstance(tips, list):
+        raise ValueError("AI returned non-list")
+
+    tips = [t for t in tips if isinstance(t, dict)]
+    await asyncio.to_thread(record_impressions, tips, inputs)
+    return tips, source
+
+
+@router.post("/generate/stream", dependencies=[Depends(rate_limit("tips"))])
+async def generate_recommendations_stream(inputs: dict, request: Request):
+    """Per-category tips over SSE: one ``tips`` event per category (the
+    highest-impact one first), then ``done`` with the merged, ranked list.
+    With ``RECO_PARALLEL_TIPS`` off only ``done`` is sent."""
+    async def events():
+        if not settings.RECO_PARALLEL_TIPS:
+            # per-category prompts are off: one whole-list answer, as /reco/generate gives
+            try:
+                tips, source = await _generate(inputs)
+            except Exception:
+                log.exception("/reco/generate/stream failed")
+                tips, source = fallback_tips_for(inputs), "fallback"
+            yield _sse({"tips": tips, "source": source}, event="done")
+            return
+
+        tips, source = await asyncio.to_thread(instant_tips, inputs)
+        if not tips:
+            tips, source = await aprefetched_tips(inputs), "prefetch"
+        if tips:
+            await asyncio.to_thread(record_impressions, tips, inputs)
+            yield _sse({"tips": tips, "source": source}, event="done")
+            return
+
+        totals = totals_from_payload(inputs)
+        profile = inputs.get("profile", "your lifestyle")
+        order = category_order(totals)
+
+        async def one(category):
+            # a full queue, a passed deadline or a failed job leaves the group
+            # empty; the done event still merges whatever did arrive
+            try:
+                tips = await gateway.acall(category_tips, totals, profile, category, priority=PRIORITY_TIPS, fallback=list)
+            except Exception as e:
+                log.warning("category tips failed", extra={"category": category, "error": str(e)})
+                tips = []
+            return category, tips
+
+        tasks = [asyncio.ensure_future(one(c)) for c in order]
+        groups = {}
+        try:
+            # the highest-impact category is always sent first
+            for fut in [tasks[0], *asyncio.as_completed(tasks[1:])]:
+                category, tips = await fut
+                groups[category] = tips or []
+                if await request.is_disconnected():
+                    return
+                yield _sse({"category": category, "tips": tips or []}, event="tips")
+        finally:
+            for t in tasks:
+                t.cancel()  # still-queued gateway jobs are dropped
+
+        merged = merge_tip_groups(groups, order[0])
+        if merged:
+            store_tips(inputs, merged)
+            yield _sse({"tips": merged, "source": "llm"}, event="done")
+        else:
+            yield _sse({"tips": fallback_tips_for(inputs), "source": "fallback"}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------
+# Feedback API
+# ---------------------------------------------------
+@router.post("/feedback", dependencies=[Depends(rate_limit("feedback"))])
+def tip_feedback(payload: dict):
+    """Page 2's "Done" checkbox: ``{tip_id, title, done, <totals>}``. Feeds the
+    bandit that orders rules / corpus tips for similar households; ticks on
+    other tips are accepted and ignored (``tip`` is null)."""
+    if not payload.get("tip_id") and not payload.get("title"):
+        raise HTTPException(status_code=422, detail="tip_id or title is required")
+    return {"tip": record_tip_feedback(payload), "done": bool(payload.get("done", True))}
+
+
+@router.get("/cache/stats")
+def recommendation_cache_stats():
+    return reco_cache.stats()
+
+
+@router.get("/stats")
+def recommendation_stats():
+    return {
+        "cache": reco_cache.stats(),
+        "singleflight": flights.stats(),
+        "gateway": gateway.stats(),
+        "llm": llm.stats(),
+        "microbatch": tip_batcher.stats(),
+        "neighbours": neighbours.stats(),
+        "corpus": corpus.stats(),
+        "faq": faq_router.stats(),
+        "bandit": get_bandit().stats(),
+        "prefetch": prefetcher.stats(),
+        "deadline": deadline.stats(),
+    }
+
+
+@router.get("/llm/usage")
+def llm_usage(hours: int = 24):
+    """Per-hour LLM calls, tokens, estimated cost and latency percentiles."""
+    return ledger.usage(max(1, min(hours, 48)))
+
+
 # ---------------------------------------------------
 # Chat API
 # ---------------------------------------------------
-@router.post("/chat")
-def chat_with_ai(payload: dict):
+def _with_conversation(payload: dict) -> dict:
+    # New clients that send no transcript get a server-side conversation;
+    # legacy clients that still send chat_history keep working unchanged.
+    if not payload.get("conversation_id") and not payload.get("chat_history"):
+        payload = dict(payload, conversation_id=new_conversation_id())
+    return payload
+
+
+@router.post("/chat", dependencies=[Depends(rate_limit("chat"))])
+async def chat_with_ai(payload: dict):
     try:
-        response = generate_chat_response(payload)
+        payload = _with_conversation(payload)
+        # common questions are answered from templates without a gateway slot
+        response, source = await asyncio.to_thread(faq_chat_answer, payload), "faq"
+        if not response:
+            source = "llm"
+            response = await gateway.acall(
+                generate_chat_response, payload,
+                faq_checked=True,
+                priority=PRIORITY_CHAT,
+                fallback=lambda: fallback_chat_for(payload),
+            )
 
         if not isinstance(response, str):
             raise ValueError("AI returned invalid chat response")
 
-        return {"response": response}
+        return {"response": response, "conversation_id": payload.get("conversation_id"), "source": source}
 
     except Exception as e:
-        print("Error in /reco/chat:", e)
+        log.exception("/reco/chat failed")
         raise HTTPException(
             status_code=500,
             detail=f"AI chat error: {str(e)}"
         )
+
+
+# ---------------------------------------------------
+# Streaming Chat API (Server-Sent Events)
+# ---------------------------------------------------
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/chat/stream", dependencies=[Depends(rate_limit("chat"))])
+async def chat_stream(payload: dict, request: Request):
+    payload = _with_conversation(payload)
+
+    async def events():
+        tokens = astream_chat_tokens(payload)
+        try:
+            async for token in tokens:
+                if await request.is_disconnected():
+                    break
+                yield _sse({"token": token})
+            yield _sse({"conversation_id": payload.get("conversation_id")}, event="done")
+        finally:
+            # stops the upstream Groq stream if we left early (disconnect/cancel)
+            await tokens.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
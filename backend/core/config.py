@@ -13,6 +13,142 @@ class Settings(BaseSettings):
     # CORS Origins (allow all for now)
     CORS_ORIGINS: str = "*"
 
+    # Logging: JSON lines via a queue listener (backend/core/log.py)
+    LOG_CONFIG_PATH: str = "config/logging.conf"
+    # Fraction of LLM calls whose raw output is logged at DEBUG (0 = never)
+    LOG_RAW_LLM_SAMPLE_RATE: float = 0.0
+
+    # Groq LLM
+    GROQ_API_KEY: str = ""
+    GROQ_MODEL: str = "llama-3.1-8b-instant"
+    # Point at scripts/groq_stub.py (e.g. http://127.0.0.1:8765) for offline runs
+    GROQ_BASE_URL: str = ""
+
+    # Rate limiting for the LLM-backed /reco endpoints (token buckets per client)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_TIPS_PER_MIN: float = 6
+    RATE_LIMIT_TIPS_BURST: int = 3
+    RATE_LIMIT_CHAT_PER_MIN: float = 20
+    RATE_LIMIT_CHAT_BURST: int = 5
+    RATE_LIMIT_FEEDBACK_PER_MIN: float = 60
+    RATE_LIMIT_FEEDBACK_BURST: int = 20
+    # Empty -> in-process buckets; a file path -> shared SQLite store (multi-worker)
+    RATE_LIMIT_SQLITE_PATH: str = ""
+    # Comma-separated peer addresses (e.g. the Streamlit server, a reverse proxy)
+    # whose X-Client-Id / X-Forwarded-For headers are honoured; others are keyed by peer IP
+    RATE_LIMIT_TRUSTED_PROXIES: str = ""
+
+    # LLM gateway: dedicated worker threads + priority queue in front of Groq
+    LLM_MAX_CONCURRENCY: int = 4
+    # Max time a request may wait in the queue before it is answered with a fallback
+    LLM_QUEUE_DEADLINE_S: float = 2.0
+    # Jobs allowed to wait for a worker; further submits are shed at once
+    # (background work may only fill half of it)
+    LLM_MAX_QUEUE: int = 256
+    # Whole-call budget per LLM request (attempts + hedge); below the UI's 6 s timeout
+    LLM_CALL_TIMEOUT_S: float = 5.0
+    # Client deadlines (X-Deadline-Ms, backend/core/deadline.py): capped at
+    # DEADLINE_MAX_S, minus a margin for the response to get back
+    DEADLINE_MAX_S: float = 120.0
+    DEADLINE_MARGIN_S: float = 0.25
+    # With a deadline, max_tokens is cut to what this generation speed fits in
+    # the time left (never below LLM_MIN_MAX_TOKENS); calls with less than
+    # LLM_MIN_CALL_S left are not started
+    LLM_TOKENS_PER_S: float = 250.0
+    LLM_MIN_MAX_TOKENS: int = 64
+    LLM_MIN_CALL_S: float = 0.3
+    # Start a second attempt once the first is slower than the provider's p95
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_MIN_DELAY_S: float = 0.3
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_COOLDOWN_S: float = 30.0
+    # Optional OpenAI/Groq-compatible fallback provider (self-hosted model, stub, …)
+    LLM_SECONDARY_BASE_URL: str = ""
+    LLM_SECONDARY_API_KEY: str = ""
+    LLM_SECONDARY_MODEL: str = ""
+
+    # Append-only ledger of LLM calls (tokens, latency, outcome) -> /reco/llm/usage
+    LLM_LEDGER_ENABLED: bool = True
+    LLM_LEDGER_PATH: str = "./llm_ledger.db"
+    LLM_LEDGER_FLUSH_S: float = 1.0
+    # USD per million tokens, for the cost estimate (llama-3.1-8b-instant list price)
+    LLM_PRICE_INPUT_PER_M: float = 0.05
+    LLM_PRICE_OUTPUT_PER_M: float = 0.08
+
+    # Persistent cache of generated tips, keyed on bucketed totals + profile
+    RECO_CACHE_ENABLED: bool = True
+    RECO_CACHE_PATH: str = "./reco_cache.db"
+    RECO_CACHE_BUCKET_KG: float = 10
+    RECO_CACHE_TTL_S: float = 24 * 3600
+    RECO_CACHE_MAX_STALE_S: float = 7 * 24 * 3600
+    RECO_CACHE_MAX_ENTRIES: int = 20_000
+
+    # /reco/generate answers from the ai/rules engine instantly; the LLM only
+    # enriches the cache in the background
+    RECO_RULES_FAST_PATH: bool = True
+    # Offline-built tips per footprint grid cell (scripts/build_reco_grid.py)
+    RECO_GRID_PATH: str = "ai/models/reco_grid.npz"
+    RECO_LLM_ENRICHMENT: bool = True
+    # "Households like you" nearest-neighbour index (backend/services/neighbours.py)
+    NN_ENABLED: bool = True
+    NN_K: int = 50
+    # exact | approx | auto (exact up to NN_EXACT_MAX_POINTS rows)
+    NN_MODE: str = "auto"
+    NN_EXACT_MAX_POINTS: int = 1_000_000
+    # Reservoir-sampled cap on indexed runs (bounds memory)
+    NN_MAX_POINTS: int = 5_000_000
+    # approx mode: rows per random-projection-tree leaf, extra leaves probed per query
+    NN_LEAF_SIZE: int = 128
+    NN_PROBES: int = 3
+    NN_REBUILD_S: float = 300
+    # Corpus of every validated LLM tip (backend/services/tip_corpus.py); served
+    # before the LLM when it covers a footprint with at least this many tips
+    RECO_CORPUS_ENABLED: bool = True
+    RECO_CORPUS_PATH: str = "./tip_corpus.db"
+    RECO_CORPUS_MIN_TIPS: int = 4
+    # /footprint/compute starts the tips generation for its run in the
+    # background (backend/services/prefetch.py); LLM calls capped per minute
+    RECO_PREFETCH_ENABLED: bool = True
+    RECO_PREFETCH_PER_MIN: float = 20
+    RECO_PREFETCH_BURST: int = 5
+    RECO_PREFETCH_MAX_PENDING: int = 64
+    RECO_PREFETCH_TTL_S: float = 600
+    # How long /reco/generate waits on a prefetch that is already running
+    # before the rules answer; keep well under the clients' timeouts
+    RECO_PREFETCH_WAIT_S: float = 1.5
+    # Reorder rules/corpus tips by per-segment "Done" feedback
+    # (Thompson sampling, backend/services/bandit.py)
+    RECO_BANDIT_ENABLED: bool = True
+    RECO_BANDIT_PATH: str = "./tip_feedback.db"
+    # Answer common chat questions from ai/faq/intents.yaml templates
+    # (backend/services/faq_router.py) when the intent is at least this likely
+    FAQ_ROUTER_ENABLED: bool = True
+    FAQ_MIN_CONFIDENCE: float = 0.6
+    # Household-profile classifier (scripts/train_profile_clf.py). Labels come
+    # from the rules in profile_clf.label_footprints unless the trained model is
+    # enabled and agrees with them on at least this share of every class
+    PROFILE_CLF_PATH: str = "ai/models/profile_clf.npy"
+    PROFILE_FEATURE_MAP_PATH: str = "ai/models/feature_map.json"
+    PROFILE_CLF_MODEL_ENABLED: bool = False
+    PROFILE_CLF_MIN_AGREEMENT: float = 0.9
+    # Generate tips as one short prompt per category, run concurrently
+    RECO_PARALLEL_TIPS: bool = False
+    # Gather /reco/generate LLM calls for a few ms and send them as one
+    # multi-user prompt (adds at most the window to each call)
+    RECO_MICROBATCH_ENABLED: bool = False
+    RECO_MICROBATCH_WINDOW_MS: float = 15
+    RECO_MICROBATCH_MAX: int = 8
+    # Budget for one batch completion (several users' tips: far more tokens
+    # than a single call); waiters give up after the queue deadline plus this
+    RECO_MICROBATCH_TIMEOUT_S: float = 12.0
+
+    # Server-side chat history: only the newest turns that fit this many
+    # (estimated) tokens are sent; older turns are folded into a rolling summary
+    CHAT_HISTORY_TOKEN_BUDGET: int = 1200
+    CHAT_SUMMARY_MAX_TOKENS: int = 160
+    # Re-summarise once this many messages have fallen out of the window
+    CHAT_SUMMARY_MIN_NEW: int = 4
+
     class Config:
         env_file = ".env"  # Will load values from .env if exists
         extra = "ignore"    # Ignore extra values like CARBONLENS_API to avoid errors
@@ -0,0 +1,142 @@
+# backend/core/deadline.py
+"""
+Request deadlines, propagated from the client to the LLM call.
+
+Clients send how long they are still willing to wait in ``X-Deadline-Ms``
+(relative, so client and server clocks need not agree). DeadlineMiddleware
+turns it into an absolute ``time.monotonic()`` deadline, minus
+``DEADLINE_MARGIN_S`` for the trip back, held in a ContextVar. The value
+follows the request through awaits and ``asyncio.to_thread``; gateway jobs
+and worker pools get it explicitly (``bind``), so every layer can ask for
+``remaining()``:
+
+- the gateway waits at most the remaining time for a slot and drops a job
+  whose deadline passed while it was queued
+- the LLM client uses it as the HTTP timeout and lowers ``max_tokens`` to
+  what can be generated in that time (``LLM_TOKENS_PER_S``)
+- streamed tips stop reading once the deadline passes (and the partial
+  list is dropped, never cached)
+
+Calls shared through single-flight run without a deadline: callers with
+different deadlines share them, so each waiter gives up on its own instead.
+
+Work abandoned because its caller has gone is counted per stage (stats()).
+Background jobs (cache refreshes, prefetches, summaries) carry no deadline.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from backend.core.config import settings
+
+HEADER = "X-Deadline-Ms"
+
+_deadline = ContextVar("deadline", default=None)
+_lock = threading.Lock()
+_stats = {"requests": 0, "abandoned": {}}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The caller's deadline passed before the work could finish."""
+
+
+def current():
+    """Absolute ``time.monotonic()`` deadline of this request, or None."""
+    return _deadline.get()
+
+
+def remaining():
+    """Seconds left until the deadline (may be negative), or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def limit(timeout):
+    """``timeout`` capped by the time left (never negative)."""
+    left = remaining()
+    if left is None:
+        return timeout
+    left = max(0.0, left)
+    return left if timeout is None else min(timeout, left)
+
+
+@contextmanager
+def scope(seconds: float = None, at: float = None):
+    """Run the block under a deadline ``seconds`` from now (or at ``at``; None clears it)."""
+    if seconds is not None:
+        at = time.monotonic() + seconds
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def bind(fn):
+    """``fn`` wrapped to run under the current deadline (for worker threads)."""
+    at = _deadline.get()
+
+    def run(*args, **kwargs):
+        with scope(at=at):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def max_tokens(requested, seconds_left):
+    """Completion budget that fits in ``seconds_left`` (never below LLM_MIN_MAX_TOKENS)."""
+    if requested is None or seconds_left is None:
+        return requested
+    fits = int(seconds_left * settings.LLM_TOKENS_PER_S)
+    return max(min(requested, settings.LLM_MIN_MAX_TOKENS), min(requested, fits))
+
+
+def abandoned(stage: str):
+    """Count work dropped at ``stage`` because its caller's deadline passed."""
+    with _lock:
+        _stats["abandoned"][stage] = _stats["abandoned"].get(stage, 0) + 1
+
+
+def stats() -> dict:
+    with _lock:
+        return {"requests": _stats["requests"], "abandoned": dict(_stats["abandoned"])}
+
+
+def parse_header(value):
+    """Seconds from an ``X-Deadline-Ms`` value, or None when missing/invalid."""
+    try:
+        ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    if ms != ms or ms <= 0:
+        return None
+    return min(ms / 1000.0, settings.DEADLINE_MAX_S)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware: sets the request's deadline from ``X-Deadline-Ms``."""
+
+    def __init__(self, app):
+        self.app = app
+        self._header = HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope_, receive, send):
+        if scope_["type"] != "http":
+            return await self.app(scope_, receive, send)
+        value = next((v for k, v in scope_["headers"] if k == self._header), None)
+        seconds = parse_header(value.decode("latin-1")) if value is not None else None
+        if seconds is None:
+            return await self.app(scope_, receive, send)
+        with _lock:
+            _stats["requests"] += 1
+        token = _deadline.set(time.monotonic() + seconds - settings.DEADLINE_MARGIN_S)
+        try:
+            await self.app(scope_, receive, send)
+        finally:
+            _deadline.reset(token)
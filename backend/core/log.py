@@ -0,0 +1,102 @@
+# backend/core/log.py
+"""
+Structured (JSON lines) logging, configured from ``config/logging.conf``.
+
+setup_logging() loads the file config, then moves the root logger's
+handlers behind a QueueHandler/QueueListener pair: request threads only put
+the record on an in-memory queue and a listener thread does the formatting
+and the stdout write, so a slow terminal or log shipper never adds latency
+to a request.
+
+Extra fields go in ``extra=`` and come out as top-level JSON keys:
+
+    log.warning("llm call failed", extra={"kind": "tips", "error": str(e)})
+"""
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import queue
+import random
+from pathlib import Path
+
+from backend.core.config import settings
+
+# attributes every LogRecord has; anything else was passed via extra=
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extras, exc."""
+
+    def format(self, record):
+        out = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # Keep the record's fields for the JSON formatter (the stock prepare()
+    # flattens everything into one preformatted message string).
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(path: str = None):
+    """Apply the file config and put the root handlers behind a queue (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+    path = Path(path or settings.LOG_CONFIG_PATH)
+    if path.exists():
+        logging.config.fileConfig(path, disable_existing_loggers=False)
+    root = logging.getLogger()
+    handlers = [h for h in root.handlers if not isinstance(h, _QueueHandler)]
+    if not handlers:
+        return
+    q = queue.SimpleQueue()
+    for h in handlers:
+        root.removeHandler(h)
+    root.addHandler(_QueueHandler(q))
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Drain the queue, stop the listener and give the handlers back to root."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, _QueueHandler):
+            root.removeHandler(h)
+    for h in listener.handlers:
+        root.addHandler(h)
+
+
+def sampled(logger: logging.Logger, rate: float) -> bool:
+    """True for roughly ``rate`` of calls, and only when DEBUG is on for ``logger``."""
+    return rate > 0 and logger.isEnabledFor(logging.DEBUG) and random.random() < rate
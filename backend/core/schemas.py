@@ -32,6 +32,8 @@ class FootprintResult(BaseModel):
     score: int
     trend: List[TrendPoint]
     recommendations: List[Dict] = []
+    similar: Optional[Dict] = None  # "households like you" (neighbours.summarise)
+    benchmark: Optional[Dict] = None  # national average and household profile (compare_to_benchmark)
 
 
 # ----------------- AI Tips -----------------
@@ -47,6 +49,7 @@ class AITip(BaseModel):
 
 class TipsResponse(BaseModel):
     tips: List[Dict]  # using Dict to allow flexible AI output
+    source: Optional[str] = None  # cache | grid | corpus | prefetch | rules | llm
 
 
 # ----------------- Optional: User Models -----------------
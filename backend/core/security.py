@@ -1,3 +1,58 @@
 # Optional auth helpers (JWT etc.) – left minimal for prototype
+from fastapi import HTTPException, Request
+
+from backend.core.config import settings
+
+
 def get_current_user_id():
     return 1
+
+
+# ---------------------------------------------------
+# Client identity + rate limiting dependency
+# ---------------------------------------------------
+
+
+def _trusted_proxies() -> set:
+    return {p.strip() for p in settings.RATE_LIMIT_TRUSTED_PROXIES.split(",") if p.strip()}
+
+
+def get_client_id(request: Request) -> str:
+    """Client identity for rate limiting.
+
+    Identity headers are client-controlled, so they only count when the peer
+    is a trusted proxy (``RATE_LIMIT_TRUSTED_PROXIES``); everyone else is
+    keyed by peer IP.
+    """
+    peer = request.client.host if request.client else "anonymous"
+    trusted = _trusted_proxies()
+    if peer not in trusted:
+        return peer
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id[:128]
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        # the right-most hop that is not one of our proxies is the client
+        for hop in reversed([h.strip() for h in forwarded.split(",")]):
+            if hop and hop not in trusted:
+                return hop
+    return peer
+
+
+def rate_limit(budget: str):
+    """FastAPI dependency enforcing the named token-bucket budget ("tips" / "chat" / "feedback")."""
+    from backend.services.ratelimit import limiter, retry_after_header
+
+    def dependency(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        allowed, retry_after = limiter.check(budget, get_client_id(request))
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many {budget} requests — please slow down.",
+                headers={"Retry-After": retry_after_header(retry_after)},
+            )
+
+    return dependency
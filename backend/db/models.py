@@ -1,6 +1,6 @@
 # backend/db/models.py
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column
-from sqlalchemy import Integer, String, Float, JSON, DateTime, func
+from sqlalchemy import Integer, String, Float, JSON, DateTime, Text, func
 
 Base = declarative_base()
 
@@ -45,3 +45,24 @@ class Leaderboard(Base):
     user_name = mapped_column(String, default="Anonymous")
     score = mapped_column(Float, nullable=False)
     created_at = mapped_column(DateTime, default=func.now())
+
+
+# ------------------------
+# Chat conversations (server-side history)
+# ------------------------
+class Conversation(Base):
+    __tablename__ = "conversations"
+    id = mapped_column(String(64), primary_key=True)
+    # rolling summary of every message with id <= summary_upto
+    summary = mapped_column(Text, default="")
+    summary_upto = mapped_column(Integer, default=0)
+    created_at = mapped_column(DateTime, default=func.now())
+    updated_at = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class ConversationMessage(Base):
+    __tablename__ = "conversation_messages"
+    id = mapped_column(Integer, primary_key=True)
+    conversation_id = mapped_column(String(64), index=True, nullable=False)
+    role = mapped_column(String(16), nullable=False)  # user | assistant
+    content = mapped_column(Text, nullable=False)
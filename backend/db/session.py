@@ -11,7 +11,12 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 )
 
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Thread-local sessions for the sync request handlers (see get_db). Code that
+# runs on the event loop or on its own worker threads should open a plain
+# ``session_factory()`` session instead.
+SessionLocal = scoped_session(session_factory)
 
 # NOTE: import Base from backend.db.models where Base = declarative_base()
 def get_db():
@@ -1,17 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.core.deadline import DeadlineMiddleware
+from backend.core.log import setup_logging, shutdown_logging
 from backend.db.session import engine
-from backend.db import models
 
 from backend.api import routes_footprint
+from backend.api import routes_health
+from backend.api import routes_profile
+from backend.api import routes_reco
+from backend.services import warmup
+from backend.services import bandit
+from backend.services.llm_gateway import gateway
+from backend.services.llm_ledger import ledger
+
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    # Warm everything before uvicorn starts accepting connections
+    await asyncio.to_thread(warmup.warm_up)
+    yield
+    # Drain: stop advertising readiness, then release pooled resources
+    warmup.mark_not_ready()
+    gateway.shutdown()
+    ledger.flush()
+    bandit.flush()
+    engine.dispose()
+    shutdown_logging()
 
-from backend.api import routes_reco 
-app = FastAPI(title="CarbonLens API")
 
+app = FastAPI(title="CarbonLens API", lifespan=lifespan)
+
+app.include_router(routes_health.router)
 app.include_router(routes_footprint.router)
+app.include_router(routes_profile.router)
 
 app.include_router(routes_reco.router) 
+# X-Deadline-Ms -> request deadline honoured down to the LLM call
+app.add_middleware(DeadlineMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,11 +51,3 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-
-@app.on_event("startup")
-def on_startup():
-    try:
-        models.Base.metadata.create_all(bind=engine)
-    except:
-        pass
@@ -0,0 +1,239 @@
+# backend/services/bandit.py
+"""
+Online ranking of instant tips from "Done" feedback (Thompson sampling).
+
+Rules-engine and corpus tips carry stable ids, so completions can be counted
+per tip and per segment (the household-profile label). Only those ids get
+counters: LLM tips (keyed by a title hash) are never ranked, so feedback on
+them is ignored rather than growing the arrays and the table. Counters live in two
+compact ``uint32`` arrays, ``[segment, tip]``: ``shown`` is bumped by impressions()
+when a list actually reaches a client (ranking alone counts nothing), ``done``
+when page 2's checkbox is ticked (and decremented when it is unticked).
+
+rank() draws one completion rate per tip from
+``Beta(1 + PRIOR * confidence + done, 1 + PRIOR * (1 - confidence) + misses)``
+and orders the k tips by sampled rate × impact: tips that people like you
+actually complete rise, untried ones still get explored, and the tip's own
+confidence is the prior. That is k dictionary lookups and k Beta draws, so
+there is no LLM call and no scan over other tips. Lists where no tip has a
+completion yet in the segment keep their original (deterministic) order.
+
+Counts are persisted as deltas to SQLite (``RECO_BANDIT_PATH``), so several
+workers add up instead of overwriting each other. The process-wide instance
+is created by get_bandit() on first use, so importing this module does not
+import NumPy.
+"""
+import logging
+import re
+import sqlite3
+import threading
+import zlib
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+PRIOR = 4.0  # weight of the tip's own confidence, in pseudo-observations
+FLUSH_EVERY = 64  # pending counter cells before a write
+STABLE_PREFIXES = ("rule-", "corpus-")
+_SPACE = re.compile(r"\s+")
+
+
+def tip_key(tip: dict) -> str:
+    """Stable id for a tip: its rules/corpus id, else a hash of its title."""
+    tip_id = str(tip.get("id") or "")
+    if tip_id.startswith(STABLE_PREFIXES):
+        return tip_id
+    title = _SPACE.sub(" ", str(tip.get("title") or "").strip().lower())
+    return f"title-{zlib.crc32(title.encode('utf-8')):08x}"
+
+
+class TipBandit:
+    def __init__(self, path: str, prior: float = PRIOR, seed: int = None):
+        import numpy as np
+
+        self.path = path
+        self.prior = prior
+        self._rng = np.random.default_rng(seed)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._segments = {}  # segment -> row
+        self._tips = {}  # tip key -> column
+        self.shown = np.zeros((8, 256), dtype=np.uint32)
+        self.done = np.zeros((8, 256), dtype=np.uint32)
+        self._pending = {}  # (segment, tip key) -> [shown delta, done delta]
+        self._stats = {"ranked": 0, "reordered": 0, "impressions": 0, "feedback": 0, "flushes": 0}
+
+    # -----------------------------
+    # Storage
+    # -----------------------------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tip_feedback ("
+                " segment TEXT NOT NULL, tip TEXT NOT NULL,"
+                " shown INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (segment, tip))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def load(self):
+        """Read the stored counters into the arrays (once per worker)."""
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                rows = self._conn().execute("SELECT segment, tip, shown, done FROM tip_feedback").fetchall()
+            except sqlite3.Error as e:
+                log.warning("tip feedback load failed", extra={"error": str(e)})
+                rows = []
+            for segment, key, shown, done in rows:
+                r, c = self._cell(segment, key)
+                self.shown[r, c] += shown
+                self.done[r, c] += done
+            self._loaded = True
+
+    def flush(self):
+        """Write the pending counter deltas."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        rows = [(s, k, d[0], d[1]) for (s, k), d in pending.items()]
+        try:
+            self._conn().executemany(
+                "INSERT INTO tip_feedback (segment, tip, shown, done) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (segment, tip) DO UPDATE SET"
+                " shown = shown + excluded.shown, done = MAX(0, done + excluded.done)",
+                rows,
+            )
+            with self._lock:
+                self._stats["flushes"] += 1
+        except sqlite3.Error as e:
+            log.warning("tip feedback write failed", extra={"error": str(e), "rows": len(rows)})
+
+    # -----------------------------
+    # Counters (callers hold the lock)
+    # -----------------------------
+    def _cell(self, segment: str, key: str):
+        import numpy as np
+
+        r = self._segments.setdefault(segment, len(self._segments))
+        c = self._tips.setdefault(key, len(self._tips))
+        rows, cols = self.shown.shape
+        if r >= rows or c >= cols:
+            shape = (max(rows, 2 * r + 1) if r >= rows else rows, max(cols, 2 * c + 1) if c >= cols else cols)
+            for name in ("shown", "done"):
+                grown = np.zeros(shape, dtype=np.uint32)
+                grown[:rows, :cols] = getattr(self, name)
+                setattr(self, name, grown)
+        return r, c
+
+    def _find(self, segment: str, key: str):
+        r, c = self._segments.get(segment), self._tips.get(key)
+        return None if r is None or c is None else (r, c)
+
+    def _bump(self, segment, key, r, c, shown=0, done=0):
+        self.shown[r, c] += shown
+        if done < 0:
+            done = -min(-done, int(self.done[r, c]))
+            self.done[r, c] -= -done
+        else:
+            self.done[r, c] += done
+        d = self._pending.setdefault((segment, key), [0, 0])
+        d[0] += shown
+        d[1] += done
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def rank(self, tips: list, segment: str) -> list:
+        """Reorder ``tips`` by sampled completion rate × impact (counts nothing)."""
+        import numpy as np
+
+        self.load()
+        keys = [tip_key(t) for t in tips]
+        with self._lock:
+            self._stats["ranked"] += 1
+            # tips without counters yet read as zeros; rank() creates no cells
+            cells = [self._find(segment, k) for k in keys]
+            shown = np.array([self.shown[cell] if cell else 0 for cell in cells], dtype=np.float64)
+            done = np.array([self.done[cell] if cell else 0 for cell in cells], dtype=np.float64)
+            reorder = bool(done.any())
+            if reorder:
+                self._stats["reordered"] += 1
+                conf = np.clip([float(t.get("confidence") or 0.5) for t in tips], 0.01, 0.99)
+                theta = self._rng.beta(1 + self.prior * conf + done, 1 + self.prior * (1 - conf) + np.maximum(shown - done, 0))
+        if not reorder:
+            return tips
+        impact = np.array([max(1.0, float(t.get("impact_kg_month") or 0)) for t in tips])
+        return [tips[i] for i in np.argsort(-(theta * impact), kind="stable")]
+
+    def impressions(self, tips: list, segment: str):
+        """Count one impression per rules / corpus tip in a list served to a client."""
+        keys = [k for k in (tip_key(t) for t in tips) if k.startswith(STABLE_PREFIXES)]
+        if not keys:
+            return
+        self.load()
+        with self._lock:
+            self._stats["impressions"] += len(keys)
+            for key in keys:
+                r, c = self._cell(segment, key)
+                self._bump(segment, key, r, c, shown=1)
+            should_flush = len(self._pending) >= FLUSH_EVERY
+        if should_flush:
+            self.flush()
+
+    def feedback(self, tip: dict, segment: str, done: bool = True):
+        """Count a "Done" tick (or, with ``done=False``, take one back).
+
+        Returns the tip key, or None for a tip the bandit does not rank.
+        """
+        key = tip_key(tip)
+        if not key.startswith(STABLE_PREFIXES):
+            return None
+        self.load()
+        with self._lock:
+            self._stats["feedback"] += 1
+            r, c = self._cell(segment, key)
+            # a tick without a counted impression (e.g. before a restart) still shows the tip was seen
+            self._bump(segment, key, r, c, shown=int(done and self.shown[r, c] <= self.done[r, c]), done=1 if done else -1)
+        self.flush()
+        return key
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["segments"] = len(self._segments)
+            out["tips"] = len(self._tips)
+            out["completions"] = int(self.done.sum())
+            out["pending"] = len(self._pending)
+        return out
+
+
+# -----------------------------
+# Process-wide instance
+# -----------------------------
+_bandit = None
+_bandit_lock = threading.Lock()
+
+
+def get_bandit() -> TipBandit:
+    global _bandit
+    if _bandit is None:
+        with _bandit_lock:
+            if _bandit is None:
+                _bandit = TipBandit(settings.RECO_BANDIT_PATH)
+    return _bandit
+
+
+def flush():
+    """Write pending counters (nothing to do if the bandit was never used)."""
+    if _bandit is not None:
+        _bandit.flush()
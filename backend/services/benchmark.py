@@ -1,6 +1,18 @@
 NATIONAL_AVG_TON_YR = 2.0  # India approx; adjust in config if needed
 
-def compare_to_benchmark(total_kg_month: float) -> dict:
+def compare_to_benchmark(total_kg_month: float, totals: dict = None) -> dict:
     user_ton_yr = total_kg_month * 12 / 1000
     delta_pct = (user_ton_yr - NATIONAL_AVG_TON_YR) / NATIONAL_AVG_TON_YR * 100
-    return {"user_ton_year": round(user_ton_yr, 2), "delta_pct_vs_national": round(delta_pct, 1)}
+    out = {"user_ton_year": round(user_ton_yr, 2), "delta_pct_vs_national": round(delta_pct, 1)}
+    # with category totals, also compare against similar households
+    if totals:
+        from backend.services.profile_clf import get_classifier
+
+        clf = get_classifier()
+        if clf is not None:
+            result = clf.classify(totals)
+            peer = result["peer_avg_kg_month"]
+            out["profile"] = result["profile"]
+            if peer:
+                out["delta_pct_vs_peers"] = round((total_kg_month - peer) / peer * 100, 1)
+    return out
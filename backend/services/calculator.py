@@ -42,4 +42,76 @@ def compute_footprint(payload: dict) -> dict:
         "travel": round(travel, 1),
         "food": round(food, 1),
         "goods": round(goods, 1),
-    }
\ No newline at end of file
+    }
+
+# -----------------------------
+# Vectorized batch computation
+# -----------------------------
+BATCH_FIELDS = (
+    "electricityKwh",
+    "naturalGasTherms",
+    "carKm",
+    "busKm",
+    "foodEmissions",
+    "goodsEmissions",
+)
+
+
+def compute_footprint_batch(columns: dict) -> dict:
+    """Same maths as ``compute_footprint`` over whole columns at once.
+
+    ``columns`` maps input field names to equal-length sequences (``diet`` as
+    strings). Returns float64 NumPy arrays keyed like the scalar result.
+    Raises ValueError for ragged columns, non-numeric values or unknown diets.
+    """
+    import numpy as np
+
+    n = batch_length(columns)
+    energy = numeric_column(columns, "electricityKwh", n) * EFS["elec"]
+    energy = energy + numeric_column(columns, "naturalGasTherms", n) * EFS.get("natural_gas", 5.3)
+    travel = numeric_column(columns, "carKm", n) * EFS["car"] + numeric_column(columns, "busKm", n) * EFS["bus"]
+
+    diets = columns.get("diet")
+    if diets is None:
+        diet_food = np.full(n, float(EFS["food"]["mixed"]))
+    else:
+        unknown = sorted({str(d) for d in diets if d not in EFS["food"]})
+        if unknown:
+            raise ValueError(f"diet: unknown value(s) {unknown[:5]}; expected one of {sorted(EFS['food'])}")
+        diet_food = np.array([EFS["food"][d] for d in diets], dtype=np.float64)
+    food_emissions = numeric_column(columns, "foodEmissions", n)
+    food = np.where(food_emissions > 0, food_emissions * 30, diet_food)
+
+    goods = numeric_column(columns, "goodsEmissions", n)
+
+    return {
+        "total": np.round(energy + travel + food + goods, 1),
+        "energy": np.round(energy, 1),
+        "travel": np.round(travel, 1),
+        "food": np.round(food, 1),
+        "goods": np.round(goods, 1),
+    }
+
+
+def batch_length(columns: dict) -> int:
+    """Common length of the batch columns (ValueError if they differ)."""
+    lengths = {name: len(values) for name, values in columns.items()}
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"columns must have equal lengths, got {lengths}")
+    return next(iter(lengths.values()), 0)
+
+
+def numeric_column(columns: dict, name: str, n: int):
+    """``columns[name]`` as finite float64 (zeros when absent)."""
+    import numpy as np
+
+    values = columns.get(name)
+    if values is None:
+        return np.zeros(n, dtype=np.float64)
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: values must be numbers")
+    if arr.shape != (n,) or not np.isfinite(arr).all():
+        raise ValueError(f"{name}: expected {n} finite numbers")
+    return arr
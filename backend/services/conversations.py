@@ -0,0 +1,195 @@
+# backend/services/conversations.py
+"""
+Server-side chat history with a bounded prompt.
+
+Clients send a ``conversation_id`` instead of their whole transcript. Each
+turn is appended to ``conversation_messages``; when a prompt is built only
+the newest messages that fit ``CHAT_HISTORY_TOKEN_BUDGET`` are included,
+and everything older is represented by one rolling summary stored on the
+``conversations`` row. The summary is refreshed on the LLM gateway at
+background priority once enough messages have fallen out of the window, so
+a chat turn never waits for it.
+"""
+import logging
+import threading
+import uuid
+
+from backend.core.config import settings
+from backend.db.models import Conversation, ConversationMessage
+from backend.db.session import session_factory
+from backend.services.llm_gateway import gateway, PRIORITY_BACKGROUND
+from backend.services.llm_ledger import ledger
+
+log = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD_TOKENS = 4
+MAX_ID_LENGTH = 64
+
+_summarizing = set()
+_summarizing_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text or "") // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def new_conversation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_conversation_id(conversation_id) -> bool:
+    return isinstance(conversation_id, str) and 0 < len(conversation_id) <= MAX_ID_LENGTH
+
+
+def fit_budget(messages: list, budget: int):
+    """Split ``messages`` (oldest first) into ``(dropped, kept)``.
+
+    ``kept`` is the longest suffix whose estimated size fits ``budget``; it
+    never starts with an assistant message, so the window opens on a question.
+    """
+    used, start = 0, len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        cost = estimate_tokens(messages[i]["content"])
+        if used + cost > budget:
+            break
+        used += cost
+        start = i
+    while start < len(messages) and messages[start]["role"] != "user":
+        start += 1
+    return messages[:start], messages[start:]
+
+
+# -----------------------------
+# Storage
+# -----------------------------
+def _pending(db, conversation_id):
+    """The current summary and the messages it does not cover yet."""
+    conv = db.get(Conversation, conversation_id)
+    summary, upto = (conv.summary or "", conv.summary_upto) if conv else ("", 0)
+    rows = (
+        db.query(ConversationMessage)
+        .filter(ConversationMessage.conversation_id == conversation_id, ConversationMessage.id > upto)
+        .order_by(ConversationMessage.id)
+        .all()
+    )
+    return summary, [{"id": r.id, "role": r.role, "content": r.content} for r in rows]
+
+
+def load_context(conversation_id: str, budget: int = None):
+    """``(summary, recent_messages, dropped_messages)`` for one conversation."""
+    budget = settings.CHAT_HISTORY_TOKEN_BUDGET if budget is None else budget
+    with session_factory() as db:
+        summary, messages = _pending(db, conversation_id)
+    if summary:
+        budget = max(0, budget - estimate_tokens(summary))
+    dropped, recent = fit_budget(messages, budget)
+    return summary, recent, dropped
+
+
+def record_turn(conversation_id: str, question: str, answer: str):
+    """Append one question/answer pair, creating the conversation if needed."""
+    with session_factory() as db:
+        if db.get(Conversation, conversation_id) is None:
+            db.add(Conversation(id=conversation_id, summary="", summary_upto=0))
+        db.add(ConversationMessage(conversation_id=conversation_id, role="user", content=question or ""))
+        db.add(ConversationMessage(conversation_id=conversation_id, role="assistant", content=answer or ""))
+        db.commit()
+    schedule_summary(conversation_id)
+
+
+# -----------------------------
+# Payload assembly
+# -----------------------------
+def with_history(payload: dict) -> dict:
+    """Copy of a chat payload whose history fits the prompt budget.
+
+    With a ``conversation_id`` the history comes from the store (any
+    client-sent ``chat_history`` is ignored); without one the legacy
+    client-sent history is trimmed to the same budget.
+    """
+    payload = dict(payload)
+    conversation_id = payload.get("conversation_id")
+    if valid_conversation_id(conversation_id):
+        summary, recent, _ = load_context(conversation_id)
+        payload["conversation_summary"] = summary
+        payload["chat_history"] = [{"role": m["role"], "content": m["content"]} for m in recent]
+    else:
+        history = [m for m in payload.get("chat_history") or [] if isinstance(m, dict) and m.get("content")]
+        _, payload["chat_history"] = fit_budget(history, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    return payload
+
+
+# -----------------------------
+# Rolling summary
+# -----------------------------
+def _fallback_summary(summary: str, messages: list) -> str:
+    questions = [m["content"].strip().replace("\n", " ")[:120] for m in messages if m["role"] == "user"]
+    if questions:
+        summary = f"{summary} Earlier the user asked: {'; '.join(questions)}.".strip()
+    return summary[-settings.CHAT_SUMMARY_MAX_TOKENS * 4:]
+
+
+def _llm_summary(summary: str, messages: list):
+    from backend.services.recommender import llm
+
+    transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+    prompt = (
+        "Update the running summary of a carbon-footprint coaching chat.\n"
+        "Keep the user's goals, constraints, numbers they mentioned and advice already given.\n"
+        f"Reply with the summary only, at most {settings.CHAT_SUMMARY_MAX_TOKENS * 3 // 4} words.\n\n"
+        f"CURRENT SUMMARY:\n{summary or '(none)'}\n\nNEW MESSAGES:\n{transcript}"
+    )
+    messages = [{"role": "user", "content": prompt}]
+    record = ledger.start("summary", "summary-v1", messages)
+    try:
+        resp = llm.create(
+            record=record,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+        )
+    except Exception:
+        record.finish("error")
+        raise
+    content = (resp.choices[0].message.content or "").strip()
+    record.add_output(content)
+    record.set_usage(getattr(resp, "usage", None))
+    record.finish("parsed" if content else "fallback")
+    return content
+
+
+def refresh_summary(conversation_id: str):
+    """Fold every message outside the prompt window into the summary."""
+    try:
+        summary, _, dropped = load_context(conversation_id)
+        if not dropped:
+            return
+        try:
+            new_summary = _llm_summary(summary, dropped) if settings.GROQ_API_KEY else ""
+        except Exception as e:
+            log.warning("chat summary failed", extra={"error": str(e)})
+            new_summary = ""
+        new_summary = new_summary or _fallback_summary(summary, dropped)
+        with session_factory() as db:
+            conv = db.get(Conversation, conversation_id)
+            if conv is not None:
+                conv.summary = new_summary
+                conv.summary_upto = dropped[-1]["id"]
+                db.commit()
+    finally:
+        with _summarizing_lock:
+            _summarizing.discard(conversation_id)
+
+
+def schedule_summary(conversation_id: str):
+    """Queue a background summary refresh if enough history has piled up."""
+    _, _, dropped = load_context(conversation_id)
+    if len(dropped) < settings.CHAT_SUMMARY_MIN_NEW:
+        return False
+    with _summarizing_lock:
+        if conversation_id in _summarizing:
+            return False
+        _summarizing.add(conversation_id)
+    gateway.submit(refresh_summary, conversation_id, priority=PRIORITY_BACKGROUND)
+    return True
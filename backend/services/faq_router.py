@@ -0,0 +1,268 @@
+# backend/services/faq_router.py
+"""
+Local intent router for /reco/chat: common questions never reach the LLM.
+
+Questions like "How can I reduce my energy footprint?" or "what's my
+biggest area" are answered from the analyzer totals alone. A TF-IDF +
+logistic-regression classifier is trained at load time on the examples in
+``ai/faq/intents.yaml``; matches above ``FAQ_MIN_CONFIDENCE`` get that
+intent's template filled with the user's numbers. Inference is done by
+hand from the fitted vocabulary, idf and coefficients (a dict lookup and a
+small dot product), so routing plus answering takes tens of microseconds.
+
+Anything the classifier is unsure about, any question with many words it
+has never seen, and the ``none`` intent go to the LLM as before.
+
+Every question is also counted in a count-min sketch; the most frequent
+ones (and whether they were answered locally) are reported by stats(), and
+a frequent question that keeps going to the LLM is logged once, as a hint
+that it deserves an intent of its own.
+"""
+import hashlib
+import logging
+import re
+import threading
+from pathlib import Path
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+INTENTS_PATH = Path(__file__).resolve().parents[2] / "ai" / "faq" / "intents.yaml"
+AREAS = ("energy", "travel", "food", "goods")
+NONE = "none"
+MAX_WORDS = 12  # longer questions are specific enough to need the LLM
+MIN_KNOWN = 0.6  # share of a question's words the classifier must know
+TOP_QUESTIONS = 50
+FREQUENT_AT = 25  # log an unanswered question once it has been asked this often
+
+_PUNCT = re.compile(r"[^\w\s']+")
+
+
+def normalise(question: str) -> str:
+    return " ".join(_PUNCT.sub(" ", (question or "").lower()).split())
+
+
+# -----------------------------
+# Count-min sketch + heavy hitters
+# -----------------------------
+class CountMinSketch:
+    """Approximate counts in fixed memory (never under-counts)."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        import numpy as np
+
+        self.width, self.depth = width, depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def _cols(self, key: str):
+        # one 64-bit hash split into two halves, row i at (a + i * b): the rows
+        # are pairwise independent (a seeded CRC is affine in its seed, so
+        # keys colliding in one row would collide in all of them)
+        h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        a, b = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(a + i * b) % self.width for i in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Count ``key`` once and return its estimated count."""
+        cols = self._cols(key)
+        self.table[self._rows, cols] += 1
+        return int(self.table[self._rows, cols].min())
+
+    def estimate(self, key: str) -> int:
+        return int(self.table[self._rows, self._cols(key)].min())
+
+
+# -----------------------------
+# Classifier
+# -----------------------------
+def load_intents(path: Path = INTENTS_PATH) -> list:
+    import yaml
+
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    intents = []
+    for n, it in enumerate(data.get("intents") or []):
+        if not it.get("name") or not it.get("examples") or (it["name"] != NONE and not it.get("answer")):
+            log.warning("skipping invalid intent %d in %s", n, Path(path).name)
+            continue
+        intents.append(it)
+    return intents
+
+
+class IntentClassifier:
+    def __init__(self, intents: list):
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        texts, labels = [], []
+        for it in intents:
+            texts += [normalise(e) for e in it["examples"]]
+            labels += [it["name"]] * len(it["examples"])
+        vec = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, token_pattern=r"(?u)\b\w+\b")
+        x = vec.fit_transform(texts)
+        model = LogisticRegression(C=20.0, max_iter=2000).fit(x, labels)
+
+        self.intents = {it["name"]: it for it in intents}
+        self.labels = [str(c) for c in model.classes_]
+        self.vocab = dict(vec.vocabulary_)
+        self.idf = vec.idf_.astype(np.float64)
+        # [n_terms, n_labels] so a question only touches the rows of its terms
+        self.weights = np.ascontiguousarray(model.coef_.T, dtype=np.float64)
+        self.bias = model.intercept_.astype(np.float64)
+        if self.weights.shape[1] == 1:  # two classes: sklearn keeps one column
+            self.weights = np.hstack([-self.weights, self.weights])
+            self.bias = np.array([-self.bias[0], self.bias[0]])
+
+    def predict(self, text: str):
+        """``(intent, probability, share of known words)`` for a normalised question."""
+        import numpy as np
+
+        words = text.split()
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        counts = {}
+        for t in terms:
+            i = self.vocab.get(t)
+            if i is not None:
+                counts[i] = counts.get(i, 0) + 1
+        known = sum(w in self.vocab for w in words) / max(1, len(words))
+        if not counts:
+            return NONE, 0.0, known
+        idx = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        v = tf * self.idf[idx]
+        v /= np.sqrt(v @ v)
+        logits = v @ self.weights[idx] + self.bias
+        logits -= logits.max()
+        p = np.exp(logits)
+        p /= p.sum()
+        best = int(p.argmax())
+        return self.labels[best], float(p[best]), known
+
+
+# -----------------------------
+# Templates
+# -----------------------------
+def facts(totals: dict) -> dict:
+    """Numbers the answer templates may use."""
+    from backend.services.benchmark import NATIONAL_AVG_TON_YR, compare_to_benchmark
+
+    kg = {a: float(totals.get(a) or 0) for a in AREAS}
+    total = float(totals.get("total") or sum(kg.values()))
+    highest = max(AREAS, key=lambda a: kg[a])
+    bench = compare_to_benchmark(total)
+    out = {a: round(v, 1) for a, v in kg.items()}
+    out.update({
+        "total": round(total, 1),
+        "highest": highest,
+        "highest_kg": round(kg[highest], 1),
+        "highest_pct": round(kg[highest] / total * 100) if total else 0,
+        "ton_year": bench["user_ton_year"],
+        "national_ton_year": NATIONAL_AVG_TON_YR,
+        "delta_pct": abs(bench["delta_pct_vs_national"]),
+        "above_below": "above" if bench["delta_pct_vs_national"] > 0 else "below",
+    })
+    return out
+
+
+def _area_actions(totals: dict, area: str, defaults, k: int = 3) -> str:
+    from backend.services.rules_engine import get_engine
+
+    engine = get_engine()
+    tips = [t for t in engine.rank(totals, k=len(engine)) if t["category"].lower() == area][:k]
+    lines = [f"- {t['title']} (≈{t['impact_kg_month']} kg/month)" for t in tips]
+    return "\n".join(lines or [f"- {a}" for a in defaults or []])
+
+
+def render(intent: dict, totals: dict) -> str:
+    values = facts(totals)
+    area = intent.get("area")
+    if area in AREAS:
+        values.update({
+            "area": area,
+            "area_kg": values[area],
+            "area_pct": round(values[area] / values["total"] * 100) if values["total"] else 0,
+            "actions": _area_actions(totals, area, intent.get("actions")),
+        })
+    return str(intent["answer"]).strip().format_map(values)
+
+
+# -----------------------------
+# Router
+# -----------------------------
+class FaqRouter:
+    def __init__(self, min_confidence: float = 0.6, path: Path = INTENTS_PATH):
+        self.min_confidence = min_confidence
+        self.path = path
+        self._clf = None
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._sketch = None
+        self._top = {}  # normalised question -> [estimated count, last intent or None]
+        self._stats = {"questions": 0, "answered": 0, "to_llm": 0}
+
+    def load(self):
+        if self._clf is None:
+            with self._load_lock:
+                if self._clf is None:
+                    self._sketch = CountMinSketch()
+                    self._clf = IntentClassifier(load_intents(self.path))
+        return self._clf
+
+    def classify(self, question: str):
+        """``(intent, probability)``; intent is None when the LLM should answer."""
+        clf = self.load()
+        text = normalise(question)
+        words = len(text.split())
+        if not words or words > MAX_WORDS:
+            return None, 0.0
+        intent, p, known = clf.predict(text)
+        if intent == NONE or p < self.min_confidence or known < MIN_KNOWN:
+            return None, p
+        return intent, p
+
+    def _count(self, question: str, intent):
+        key = normalise(question)
+        if not key:
+            return
+        with self._lock:
+            self._stats["questions"] += 1
+            self._stats["answered" if intent else "to_llm"] += 1
+            n = self._sketch.add(key)
+            if key in self._top or len(self._top) < TOP_QUESTIONS:
+                self._top[key] = [n, intent]
+            else:
+                low = min(self._top, key=lambda q: self._top[q][0])
+                if n > self._top[low][0]:
+                    del self._top[low]
+                    self._top[key] = [n, intent]
+        if n == FREQUENT_AT and not intent:
+            log.info("frequent chat question goes to the llm", extra={"question": key, "count": n})
+
+    def answer(self, question: str, totals: dict):
+        """Template answer for a common question, or None to ask the LLM."""
+        totals = totals or {}
+        if not any(float(totals.get(a) or 0) > 0 for a in AREAS):
+            return None  # nothing analysed yet: there are no numbers to quote
+        intent, _ = self.classify(question)
+        text = None
+        if intent:
+            try:
+                text = render(self._clf.intents[intent], totals)
+            except Exception as e:
+                log.warning("faq template failed", extra={"intent": intent, "error": str(e)})
+        self._count(question, intent if text else None)
+        return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            top = sorted(self._top.items(), key=lambda kv: -kv[1][0])
+        out["loaded"] = self._clf is not None
+        out["answer_rate"] = round(out["answered"] / out["questions"], 3) if out["questions"] else None
+        out["top_questions"] = [{"question": q, "count": n, "intent": i} for q, (n, i) in top[:20]]
+        return out
+
+
+router = FaqRouter(settings.FAQ_MIN_CONFIDENCE)
@@ -0,0 +1,400 @@
+# backend/services/llm_client.py
+"""
+Resilient chat-completions client: deadlines, hedging, circuit breaking and
+provider failover in front of the Groq SDK.
+
+* Every attempt gets the time left until the call's deadline
+  (``LLM_CALL_TIMEOUT_S``) as its HTTP timeout, and SDK retries are off, so
+  a slow provider cannot hold a request past the point the UI gives up.
+* Hedging: if an attempt has not answered (or, when streaming, produced its
+  first token) by the provider's observed p95, a second attempt is started
+  on the next healthy provider — or the same one — and the first to succeed
+  wins. The loser is closed or discarded.
+* Each provider has a circuit breaker. After ``LLM_BREAKER_FAILURES``
+  consecutive failures it opens and calls skip it for
+  ``LLM_BREAKER_COOLDOWN_S``; then one trial call is let through. While every
+  breaker is open ``available()`` is False, and callers go straight to the
+  rules or fallback path without waiting on the network. Only outages count
+  as failures — timeouts, connection errors and 5xx answers; a 4xx is the
+  request's fault, and a hedge loser failing after the winner answered is
+  nobody's.
+
+Providers are anything exposing the SDK's ``chat.completions.create``; the
+secondary one is an OpenAI/Groq-compatible endpoint configured through
+``LLM_SECONDARY_*`` (e.g. scripts/groq_stub.py or a self-hosted model).
+Async streams (chat SSE) get deadlines, breakers and failover but no hedge.
+
+A request deadline (backend/core/deadline.py) shortens the call's budget to
+the time the client has left and lowers ``max_tokens`` to what fits in it;
+a call with less than ``LLM_MIN_CALL_S`` left is not started at all.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.core import deadline as request_deadline
+from backend.core.config import settings
+
+LATENCY_WINDOW = 200
+MIN_SAMPLES_TO_HEDGE = 20
+
+
+class ProviderUnavailable(RuntimeError):
+    """Every provider's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown_s: float):
+        self.failures = max(1, int(failures))
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown_s:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """True if a call may go out now (claims the trial slot when half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown_s or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def release(self):
+        """Give back a claimed trial slot without counting the call either way."""
+        with self._lock:
+            self._trial = False
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._trial = False
+            if ok:
+                self._consecutive, self._opened_at = 0, None
+                return
+            self._consecutive += 1
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+class Provider:
+    def __init__(self, name: str, client_fn, model: str, async_client_fn=None):
+        self.name = name
+        self.client_fn = client_fn
+        self.async_client_fn = async_client_fn
+        self.model = model
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_COOLDOWN_S)
+        self._latency = {"call": deque(maxlen=LATENCY_WINDOW), "ttft": deque(maxlen=LATENCY_WINDOW)}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+
+    def observe(self, kind: str, seconds: float):
+        with self._lock:
+            self._latency[kind].append(seconds)
+
+    def p95(self, kind: str):
+        with self._lock:
+            samples = sorted(self._latency[kind])
+        if len(samples) < MIN_SAMPLES_TO_HEDGE:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def bump(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+        out.update(name=self.name, model=self.model, breaker=self.breaker.state,
+                   p95_call_s=self.p95("call"), p95_ttft_s=self.p95("ttft"))
+        return out
+
+
+def _with_timeout(client, timeout: float):
+    # fakes and non-SDK clients may not support per-request options
+    with_options = getattr(client, "with_options", None)
+    return with_options(timeout=timeout, max_retries=0) if with_options else client
+
+
+def _is_outage(error) -> bool:
+    """True for failures that say the provider is unhealthy (not the request)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # SDK / httpx errors without a status: APITimeoutError, APIConnectionError, ConnectTimeout, ...
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def _abandon(running, discard, record=None):
+    """Drop attempts that lost the race; close their results when they land.
+
+    An attempt that still completes is logged to ``record`` as its own
+    ledger row: its tokens are billed even though nobody uses them.
+    """
+    def cleanup(fut, provider):
+        if fut.cancelled():
+            return
+        if fut.exception() is not None:
+            if record is not None:
+                record.attempt(provider.name, provider.model, "error")
+            return
+        result = fut.result()
+        if record is not None:
+            record.attempt(provider.name, provider.model, "discarded", getattr(result, "usage", None))
+        discard(result)
+
+    for fut, provider in running.items():
+        if not fut.cancel():
+            fut.add_done_callback(lambda f, p=provider: cleanup(f, p))
+
+
+def _log_failed(record, failed):
+    for provider in failed:
+        record.attempt(provider.name, provider.model, "error")
+
+
+def _close_quietly(stream):
+    try:
+        stream.close()
+    except Exception:
+        pass
+
+
+class ResilientLLM:
+    def __init__(self, providers: list, timeout_s: float, hedge: bool = True, hedge_min_delay_s: float = 0.3):
+        self.providers = [p for p in providers if p is not None]
+        self.timeout_s = timeout_s
+        self.hedge = hedge
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    workers = 2 * max(1, settings.LLM_MAX_CONCURRENCY)
+                    self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-attempt")
+        return self._pool
+
+    def available(self) -> bool:
+        return any(p.breaker.state != "open" for p in self.providers)
+
+    def _next_provider(self, exclude=()):
+        for p in self.providers:
+            if p not in exclude and p.breaker.allow():
+                return p
+        return None
+
+    # -----------------------------
+    # Attempts
+    # -----------------------------
+    def _attempt(self, provider, kind, kwargs, deadline, lost=None):
+        ok = None  # the breaker outcome; None gives a claimed trial slot back
+        try:
+            timeout = max(0.05, deadline - time.monotonic())
+            # building the client (e.g. a missing API key) is a config error, not provider health
+            client = _with_timeout(provider.client_fn(), timeout)
+            provider.bump("calls")
+            t0 = time.monotonic()
+            try:
+                result = client.chat.completions.create(model=provider.model, **kwargs)
+                if kind == "ttft":
+                    # a stream only counts as answered once its first chunk arrives
+                    it = iter(result)
+                    try:
+                        first = next(it)
+                    except StopIteration:
+                        first = None
+                    result = (result, first, it)
+            except Exception as e:
+                provider.bump("failures")
+                # a hedge loser cut off after the winner answered says nothing about the provider
+                if _is_outage(e) and not (lost is not None and lost.is_set()):
+                    ok = False
+                raise
+            ok = True
+            provider.observe(kind, time.monotonic() - t0)
+            return result
+        finally:
+            if ok is None:
+                provider.breaker.release()
+            else:
+                provider.breaker.record(ok)
+
+    def _budget(self, kwargs, timeout_s=None):
+        """``(timeout_s, kwargs)`` for one call, cut to the request's remaining time."""
+        budget = timeout_s or self.timeout_s
+        timeout = request_deadline.limit(budget)
+        if timeout < budget and timeout < settings.LLM_MIN_CALL_S:
+            request_deadline.abandoned("llm")
+            raise request_deadline.DeadlineExceeded("too little time left to call the LLM")
+        if timeout < budget and "max_tokens" in kwargs:
+            kwargs = dict(kwargs, max_tokens=request_deadline.max_tokens(kwargs["max_tokens"], timeout))
+        return timeout, kwargs
+
+    def _hedged(self, kind, kwargs, discard, record=None, timeout_s=None):
+        timeout_s, kwargs = self._budget(kwargs, timeout_s)
+        start = time.monotonic()
+        deadline = start + timeout_s
+        first = self._next_provider()
+        if first is None:
+            raise ProviderUnavailable("all LLM providers are unavailable")
+
+        pool = self._executor()
+        lost = threading.Event()  # set once a winner is returned
+        running = {pool.submit(self._attempt, first, kind, kwargs, deadline, lost): first}
+        delay = first.p95(kind) if self.hedge else None
+        hedge_at = None if delay is None else start + max(delay, self.hedge_min_delay_s)
+        backup_used, error, failed = False, None, []
+        while running:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None or backup_used else min(deadline, hedge_at)
+            done, _ = wait(running, timeout=wake - now, return_when=FIRST_COMPLETED)
+            for fut in done:
+                provider = running.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    error = e
+                    failed.append(provider)
+                    continue
+                if provider is not first:
+                    provider.bump("hedge_wins")
+                if record is not None:
+                    record.set_source(provider.name, provider.model)
+                    _log_failed(record, failed)
+                lost.set()
+                _abandon(running, discard, record)
+                return result
+            # second attempt: the first is slower than p95, or it failed outright
+            slow = hedge_at is not None and time.monotonic() >= hedge_at
+            if not backup_used and (slow or not running):
+                backup_used = True
+                backup = self._next_provider(exclude=(first,))
+                if backup is None and slow and first.breaker.allow():
+                    backup = first  # a hedge may go to the same provider; a retry after failure may not
+                if backup is not None:
+                    if slow:
+                        first.bump("hedges")
+                    running[pool.submit(self._attempt, backup, kind, kwargs, deadline, lost)] = backup
+        _abandon(running, discard, record)
+        if record is not None:
+            # the caller's own "error" row stands for the last failed attempt
+            _log_failed(record, failed if running else failed[:-1])
+        raise error or TimeoutError(f"LLM call exceeded its {timeout_s:.1f}s deadline")
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def create(self, record=None, timeout_s=None, **kwargs):
+        """Non-streaming chat completion (hedged, deadline-bound).
+
+        ``record`` (an llm_ledger.CallRecord) is told which provider answered;
+        ``timeout_s`` replaces the default call budget (e.g. for long batch completions).
+        """
+        return self._hedged("call", kwargs, discard=lambda result: None, record=record, timeout_s=timeout_s)
+
+    def stream(self, record=None, **kwargs):
+        """Iterator of streamed chunks; ``.close()`` on it stops generation upstream."""
+        stream, first, it = self._hedged(
+            "ttft", dict(kwargs, stream=True), discard=lambda r: _close_quietly(r[0]), record=record
+        )
+        return _StartedStream(stream, first, it)
+
+    async def astream(self, record=None, **kwargs):
+        """Async stream from the first healthy provider, failing over on errors."""
+        timeout_s, kwargs = self._budget(kwargs)
+        tried, error = [], None
+        while True:
+            provider = self._next_provider(exclude=tried)
+            if provider is None:
+                if record is not None:
+                    _log_failed(record, tried[:-1])  # the caller's row stands for the last one
+                raise error or ProviderUnavailable("all LLM providers are unavailable")
+            tried.append(provider)
+            ok = None
+            try:
+                client = _with_timeout(provider.async_client_fn(), timeout_s)
+                provider.bump("calls")
+                t0 = time.monotonic()
+                try:
+                    stream = await client.chat.completions.create(model=provider.model, stream=True, **kwargs)
+                except Exception as e:
+                    provider.bump("failures")
+                    ok = False if _is_outage(e) else None
+                    error = e
+                    continue
+                ok = True
+            finally:
+                if ok is None:
+                    provider.breaker.release()
+                else:
+                    provider.breaker.record(ok)
+            provider.observe("ttft", time.monotonic() - t0)
+            if record is not None:
+                record.set_source(provider.name, provider.model)
+                _log_failed(record, tried[:-1])
+            return stream
+
+    def stats(self) -> dict:
+        return {"available": self.available(), "providers": [p.snapshot() for p in self.providers]}
+
+
+class _StartedStream:
+    """A stream whose first chunk was already read (to time the hedge)."""
+
+    def __init__(self, stream, first, it):
+        self._stream = stream
+        self._first = first
+        self._it = it
+
+    def __iter__(self):
+        if self._first is not None:
+            yield self._first
+        yield from self._it
+
+    def close(self):
+        _close_quietly(self._stream)
+
+
+def secondary_provider():
+    """Provider for ``LLM_SECONDARY_BASE_URL``, or None when not configured."""
+    if not settings.LLM_SECONDARY_BASE_URL:
+        return None
+    clients = {}
+    lock = threading.Lock()
+
+    def make(kind):
+        def get():
+            if kind not in clients:
+                with lock:
+                    if kind not in clients:
+                        from groq import AsyncGroq, Groq
+
+                        cls = Groq if kind == "sync" else AsyncGroq
+                        clients[kind] = cls(api_key=settings.LLM_SECONDARY_API_KEY or "none",
+                                            base_url=settings.LLM_SECONDARY_BASE_URL)
+            return clients[kind]
+        return get
+
+    return Provider("secondary", make("sync"), settings.LLM_SECONDARY_MODEL or settings.GROQ_MODEL, make("async"))
@@ -0,0 +1,187 @@
+# backend/services/llm_gateway.py
+"""
+LLM gateway: how routes run their blocking Groq calls.
+
+Blocking LLM calls run on the gateway's own worker threads (never on
+FastAPI's shared threadpool), at most ``LLM_MAX_CONCURRENCY`` at a time.
+Waiting jobs are ordered by priority class — interactive chat ahead of tip
+regeneration — and a job that is still queued when its deadline passes is
+cancelled and answered with its fallback instead (load shedding). The queue
+itself holds at most ``LLM_MAX_QUEUE`` jobs; beyond that, submits are shed
+straight away.
+
+The async chat stream (/reco/chat/stream, ``astream_chat_tokens``) needs no
+thread, so it awaits the async client directly and is not counted against
+``LLM_MAX_CONCURRENCY``; the client's deadlines and breakers still apply.
+
+Jobs run under their submitter's request deadline (backend/core/deadline.py):
+waiting for a slot never outlasts it, and a job whose caller gave up while
+it was queued is dropped instead of run. Background jobs have no deadline.
+"""
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from backend.core import deadline
+from backend.core.config import settings
+
+# Lower value = served first
+PRIORITY_CHAT = 0
+PRIORITY_TIPS = 1
+PRIORITY_BACKGROUND = 2  # cache refreshes and other work nobody is waiting on
+
+
+class GatewayUnavailable(RuntimeError):
+    """The job was not run: the queue was full or the gateway shut down."""
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int, queue_deadline_s: float, max_queue: int = 256):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.queue_deadline_s = queue_deadline_s
+        self.max_queue = max(1, int(max_queue))
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "shed": 0, "abandoned": 0, "running": 0}
+
+    # -----------------------------
+    # Workers
+    # -----------------------------
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.max_concurrency):
+                t = threading.Thread(target=self._worker, name=f"llm-gateway-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def _worker(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:  # shutdown sentinel
+                return
+            fut, fn, args, kwargs, at = job
+            # returns False if the waiter already gave up and cancelled the job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            if at is not None and time.monotonic() >= at:
+                fut.set_exception(deadline.DeadlineExceeded("caller's deadline passed while queued"))
+                self._bump("abandoned", 1)
+                deadline.abandoned("gateway")
+                continue
+            self._bump("running", 1)
+            try:
+                with deadline.scope(at=at):
+                    fut.set_result(fn(*args, **kwargs))
+                self._bump("completed", 1)
+            except BaseException as e:
+                fut.set_exception(e)
+                self._bump("failed", 1)
+            finally:
+                self._bump("running", -1)
+
+    def _bump(self, key, n):
+        with self._lock:
+            self._stats[key] += n
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        # fail whatever is still queued so no waiter hangs on it
+        while True:
+            try:
+                _, _, job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and job[0].set_running_or_notify_cancel():
+                job[0].set_exception(GatewayUnavailable("LLM gateway shut down"))
+        for _ in workers:
+            self._queue.put((float("inf"), next(self._seq), None))
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit(self, fn, *args, priority: int = PRIORITY_TIPS, **kwargs) -> Future:
+        self._ensure_workers()
+        fut = Future()
+        # background work may fill only half the queue, so it cannot crowd out users
+        cap = self.max_queue // 2 if priority >= PRIORITY_BACKGROUND else self.max_queue
+        if self._queue.qsize() >= cap:
+            fut.set_exception(GatewayUnavailable(f"LLM queue is full ({cap} jobs waiting)"))
+            self._bump("shed", 1)
+            return fut
+        # nobody waits on background work, so it is not bound by a request deadline
+        at = deadline.current() if priority < PRIORITY_BACKGROUND else None
+        self._queue.put((priority, next(self._seq), (fut, fn, args, kwargs, at)))
+        self._bump("submitted", 1)
+        return fut
+
+    @staticmethod
+    def _refused(fut: Future) -> bool:
+        return fut.done() and not fut.cancelled() and isinstance(fut.exception(), GatewayUnavailable)
+
+    def _shed(self, fut: Future, fallback):
+        # cancel() only succeeds while the job is still queued
+        if fut.cancel():
+            self._bump("shed", 1)
+            return True, fallback() if callable(fallback) else fallback
+        return False, None
+
+    def _caller_gone(self, fallback):
+        self._bump("abandoned", 1)
+        deadline.abandoned("gateway")
+        if fallback is None:
+            raise deadline.DeadlineExceeded("caller's deadline already passed")
+        return fallback() if callable(fallback) else fallback
+
+    def call(self, fn, *args, priority: int = PRIORITY_TIPS, fallback=None, queue_timeout: float = None, **kwargs):
+        """Run ``fn`` through the gateway, blocking the calling thread."""
+        if deadline.expired():
+            return self._caller_gone(fallback)
+        timeout = deadline.limit(self.queue_deadline_s if queue_timeout is None else queue_timeout)
+        fut = self.submit(fn, *args, priority=priority, **kwargs)
+        if fallback is not None and self._refused(fut):
+            return fallback() if callable(fallback) else fallback
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeout:
+            shed, value = self._shed(fut, fallback)
+            if shed:
+                return value
+            return fut.result()
+
+    async def acall(self, fn, *args, priority: int = PRIORITY_TIPS, fallback=None, queue_timeout: float = None, **kwargs):
+        """Async variant: the event loop is never blocked while waiting."""
+        if deadline.expired():
+            return self._caller_gone(fallback)
+        timeout = deadline.limit(self.queue_deadline_s if queue_timeout is None else queue_timeout)
+        fut = self.submit(fn, *args, priority=priority, **kwargs)
+        if fallback is not None and self._refused(fut):
+            return fallback() if callable(fallback) else fallback
+        afut = asyncio.wrap_future(fut)
+        done, _ = await asyncio.wait({afut}, timeout=timeout)
+        if not done:
+            shed, value = self._shed(fut, fallback)
+            if shed:
+                return value
+        return await afut
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["queued"] = self._queue.qsize()
+        out["max_concurrency"] = self.max_concurrency
+        out["max_queue"] = self.max_queue
+        return out
+
+
+gateway = LLMGateway(settings.LLM_MAX_CONCURRENCY, settings.LLM_QUEUE_DEADLINE_S, settings.LLM_MAX_QUEUE)
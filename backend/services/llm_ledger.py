@@ -0,0 +1,239 @@
+# backend/services/llm_ledger.py
+"""
+Append-only ledger of every LLM call: tokens, latency, outcome.
+
+Request threads only append a tuple to an in-memory buffer and update the
+rolling per-hour aggregates; a background writer flushes the buffer to the
+``llm_calls`` SQLite table every ``LLM_LEDGER_FLUSH_S`` (one
+``executemany`` per flush), so the hot path never waits on disk.
+
+A call that needed more than one attempt (a hedge, a failover) writes one
+row per attempt: the used attempt under the call's own outcome, the others
+as ``error`` or — when a losing attempt still returned (and was billed) —
+``discarded``. A stream stopped because its caller's deadline passed is
+``abandoned`` (billed for what was generated, but nothing of it was used).
+
+Aggregates keep the last ``HOURS_KEPT`` hours in memory with a bounded
+latency sample per hour, which is what ``/reco/llm/usage`` reports
+(per-hour cost and latency percentiles). The table holds the full history
+for offline analysis.
+"""
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+OUTCOMES = ("parsed", "fallback", "error", "discarded", "abandoned")
+HOURS_KEPT = 48
+SAMPLES_PER_HOUR = 2000
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q / 100.0 * len(sorted_values)))], 1)
+
+
+class CallRecord:
+    """Timing and token counts for one call; finish() hands it to the ledger."""
+
+    def __init__(self, ledger, kind: str, prompt_version: str, messages: list):
+        self.ledger = ledger
+        self.kind = kind
+        self.prompt_version = prompt_version
+        self.prompt_chars = sum(len(m.get("content") or "") for m in messages or [])
+        self.t0 = time.perf_counter()
+        self.ttft_ms = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.output_chars = 0
+        self.provider = ""
+        self.model = ""
+        self._done = False
+
+    def first_token(self):
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.t0) * 1000.0
+
+    def add_output(self, text: str):
+        self.first_token()
+        self.output_chars += len(text or "")
+
+    def set_usage(self, usage):
+        """Take exact counts from an SDK ``usage`` object when the API sent one."""
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, "prompt_tokens", None)
+            self.completion_tokens = getattr(usage, "completion_tokens", None)
+
+    def set_source(self, provider: str, model: str):
+        self.provider, self.model = provider or "", model or ""
+
+    def attempt(self, provider: str, model: str, outcome: str, usage=None):
+        """Ledger row for an extra attempt of this call (failed, or a hedge loser)."""
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        if prompt is None and outcome == "discarded":
+            prompt = self.prompt_chars // 4  # the request was served, so its prompt was billed
+        latency_ms = (time.perf_counter() - self.t0) * 1000.0
+        self.ledger.record(
+            self.kind, outcome, provider, model, self.prompt_version,
+            prompt, completion, None, latency_ms,
+        )
+
+    def finish(self, outcome: str):
+        if self._done:
+            return
+        self._done = True
+        latency_ms = (time.perf_counter() - self.t0) * 1000.0
+        prompt = self.prompt_tokens if self.prompt_tokens is not None else self.prompt_chars // 4
+        completion = self.completion_tokens if self.completion_tokens is not None else self.output_chars // 4
+        self.ledger.record(
+            self.kind, outcome, self.provider, self.model, self.prompt_version,
+            prompt, completion, self.ttft_ms, latency_ms,
+        )
+
+
+class LLMLedger:
+    def __init__(self, path: str, flush_s: float, enabled: bool = True):
+        self.path = path
+        self.flush_s = flush_s
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._hours = {}  # hour start (epoch s) -> aggregate dict
+        self._write_lock = threading.Lock()
+        self._conn = None
+        self._writer = None
+        self._rng = random.Random()
+        self._written = 0
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+    def start(self, kind: str, prompt_version: str = "", messages: list = None) -> CallRecord:
+        return CallRecord(self, kind, prompt_version, messages)
+
+    def record(self, kind, outcome, provider, model, prompt_version, prompt_tokens, completion_tokens, ttft_ms, latency_ms):
+        if not self.enabled:
+            return
+        now = time.time()
+        row = (now, kind, outcome, provider, model, prompt_version, int(prompt_tokens or 0),
+               int(completion_tokens or 0), None if ttft_ms is None else round(ttft_ms, 1), round(latency_ms, 1))
+        with self._lock:
+            self._buffer.append(row)
+            self._aggregate(row)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="llm-ledger", daemon=True)
+                self._writer.start()
+
+    def _aggregate(self, row):
+        ts, kind, outcome, _, model, _, p_tok, c_tok, ttft, latency = row
+        hour = int(ts // 3600 * 3600)
+        agg = self._hours.get(hour)
+        if agg is None:
+            agg = self._hours[hour] = {
+                "calls": 0, "outcomes": dict.fromkeys(OUTCOMES, 0), "kinds": {}, "models": {},
+                "prompt_tokens": 0, "completion_tokens": 0, "latency": [], "ttft": [],
+                "seen": {"latency": 0, "ttft": 0},
+            }
+            for old in sorted(self._hours)[:-HOURS_KEPT]:
+                del self._hours[old]
+        agg["calls"] += 1
+        agg["outcomes"][outcome] = agg["outcomes"].get(outcome, 0) + 1
+        agg["kinds"][kind] = agg["kinds"].get(kind, 0) + 1
+        if model:
+            agg["models"][model] = agg["models"].get(model, 0) + 1
+        agg["prompt_tokens"] += p_tok
+        agg["completion_tokens"] += c_tok
+        for key, value in (("latency", latency), ("ttft", ttft)):
+            if value is None:
+                continue
+            samples = agg[key]
+            # reservoir sample over the values seen for this key: bounded
+            # memory, unbiased percentiles (not every call has a ttft)
+            agg["seen"][key] += 1
+            n = agg["seen"][key]
+            if len(samples) < SAMPLES_PER_HOUR:
+                samples.append(value)
+            elif self._rng.randrange(n) < SAMPLES_PER_HOUR:
+                samples[self._rng.randrange(SAMPLES_PER_HOUR)] = value
+
+    # -----------------------------
+    # Background writer
+    # -----------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_calls ("
+            " ts REAL NOT NULL, kind TEXT NOT NULL, outcome TEXT NOT NULL, provider TEXT, model TEXT,"
+            " prompt_version TEXT, prompt_tokens INTEGER, completion_tokens INTEGER,"
+            " ttft_ms REAL, latency_ms REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_calls_ts ON llm_calls (ts)")
+        return conn
+
+    def _write_pending(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        with self._write_lock:
+            try:
+                self._conn = self._conn or self._connect()
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT INTO llm_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+                self._written += len(rows)
+            except sqlite3.Error as e:
+                log.warning("llm ledger write failed", extra={"error": str(e), "rows": len(rows)})
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.flush_s)
+            self._write_pending()
+
+    def flush(self):
+        """Write everything buffered so far (e.g. at shutdown)."""
+        self._write_pending()
+
+    # -----------------------------
+    # Reporting
+    # -----------------------------
+    def usage(self, hours: int = 24) -> dict:
+        price_in = settings.LLM_PRICE_INPUT_PER_M
+        price_out = settings.LLM_PRICE_OUTPUT_PER_M
+        cutoff = int(time.time() // 3600 * 3600) - (max(1, hours) - 1) * 3600
+        out = []
+        with self._lock:
+            snapshot = {h: dict(a, latency=sorted(a["latency"]), ttft=sorted(a["ttft"]),
+                                outcomes=dict(a["outcomes"]), kinds=dict(a["kinds"]), models=dict(a["models"]))
+                        for h, a in self._hours.items() if h >= cutoff}
+            pending = len(self._buffer)
+        for hour in sorted(snapshot):
+            a = snapshot[hour]
+            cost = (a["prompt_tokens"] * price_in + a["completion_tokens"] * price_out) / 1e6
+            out.append({
+                "hour": time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime(hour)),
+                "calls": a["calls"],
+                "outcomes": a["outcomes"],
+                "kinds": a["kinds"],
+                "models": a["models"],
+                "prompt_tokens": a["prompt_tokens"],
+                "completion_tokens": a["completion_tokens"],
+                "cost_usd": round(cost, 6),
+                "latency_ms": {f"p{q}": _percentile(a["latency"], q) for q in (50, 95, 99)},
+                "ttft_ms": {f"p{q}": _percentile(a["ttft"], q) for q in (50, 95, 99)},
+            })
+        return {"hours": out, "pending_writes": pending, "written": self._written}
+
+
+ledger = LLMLedger(settings.LLM_LEDGER_PATH, settings.LLM_LEDGER_FLUSH_S, settings.LLM_LEDGER_ENABLED)
@@ -0,0 +1,108 @@
+# backend/services/microbatch.py
+"""
+Micro-batching: gather calls that arrive within a short window and run
+them as one batch.
+
+The first item opens a window of ``window_s``; the batch is dispatched when
+the window closes or ``max_batch`` items are waiting, whichever comes first,
+so no caller waits more than ``window_s`` longer than it would alone. The
+batch function receives the list of items and returns one result per item,
+in order; each caller gets its own result (or the batch's exception).
+Async callers may bound their wait (``timeout``) and take a ``fallback``
+instead; the batch still finishes for everyone else.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, window_s: float, max_batch: int, dispatch=None, name="microbatch"):
+        self.run_batch = run_batch
+        self.window_s = window_s
+        self.max_batch = max(1, int(max_batch))
+        # dispatch(fn, batch) -> Future; default runs the batch on the dispatcher thread
+        self.dispatch = dispatch
+        self.name = name
+        self._cond = threading.Condition()
+        self._pending = []  # (arrival time, item, future)
+        self._thread = None
+        self._stats = {"items": 0, "batches": 0, "largest": 0, "timeouts": 0}
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item) -> Future:
+        fut = Future()
+        with self._cond:
+            self._ensure_thread()
+            self._pending.append((time.monotonic(), item, fut))
+            self._cond.notify()
+        return fut
+
+    def call(self, item, timeout: float = None):
+        return self.submit(item).result(timeout=timeout)
+
+    async def acall(self, item, timeout: float = None, fallback=None):
+        fut = asyncio.wrap_future(self.submit(item))
+        done, _ = await asyncio.wait({fut}, timeout=timeout)
+        if not done:
+            with self._cond:
+                self._stats["timeouts"] += 1
+            return fallback() if callable(fallback) else fallback
+        return await fut
+
+    # -----------------------------
+    # Dispatcher
+    # -----------------------------
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                close_at = self._pending[0][0] + self.window_s
+                while len(self._pending) < self.max_batch:
+                    remaining = close_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                self._stats["items"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["largest"] = max(self._stats["largest"], len(batch))
+            self._start(batch)
+
+    def _start(self, batch):
+        items = [item for _, item, _ in batch]
+        futures = [fut for _, _, fut in batch]
+        if self.dispatch is None:
+            done = Future()
+            try:
+                done.set_result(self.run_batch(items))
+            except BaseException as e:
+                done.set_exception(e)
+        else:
+            done = self.dispatch(self.run_batch, items)
+        done.add_done_callback(lambda f: self._resolve(f, futures))
+
+    @staticmethod
+    def _resolve(done: Future, futures):
+        error = RuntimeError("batch was cancelled before it ran") if done.cancelled() else done.exception()
+        results = None if error else done.result()
+        if error is None and (not isinstance(results, list) or len(results) != len(futures)):
+            error = RuntimeError("batch returned the wrong number of results")
+        for i, fut in enumerate(futures):
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(results[i])
+
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out["waiting"] = len(self._pending)
+        out["mean_batch"] = round(out["items"] / out["batches"], 2) if out["batches"] else 0.0
+        return out
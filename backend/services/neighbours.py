@@ -0,0 +1,349 @@
+# backend/services/neighbours.py
+"""
+"Households like you": k-nearest-neighbour search over stored runs.
+
+Each run becomes a 5-d vector: its four category shares (the mix of its
+footprint) plus a lightly weighted log of its total (its size), so the
+neighbours of a footprint are households with a similar mix at a similar
+scale. Their median totals show what similar households emit, and the gap
+to your own totals is the saving they demonstrate.
+
+Two index types over the same vectors:
+    exact   sklearn KDTree
+    approx  random-projection tree: median splits on random directions
+            give balanced leaves; a query scans its own leaf plus a few
+            neighbouring ones (least-certain split first) and re-ranks
+            those candidates exactly, so its cost does not grow with n.
+``NN_MODE=auto`` uses the exact tree up to ``NN_EXACT_MAX_POINTS`` rows.
+At most ``NN_MAX_POINTS`` runs are indexed (uniform reservoir sample), so
+memory stays bounded however many runs are stored.
+
+NeighbourService rebuilds the index from the database in a background
+thread every ``NN_REBUILD_S`` (only when new runs arrived) and swaps it in
+atomically; runs saved in between are kept in a preallocated delta buffer
+(ids, totals and their vectors) that queries scan directly. Indexes keep
+each row's run id, so a caller can leave its own run out of the result.
+"""
+import logging
+import threading
+import time
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+AXES = ("energy", "travel", "food", "goods")
+SCALE_WEIGHT = 0.05  # weight of log(total) against the category shares
+MAX_DELTA = 50_000
+
+
+def vectors(totals):
+    """``[n, 5]`` float32 search vectors from ``[n, 4]`` category totals."""
+    import numpy as np
+
+    x = np.clip(np.asarray(totals, dtype=np.float64).reshape(-1, len(AXES)), 0, None)
+    total = x.sum(axis=1, keepdims=True)
+    shares = x / np.where(total > 0, total, 1.0)
+    return np.hstack([shares, SCALE_WEIGHT * np.log1p(total)]).astype(np.float32)
+
+
+def _as_row(totals: dict):
+    return [float(totals.get(a) or 0) for a in AXES]
+
+
+# -----------------------------
+# Index types
+# -----------------------------
+class ExactIndex:
+    mode = "exact"
+
+    def __init__(self, totals, ids=None):
+        import numpy as np
+        from sklearn.neighbors import KDTree
+
+        self.totals = totals
+        self.ids = np.zeros(len(totals), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.tree = KDTree(vectors(totals), leaf_size=40)
+
+    def __len__(self):
+        return len(self.totals)
+
+    def query(self, v, k):
+        k = min(k, len(self))
+        dist, idx = self.tree.query(v.reshape(1, -1), k=k)
+        return dist[0], idx[0]
+
+
+class ProjectionIndex:
+    """Random-projection tree: every node splits its rows at the median of
+    their projection on a random direction, so leaves hold ~``leaf_size``
+    rows whatever the data's shape. Rows are stored in leaf order; a query
+    descends to its leaf and also probes the leaves behind the ``probes``
+    closest split decisions, then re-ranks those candidates exactly.
+    """
+
+    mode = "approx"
+
+    def __init__(self, totals, leaf_size: int = 128, probes: int = 3, seed: int = 0, ids=None):
+        import numpy as np
+
+        v = vectors(totals)
+        n = len(v)
+        rng = np.random.default_rng(seed)
+        self.depth = max(0, int(np.ceil(np.log2(max(1, n) / leaf_size))))
+        self.probes = probes
+        self.dirs, self.thresholds = [], []
+        order = np.arange(n)
+        bounds = np.array([0, n])
+        for level in range(self.depth):
+            nodes = 1 << level
+            dirs = rng.standard_normal((nodes, v.shape[1])).astype(np.float32)
+            node_of = np.repeat(np.arange(nodes), np.diff(bounds))
+            proj = np.einsum("ij,ij->i", v[order], dirs[node_of])
+            perm = np.lexsort((proj, node_of))
+            order, proj = order[perm], proj[perm]
+            size = np.diff(bounds)
+            mid = bounds[:-1] + size // 2
+            # threshold halfway between the two middle rows (tiny nodes split at 0)
+            below, above = np.clip(mid - 1, 0, n - 1), np.clip(mid, 0, n - 1)
+            thr = np.where(size > 1, (proj[below] + proj[above]) / 2, 0)
+            self.dirs.append(dirs)
+            self.thresholds.append(thr.astype(np.float32))
+            # children of node j are 2j (rows below the median) and 2j + 1
+            bounds = np.append(np.column_stack([bounds[:-1], mid]).ravel(), n)
+        self.bounds = bounds
+        self.vectors = v[order]
+        self.totals = totals[order]
+        self.ids = np.zeros(n, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)[order]
+
+    def __len__(self):
+        return len(self.totals)
+
+    def _leaf(self, v, node=0, level=0, margins=None):
+        for lvl in range(level, self.depth):
+            p = float(self.dirs[lvl][node] @ v) - float(self.thresholds[lvl][node])
+            right = p >= 0
+            if margins is not None:
+                margins.append((abs(p), lvl, 2 * node + (not right)))
+            node = 2 * node + right
+        return node
+
+    def query(self, v, k):
+        import numpy as np
+
+        margins = []
+        leaves = [self._leaf(v, margins=margins)]
+        # the sibling subtrees behind the least certain splits
+        for _, lvl, sibling in sorted(margins)[:self.probes]:
+            leaves.append(self._leaf(v, sibling, lvl + 1))
+        cand = np.concatenate([np.arange(self.bounds[leaf], self.bounds[leaf + 1]) for leaf in leaves])
+        if not len(cand):
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        diff = self.vectors[cand] - v
+        dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        if len(cand) > k:
+            part = np.argpartition(dist, k)[:k]
+            cand, dist = cand[part], dist[part]
+        top = np.argsort(dist)
+        return dist[top], cand[top]
+
+
+def build_index(totals, mode: str = "auto", ids=None):
+    if mode == "auto":
+        mode = "exact" if len(totals) <= settings.NN_EXACT_MAX_POINTS else "approx"
+    if mode == "exact":
+        return ExactIndex(totals, ids)
+    return ProjectionIndex(totals, settings.NN_LEAF_SIZE, settings.NN_PROBES, ids=ids)
+
+
+def summarise(totals: dict, neighbour_totals) -> dict:
+    """Median neighbour footprint and the saving it implies for ``totals``."""
+    import numpy as np
+
+    median = np.median(neighbour_totals, axis=0)
+    you = np.asarray(_as_row(totals))
+    by_category = {a: round(float(m), 1) for a, m in zip(AXES, median)}
+    savings = {a: round(float(max(0.0, y - m)), 1) for a, y, m in zip(AXES, you, median)}
+    total = neighbour_totals.sum(axis=1)
+    return {
+        "k": int(len(neighbour_totals)),
+        "median_total_kg": round(float(np.median(total)), 1),
+        "median_by_category": by_category,
+        "savings_kg_month": round(sum(savings.values()), 1),
+        "savings_by_category": savings,
+        "share_emitting_less": round(float((total < you.sum()).mean()), 2),
+    }
+
+
+# -----------------------------
+# Service: background rebuilds + delta buffer
+# -----------------------------
+class NeighbourService:
+    def __init__(self, mode: str = "auto", max_points: int = 1_000_000, rebuild_s: float = 300.0, seed: int = 0):
+        self.mode = mode
+        self.max_points = max_points
+        self.rebuild_s = rebuild_s
+        self._index = None
+        self._built_upto = 0  # highest run id in the current index
+        # runs saved since the build: ids, [energy, travel, food, goods] and
+        # their search vectors in arrays of MAX_DELTA rows (allocated on first
+        # add); rows [0, _delta_n) are live. Appends only write past
+        # _delta_n, and a rebuild swaps in fresh arrays, so queries can scan
+        # a snapshot outside the lock.
+        self._delta = None  # (ids, rows, vectors)
+        self._delta_n = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._seed = seed
+        self._stats = {"builds": 0, "last_build_ms": None, "queries": 0}
+
+    def _load_runs(self):
+        """(max id, reservoir sample of at most max_points category rows, their ids)."""
+        import numpy as np
+        from sqlalchemy import func, select
+        from backend.db import models
+        from backend.db.session import session_factory
+
+        rng = np.random.default_rng(self._seed)
+        seen, max_id = 0, 0
+        cols = (models.FootprintRun.id, models.FootprintRun.energy_kg, models.FootprintRun.travel_kg,
+                models.FootprintRun.food_kg, models.FootprintRun.goods_kg)
+        with session_factory() as db:
+            cap = min(self.max_points, db.query(func.count(models.FootprintRun.id)).scalar() or 0)
+            sample = np.empty((cap, len(AXES)), dtype=np.float32)
+            ids = np.empty(cap, dtype=np.int64)
+            stmt = select(*cols).order_by(models.FootprintRun.id).execution_options(yield_per=50_000)
+            for chunk in db.execute(stmt).partitions():
+                rows = np.array([[v or 0 for v in r] for r in chunk], dtype=np.float64)
+                max_id = int(rows[-1, 0])
+                run_ids, rows = rows[:, 0].astype(np.int64), rows[:, 1:]
+                fill = max(0, min(len(rows), cap - seen))
+                sample[seen:seen + fill] = rows[:fill]
+                ids[seen:seen + fill] = run_ids[:fill]
+                # Algorithm R, vectorised: row t replaces a random slot with probability cap / t
+                rest = rows[fill:]
+                if len(rest):
+                    t = np.arange(seen + fill + 1, seen + len(rows) + 1)
+                    slots = (rng.random(len(rest)) * t).astype(np.int64)
+                    keep = slots < cap
+                    sample[slots[keep]] = rest[keep]
+                    ids[slots[keep]] = run_ids[fill:][keep]
+                seen += len(rows)
+        n = min(seen, cap)
+        return max_id, sample[:n], ids[:n]
+
+    def rebuild(self, force: bool = False):
+        from sqlalchemy import func
+        from backend.db import models
+        from backend.db.session import session_factory
+
+        with session_factory() as db:
+            max_id = db.query(func.max(models.FootprintRun.id)).scalar() or 0
+        if not force and self._index is not None and max_id == self._built_upto:
+            return False
+        t0 = time.perf_counter()
+        built_upto, totals, ids = self._load_runs()
+        index = build_index(totals, self.mode, ids) if len(totals) else None
+        with self._lock:
+            self._index, self._built_upto = index, built_upto
+            if self._delta is not None:
+                live = self._delta[0][:self._delta_n] > built_upto
+                fresh = self._alloc_delta()
+                self._delta_n = int(live.sum())
+                for old, new in zip(self._delta, fresh):
+                    new[:self._delta_n] = old[:len(live)][live]
+                self._delta = fresh
+            self._stats["builds"] += 1
+            self._stats["last_build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return True
+
+    def _loop(self):
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                log.warning("neighbour index rebuild failed", extra={"error": str(e)})
+            time.sleep(self.rebuild_s)
+
+    def start(self):
+        """Build in the background now, then refresh every ``rebuild_s``."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="nn-index", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _alloc_delta():
+        import numpy as np
+
+        return (
+            np.zeros(MAX_DELTA, dtype=np.int64),
+            np.empty((MAX_DELTA, len(AXES)), dtype=np.float64),
+            np.empty((MAX_DELTA, len(AXES) + 1), dtype=np.float32),
+        )
+
+    def add(self, run_id: int, totals: dict):
+        """Make a freshly saved run searchable before the next rebuild.
+
+        A run with the same totals as one already buffered (the same form
+        computed again) is left to the next rebuild rather than buffered twice.
+        """
+        row = _as_row(totals)
+        with self._lock:
+            if self._delta is None:
+                self._delta = self._alloc_delta()
+            ids, rows, vecs = self._delta
+            n = self._delta_n
+            if n >= MAX_DELTA or run_id <= self._built_upto or (ids[:n] == run_id).any():
+                return
+            if (rows[:n] == row).all(axis=1).any():
+                return
+            ids[n], rows[n], vecs[n] = run_id, row, vectors([row])[0]
+            self._delta_n = n + 1
+
+    def similar(self, totals: dict, k: int = None, exclude: int = None):
+        """Summary of the ``k`` most similar stored runs, or None when empty.
+
+        ``exclude`` is a run id to leave out (the caller's own run).
+        """
+        import numpy as np
+
+        k = k or settings.NN_K
+        with self._lock:
+            index, delta, n = self._index, self._delta, self._delta_n
+            self._stats["queries"] += 1
+        v = vectors([_as_row(totals)])[0]
+        dist, rows = np.empty(0), np.empty((0, len(AXES)))
+        if index is not None:
+            dist, idx = index.query(v, k + (exclude is not None))
+            if exclude is not None:
+                keep = index.ids[idx] != exclude
+                dist, idx = dist[keep][:k], idx[keep][:k]
+            rows = np.asarray(index.totals[idx], dtype=np.float64)
+        if n:
+            ids, extra, vecs = (a[:n] for a in delta)
+            if exclude is not None:
+                keep = ids != exclude
+                extra, vecs = extra[keep], vecs[keep]
+            diff = vecs - v
+            dist = np.concatenate([dist, np.sqrt(np.einsum("ij,ij->i", diff, diff))])
+            rows = np.vstack([rows, extra])
+            if len(dist) > k:
+                top = np.argpartition(dist, k)[:k]
+                rows = rows[top]
+        if not len(rows):
+            return None
+        out = summarise(totals, rows)
+        out["mode"] = index.mode if index is not None else "delta"
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["indexed"] = len(self._index) if self._index is not None else 0
+            out["mode"] = self._index.mode if self._index is not None else None
+            out["delta"] = self._delta_n
+        return out
+
+
+neighbours = NeighbourService(settings.NN_MODE, settings.NN_MAX_POINTS, settings.NN_REBUILD_S)
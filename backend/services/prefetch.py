@@ -0,0 +1,159 @@
+# backend/services/prefetch.py
+"""
+Speculative tip generation, started by /footprint/compute.
+
+Almost every Analyzer run is followed by a visit to AI Recommendations, so
+the compute route schedules the tips generation for that footprint as a
+background gateway job, keyed by the tips prompt hash (the run's content:
+totals, household type, profile). /reco/generate then looks the key up:
+
+- finished         -> the prefetched tips are returned at once
+- running          -> the request waits on that future briefly
+                      (``RECO_PREFETCH_WAIT_S``, or less when its deadline is
+                      sooner), then answers without it; the job still fills
+                      the cache for the next visit
+- still queued     -> the job is cancelled and the request generates itself
+                      at its own (higher) priority
+
+The job first checks the cache, the offline grid and the corpus — when any
+of those already covers the footprint nothing is generated. LLM calls are
+capped by a token bucket (``RECO_PREFETCH_PER_MIN`` / ``_BURST``) and at most
+``RECO_PREFETCH_MAX_PENDING`` prefetches are tracked at once; results nobody
+collects within ``RECO_PREFETCH_TTL_S`` are dropped (and counted as unused).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from backend.core import deadline
+from backend.core.config import settings
+from backend.services.ratelimit import MemoryBucketStore
+
+log = logging.getLogger(__name__)
+
+
+class TipPrefetcher:
+    def __init__(self, per_min: float, burst: int, max_pending: int, ttl_s: float):
+        self.rate = per_min / 60.0
+        self.burst = max(1, burst)
+        self.max_pending = max_pending
+        self.ttl_s = ttl_s
+        self._bucket = MemoryBucketStore(max_keys=1)
+        self._entries = OrderedDict()  # key -> (future, scheduled_at)
+        self._lock = threading.Lock()
+        self._stats = {
+            "scheduled": 0, "duplicates": 0, "full": 0, "covered": 0, "over_budget": 0,
+            "generated": 0, "hits": 0, "waited": 0, "taken_over": 0, "timeouts": 0, "unused": 0,
+        }
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _expire(self, now):
+        # callers hold the lock; entries are in schedule order
+        while self._entries:
+            key, (fut, at) = next(iter(self._entries.items()))
+            if now - at < self.ttl_s:
+                break
+            del self._entries[key]
+            if fut is not None and not fut.cancel():
+                self._stats["unused"] += 1
+
+    def take_budget(self) -> bool:
+        """One LLM generation's worth of budget (called by the job itself)."""
+        allowed, _ = self._bucket.take("prefetch", self.rate, self.burst)
+        self.count("generated" if allowed else "over_budget")
+        return allowed
+
+    def schedule(self, key: str, fn, *args) -> bool:
+        """Run ``fn(*args)`` in the background unless ``key`` is already tracked."""
+        from backend.services.llm_gateway import gateway, PRIORITY_BACKGROUND
+
+        with self._lock:
+            self._expire(time.monotonic())
+            if key in self._entries:
+                self._stats["duplicates"] += 1
+                return False
+            if len(self._entries) >= self.max_pending:
+                self._stats["full"] += 1
+                return False
+            self._stats["scheduled"] += 1
+            # reserve the slot before submitting so concurrent computes dedupe
+            self._entries[key] = (None, time.monotonic())
+        fut = gateway.submit(fn, *args, priority=PRIORITY_BACKGROUND)
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (fut, self._entries[key][1])
+        return True
+
+    def _claim(self, key):
+        """The future for ``key`` if it is done or running; a queued job is
+        cancelled (the caller generates at its own priority)."""
+        with self._lock:
+            self._expire(time.monotonic())
+            fut, _ = self._entries.get(key, (None, None))
+            if fut is None:
+                return None
+            if fut.cancel():
+                del self._entries[key]
+                self._stats["taken_over"] += 1
+                return None
+        return fut
+
+    def _collect(self, key, fut):
+        with self._lock:
+            self._entries.pop(key, None)
+        if fut.cancelled() or fut.exception() is not None:
+            return None
+        tips = fut.result()
+        if tips:
+            self.count("hits")
+        return tips or None
+
+    def get(self, key: str, wait_s: float = None):
+        """Prefetched tips for ``key`` (waiting up to ``wait_s`` on a running job), or None."""
+        fut = self._claim(key)
+        if fut is None:
+            return None
+        if not fut.done():
+            self.count("waited")
+            try:
+                fut.result(timeout=deadline.limit(settings.RECO_PREFETCH_WAIT_S if wait_s is None else wait_s))
+            except FutureTimeout:
+                self.count("timeouts")
+                return None
+            except Exception:
+                pass
+        return self._collect(key, fut)
+
+    async def aget(self, key: str, wait_s: float = None):
+        """Async variant: the event loop is never blocked while waiting."""
+        fut = self._claim(key)
+        if fut is None:
+            return None
+        if not fut.done():
+            self.count("waited")
+            timeout = deadline.limit(settings.RECO_PREFETCH_WAIT_S if wait_s is None else wait_s)
+            done, _ = await asyncio.wait({asyncio.wrap_future(fut)}, timeout=timeout)
+            if not done:
+                self.count("timeouts")
+                return None
+        return self._collect(key, fut)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["pending"] = len(self._entries)
+        return out
+
+
+prefetcher = TipPrefetcher(
+    settings.RECO_PREFETCH_PER_MIN,
+    settings.RECO_PREFETCH_BURST,
+    settings.RECO_PREFETCH_MAX_PENDING,
+    settings.RECO_PREFETCH_TTL_S,
+)
@@ -0,0 +1,244 @@
+# backend/services/profile_clf.py
+"""
+Household-profile classifier over the four footprint categories.
+
+A small softmax (multinomial logistic) model on nine features: log1p of
+each category and of the total, plus each category's share of the total.
+Feature scaling is folded into the weights at save time, so inference is
+one matrix product plus a row-wise argmax and classifies whole columns of
+footprints at once.
+
+Files (no pickle; the weights load with ``mmap_mode="r"``):
+    ai/models/profile_clf.npy      float32[n_features + 1, n_labels] (last row = bias)
+    ai/models/feature_map.json     feature names, labels, peer averages, training info
+
+``scripts/train_profile_clf.py`` fits the model on stored FootprintRun rows.
+Stored runs carry no labels, so training targets come from label_footprints()
+(share and size thresholds); the fitted model smooths those hard cut-offs
+into calibrated probabilities.
+
+A model trained on those targets can only approximate the rules it was
+fitted to, so by default get_classifier() serves label_footprints() itself
+(confidence 1.0). The trained model is used only with
+``PROFILE_CLF_MODEL_ENABLED`` and only when every class in its recorded
+``class_accuracy`` reaches ``PROFILE_CLF_MIN_AGREEMENT``; until real labels
+exist it is an experiment, not a replacement.
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+AXES = ("energy", "travel", "food", "goods")
+FEATURES = (
+    "log_energy", "log_travel", "log_food", "log_goods",
+    "share_energy", "share_travel", "share_food", "share_goods",
+    "log_total",
+)
+LABELS = (
+    "low-impact household",
+    "frequent traveller",
+    "car commuter",
+    "energy-heavy home",
+    "meat-heavy diet",
+    "high consumer",
+    "balanced household",
+)
+
+
+def _matrix(totals):
+    """``[n, 4]`` float array from a ``{axis: column}`` dict or an array."""
+    import numpy as np
+
+    if isinstance(totals, dict):
+        cols = [np.atleast_1d(np.nan_to_num(np.asarray(totals.get(a, 0), dtype=np.float64))) for a in AXES]
+        n = max(len(c) for c in cols)
+        return np.column_stack([np.broadcast_to(c, n) for c in cols])
+    return np.asarray(totals, dtype=np.float64).reshape(-1, len(AXES))
+
+
+def features(totals):
+    """``[n, len(FEATURES)]`` feature matrix for a batch of footprints."""
+    import numpy as np
+
+    x = np.clip(_matrix(totals), 0, None)
+    total = x.sum(axis=1, keepdims=True)
+    shares = x / np.where(total > 0, total, 1.0)
+    return np.hstack([np.log1p(x), shares, np.log1p(total)])
+
+
+def label_footprints(totals):
+    """Rule-based training targets (indices into LABELS), first match wins."""
+    import numpy as np
+
+    x = np.clip(_matrix(totals), 0, None)
+    total = x.sum(axis=1)
+    share = x / np.where(total > 0, total, 1.0)[:, None]
+    energy, travel, food, goods = share.T
+    # a dominant share only names the household when the amount is large too:
+    # an average mixed diet alone (~160 kg) is not a "meat-heavy diet"
+    conditions = [
+        total < 150,
+        (travel >= 0.45) & (x[:, 1] >= 150),
+        (travel >= 0.35) & (x[:, 1] >= 60),
+        (energy >= 0.40) & (x[:, 0] >= 120),
+        (food >= 0.40) & (x[:, 2] >= 200),
+        (goods >= 0.30) & (x[:, 3] >= 60),
+    ]
+    return np.select(conditions, np.arange(len(conditions)), default=len(LABELS) - 1)
+
+
+class ProfileClassifier:
+    def __init__(self, weights, labels, peer_avg=None, info=None):
+        self.weights = weights  # [n_features + 1, n_labels], scaling folded in; None = the rules
+        self.labels = list(labels)
+        self.peer_avg = dict(peer_avg or {})
+        self.info = dict(info or {})
+
+    # -----------------------------
+    # Inference
+    # -----------------------------
+    def predict_proba(self, totals):
+        import numpy as np
+
+        if self.weights is None:
+            return np.eye(len(LABELS))[label_footprints(totals)]
+        x = features(totals)
+        logits = x @ self.weights[:-1] + self.weights[-1]
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict_batch(self, totals):
+        """Label indices and their probabilities for a whole batch."""
+        import numpy as np
+
+        p = self.predict_proba(totals)
+        idx = p.argmax(axis=1)
+        return idx, p[np.arange(len(idx)), idx]
+
+    def classify(self, totals: dict) -> dict:
+        idx, confidence = self.predict_batch(totals)
+        label = self.labels[int(idx[0])]
+        return {"profile": label, "confidence": round(float(confidence[0]), 3), "peer_avg_kg_month": self.peer_avg.get(label)}
+
+    # -----------------------------
+    # File I/O
+    # -----------------------------
+    def save(self, weights_path, map_path):
+        import numpy as np
+
+        Path(weights_path).parent.mkdir(parents=True, exist_ok=True)
+        np.save(weights_path, np.ascontiguousarray(self.weights, dtype=np.float32), allow_pickle=False)
+        meta = {"features": list(FEATURES), "axes": list(AXES), "labels": self.labels, "peer_avg_kg_month": self.peer_avg, **self.info}
+        Path(map_path).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, weights_path, map_path):
+        import numpy as np
+
+        meta = json.loads(Path(map_path).read_text(encoding="utf-8"))
+        if meta.get("features") != list(FEATURES):
+            raise ValueError("feature map does not match this code's features")
+        weights = np.load(weights_path, mmap_mode="r", allow_pickle=False)
+        if weights.shape != (len(FEATURES) + 1, len(meta["labels"])):
+            raise ValueError(f"weights have shape {weights.shape}")
+        info = {k: v for k, v in meta.items() if k not in ("features", "axes", "labels", "peer_avg_kg_month")}
+        return cls(weights, meta["labels"], meta.get("peer_avg_kg_month"), info)
+
+
+# -----------------------------
+# Training
+# -----------------------------
+def fit(totals, labels=None, epochs: int = 400, lr: float = 0.5, l2: float = 1e-3) -> ProfileClassifier:
+    """Full-batch gradient descent on the softmax cross-entropy."""
+    import numpy as np
+
+    x = features(totals)
+    y = label_footprints(totals) if labels is None else np.asarray(labels)
+    k = len(LABELS)
+    mean, std = x.mean(axis=0), x.std(axis=0)
+    std[std == 0] = 1.0
+    z = (x - mean) / std
+    onehot = np.eye(k)[y]
+    w, b = np.zeros((z.shape[1], k)), np.zeros(k)
+    for _ in range(epochs):
+        logits = z @ w + b
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        p /= p.sum(axis=1, keepdims=True)
+        grad = (p - onehot) / len(z)
+        w -= lr * (z.T @ grad + l2 * w)
+        b -= lr * grad.sum(axis=0)
+
+    # fold the standardisation into the weights: inference takes raw features
+    folded = np.vstack([w / std[:, None], b - (mean / std) @ w])
+    total = _matrix(totals).sum(axis=1)
+    peer_avg = {LABELS[i]: round(float(total[y == i].mean()), 1) for i in range(k) if (y == i).any()}
+    clf = ProfileClassifier(folded, LABELS, peer_avg)
+    idx, _ = clf.predict_batch(totals)
+    clf.info = {
+        "trained_on": int(len(z)),
+        "train_accuracy": round(float((idx == y).mean()), 4),
+        "class_accuracy": {LABELS[i]: round(float((idx[y == i] == i).mean()), 4) for i in range(k) if (y == i).any()},
+    }
+    return clf
+
+
+# -----------------------------
+# Process-wide instance
+# -----------------------------
+_clf = None
+_clf_loaded = False
+_clf_lock = threading.Lock()
+
+
+def _peer_avg(fmap: Path) -> dict:
+    try:
+        return json.loads(fmap.read_text(encoding="utf-8")).get("peer_avg_kg_month") or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _trained_model(weights: Path, fmap: Path):
+    """The trained model, or None when it is missing or agrees too little with the rules."""
+    if not (weights.exists() and fmap.exists()):
+        return None
+    try:
+        clf = ProfileClassifier.load(weights, fmap)
+    except Exception as e:
+        log.warning("could not load profile classifier", extra={"path": str(weights), "error": str(e)})
+        return None
+    agreement = clf.info.get("class_accuracy") or {}
+    worst = min((agreement.get(label, 0.0) for label in clf.labels), default=0.0)
+    if worst < settings.PROFILE_CLF_MIN_AGREEMENT:
+        log.warning("profile classifier agrees too little with the rules; using the rules",
+                    extra={"path": str(weights), "min_class_accuracy": worst})
+        return None
+    return clf
+
+
+def get_classifier():
+    """The household-profile classifier: label_footprints() unless a trained
+    model is enabled and good enough (see the module docstring)."""
+    global _clf, _clf_loaded
+    if not _clf_loaded:
+        with _clf_lock:
+            if not _clf_loaded:
+                weights, fmap = Path(settings.PROFILE_CLF_PATH), Path(settings.PROFILE_FEATURE_MAP_PATH)
+                clf = _trained_model(weights, fmap) if settings.PROFILE_CLF_MODEL_ENABLED else None
+                _clf = clf or ProfileClassifier(None, LABELS, _peer_avg(fmap), {"source": "rules"})
+                _clf_loaded = True
+    return _clf
+
+
+def household_profile(totals: dict):
+    """Household label for one footprint (None if no classifier is set)."""
+    clf = get_classifier()
+    if clf is None:
+        return None
+    return clf.classify(totals)["profile"]
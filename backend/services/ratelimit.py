@@ -0,0 +1,151 @@
+# backend/services/ratelimit.py
+"""
+Token-bucket rate limiting for the LLM-backed endpoints.
+
+Each (budget, client) pair owns a bucket holding at most ``burst`` tokens
+that refills at ``rate`` tokens per second. A decision is a single dict
+lookup (in-process store) or a single primary-key row update (shared
+SQLite store), so it stays O(1) regardless of how many clients exist.
+The in-process store is an LRU capped at ``max_keys``; the SQLite store
+periodically deletes buckets idle for longer than ``prune_idle_s``.
+"""
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Stores
+# -----------------------------
+class MemoryBucketStore:
+    """Per-process buckets. Good enough for a single uvicorn worker."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets = OrderedDict()  # key -> (tokens, ts), least recently used first
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def take(self, key, rate, burst, cost=1.0, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, _retry_after(tokens, cost, rate)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets shared by every worker on the host through one SQLite file."""
+
+    PRUNE_EVERY = 1000  # takes between deletes of idle buckets
+
+    def __init__(self, path: str, prune_idle_s: float = 3600.0):
+        self.path = path
+        # must exceed the slowest budget's refill time (burst / rate)
+        self.prune_idle_s = prune_idle_s
+        self._takes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, cost=1.0, now=None):
+        # wall clock: monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, ts FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, ts = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, ts = excluded.ts",
+                (key, tokens, now),
+            )
+            if self._due_prune():
+                # an idle bucket has refilled completely, same as a missing one
+                conn.execute("DELETE FROM rate_buckets WHERE ts < ?", (now - self.prune_idle_s,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, _retry_after(tokens, cost, rate)
+
+    def _due_prune(self) -> bool:
+        with self._lock:
+            self._takes += 1
+            return self._takes % self.PRUNE_EVERY == 0
+
+
+def _retry_after(tokens, cost, rate):
+    if tokens >= cost or rate <= 0:
+        return 0.0
+    return (cost - tokens) / rate
+
+
+# -----------------------------
+# Limiter
+# -----------------------------
+class RateLimiter:
+    def __init__(self, budgets: dict, store=None):
+        # budgets: name -> (tokens per second, burst)
+        self.budgets = budgets
+        self.store = store or MemoryBucketStore()
+
+    def check(self, budget: str, client_id: str, cost: float = 1.0):
+        """Return ``(allowed, retry_after_seconds)`` for one request."""
+        rate, burst = self.budgets[budget]
+        try:
+            return self.store.take(f"{budget}:{client_id}", rate, burst, cost)
+        except sqlite3.Error as e:
+            # a locked/broken shared store must never take the API down
+            log.warning("rate limit store failed, allowing request", extra={"error": str(e)})
+            return True, 0.0
+
+
+def _build_limiter():
+    budgets = {
+        "tips": (settings.RATE_LIMIT_TIPS_PER_MIN / 60.0, settings.RATE_LIMIT_TIPS_BURST),
+        "chat": (settings.RATE_LIMIT_CHAT_PER_MIN / 60.0, settings.RATE_LIMIT_CHAT_BURST),
+        "feedback": (settings.RATE_LIMIT_FEEDBACK_PER_MIN / 60.0, settings.RATE_LIMIT_FEEDBACK_BURST),
+    }
+    store = SQLiteBucketStore(settings.RATE_LIMIT_SQLITE_PATH) if settings.RATE_LIMIT_SQLITE_PATH else None
+    return RateLimiter(budgets, store)
+
+
+limiter = _build_limiter()
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
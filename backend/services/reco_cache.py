@@ -0,0 +1,172 @@
+# backend/services/reco_cache.py
+"""
+Persistent cache of LLM tip lists, keyed on *bucketed* footprints.
+
+The tips prompt only depends on the category totals, the profile string and
+the prompt template, so two users whose totals fall into the same
+``RECO_CACHE_BUCKET_KG`` buckets can share one generation. Entries live in a
+small SQLite table with LRU eviction (``last_access``) and a TTL:
+
+- younger than ``RECO_CACHE_TTL_S``       -> fresh hit
+- older, but younger than ``..._MAX_STALE_S`` -> served, refreshed in background
+- older than that                          -> miss
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+CATEGORIES = ("energy", "travel", "food", "goods")
+
+
+def bucket_totals(totals: dict, bucket_kg: float = None) -> tuple:
+    bucket_kg = bucket_kg or settings.RECO_CACHE_BUCKET_KG
+    return tuple(int(float(totals.get(c) or 0) // bucket_kg) for c in CATEGORIES)
+
+
+def cache_key(totals: dict, profile: str, prompt_version: str) -> str:
+    from backend.services.profile_clf import household_profile
+
+    buckets = ",".join(str(b) for b in bucket_totals(totals))
+    # the household type is part of the tips prompt, and can change within a bucket
+    household = household_profile(totals) or ""
+    return f"{prompt_version}|{(profile or '').strip().lower()}|{household}|{buckets}"
+
+
+class RecoCache:
+    def __init__(self, path: str, ttl_s: float, max_stale_s: float, max_entries: int):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_stale_s = max(max_stale_s, ttl_s)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._size = None  # row estimate; recounted only once it passes max_entries
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "refreshes": 0}
+
+    # -----------------------------
+    # Storage
+    # -----------------------------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reco_cache ("
+                " key TEXT PRIMARY KEY, tips TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_reco_cache_last_access ON reco_cache (last_access)")
+            self._local.conn = conn
+        return conn
+
+    def warm(self):
+        self._conn().execute("SELECT COUNT(*) FROM reco_cache").fetchone()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def get(self, key: str, refresh=None):
+        """Return cached tips (or None). ``refresh`` regenerates a stale entry."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT tips, created_at FROM reco_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_stale_s:
+                self._count("misses")
+                return None
+            conn.execute("UPDATE reco_cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            log.warning("reco cache read failed", extra={"error": str(e)})
+            self._count("misses")
+            return None
+
+        if now - row[1] > self.ttl_s:
+            self._count("stale_hits")
+            if refresh is not None:
+                self._refresh_in_background(key, refresh)
+        else:
+            self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, key: str, tips: list):
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT INTO reco_cache (key, tips, created_at, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tips = excluded.tips,"
+                " created_at = excluded.created_at, last_access = excluded.last_access",
+                (key, json.dumps(tips), now, now),
+            )
+            self._count("stores")
+            self._evict(conn)
+        except sqlite3.Error as e:
+            log.warning("reco cache write failed", extra={"error": str(e)})
+
+    def _evict(self, conn):
+        # every put bumps the estimate (upserts of existing keys too, so it only
+        # overshoots); the real COUNT(*) runs when it says the table may be full
+        with self._lock:
+            if self._size is not None:
+                self._size += 1
+                if self._size <= self.max_entries:
+                    return
+        (count,) = conn.execute("SELECT COUNT(*) FROM reco_cache").fetchone()
+        if count > self.max_entries:
+            # drop the least recently used ~10% in one statement so eviction is rare
+            n = count - int(self.max_entries * 0.9)
+            conn.execute(
+                "DELETE FROM reco_cache WHERE key IN "
+                "(SELECT key FROM reco_cache ORDER BY last_access ASC LIMIT ?)",
+                (n,),
+            )
+            count -= n
+        with self._lock:
+            self._size = count
+
+    def _refresh_in_background(self, key, refresh):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                tips = refresh()
+                if tips:
+                    self.put(key, tips)
+                    self._count("refreshes")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        from backend.services.llm_gateway import gateway, PRIORITY_BACKGROUND
+        gateway.submit(run, priority=PRIORITY_BACKGROUND)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        lookups = out["hits"] + out["stale_hits"] + out["misses"]
+        out["hit_rate"] = round((out["hits"] + out["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return out
+
+
+cache = RecoCache(
+    settings.RECO_CACHE_PATH,
+    ttl_s=settings.RECO_CACHE_TTL_S,
+    max_stale_s=settings.RECO_CACHE_MAX_STALE_S,
+    max_entries=settings.RECO_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,197 @@
+# backend/services/reco_grid.py
+"""
+Precomputed tips over a quantised (energy, travel, food, goods, profile) grid.
+
+``scripts/build_reco_grid.py`` fills the grid offline; this module loads the
+result once per worker and answers lookups in O(1): the footprint is mapped
+to a cell number by mixed-radix arithmetic and the cell's tips are sliced
+out of one contiguous UTF-8 JSON blob via an offsets array.
+
+File layout (``np.savez``) — identical tips are stored once and shared:
+    meta          JSON: steps, bins per axis, profiles, prompt version
+    tip_offsets   uint32[n_tips + 1]   (tip j = tip_blob[tip_offsets[j]:tip_offsets[j+1]])
+    tip_blob      uint8[...]           UTF-8 JSON of each distinct tip
+    cell_offsets  uint32[n_cells + 1]  (cell i = cell_tips[cell_offsets[i]:cell_offsets[i+1]])
+    cell_tips     uint32[...]          tip ids per cell; empty slice -> cell missing
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+AXES = ("energy", "travel", "food", "goods")
+
+# Default grid: where nearly all stored runs fall (kg CO₂ / month)
+DEFAULT_STEPS = {"energy": 25, "travel": 25, "food": 40, "goods": 25}
+DEFAULT_BINS = {"energy": 16, "travel": 12, "food": 8, "goods": 6}
+DEFAULT_PROFILES = ["your profile", "your lifestyle", "urban commuter", "student hostel", "frequent flyer", "custom"]
+
+REQUIRED_KEYS = ("title", "text", "impact_kg_month", "confidence", "category")
+CATEGORIES = {"energy", "travel", "food", "goods", "general"}
+
+
+class GridSpec:
+    def __init__(self, steps=None, bins=None, profiles=None, prompt_version=""):
+        self.steps = dict(steps or DEFAULT_STEPS)
+        self.bins = dict(bins or DEFAULT_BINS)
+        self.profiles = [p.strip().lower() for p in (profiles or DEFAULT_PROFILES)]
+        self.prompt_version = prompt_version
+        self._profile_idx = {p: i for i, p in enumerate(self.profiles)}
+
+    @property
+    def n_cells(self):
+        n = len(self.profiles)
+        for a in AXES:
+            n *= self.bins[a]
+        return n
+
+    def cell_index(self, totals: dict, profile: str):
+        """Cell number for a footprint, or None when it lies outside the grid."""
+        p = self._profile_idx.get((profile or "").strip().lower())
+        if p is None:
+            return None
+        idx = p
+        for a in AXES:
+            b = int(float(totals.get(a) or 0) // self.steps[a])
+            if b < 0 or b >= self.bins[a]:
+                return None
+            idx = idx * self.bins[a] + b
+        return idx
+
+    def cell_totals(self, idx: int):
+        """Inverse of cell_index: (bin-centre totals, profile) for cell ``idx``."""
+        totals = {}
+        for a in reversed(AXES):
+            idx, b = divmod(idx, self.bins[a])
+            totals[a] = round((b + 0.5) * self.steps[a], 1)
+        totals["total"] = round(sum(totals[a] for a in AXES), 1)
+        return totals, self.profiles[idx]
+
+    def to_meta(self):
+        return {"steps": self.steps, "bins": self.bins, "profiles": self.profiles, "prompt_version": self.prompt_version}
+
+    @classmethod
+    def from_meta(cls, meta):
+        return cls(meta["steps"], meta["bins"], meta["profiles"], meta.get("prompt_version", ""))
+
+
+def validate_tips(tips, min_valid: int = 3):
+    """Keep well-formed tips only; None if too few survive to be worth storing."""
+    if not isinstance(tips, list):
+        return None
+    valid = []
+    for t in tips:
+        if not isinstance(t, dict) or any(t.get(k) in (None, "") for k in REQUIRED_KEYS):
+            continue
+        try:
+            impact = int(t["impact_kg_month"])
+            confidence = float(t["confidence"])
+        except (TypeError, ValueError):
+            continue
+        if impact < 0 or not 0 <= confidence <= 1:
+            continue
+        if str(t["category"]).strip().lower() not in CATEGORIES:
+            continue
+        valid.append(dict(t, impact_kg_month=impact, confidence=confidence))
+    return valid if len(valid) >= min_valid else None
+
+
+# -----------------------------
+# File I/O
+# -----------------------------
+def save_grid(path, spec: GridSpec, cells: dict):
+    """Write ``{cell_index: tips}`` as a compact indexed file."""
+    import numpy as np
+
+    tip_ids, tip_chunks, tip_offsets = {}, [], [0]
+    cell_offsets = np.zeros(spec.n_cells + 1, dtype=np.uint32)
+    cell_tips = []
+    for i in range(spec.n_cells):
+        for tip in cells.get(i) or []:
+            data = json.dumps(tip, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            j = tip_ids.get(data)
+            if j is None:
+                j = tip_ids[data] = len(tip_chunks)
+                tip_chunks.append(data)
+                tip_offsets.append(tip_offsets[-1] + len(data))
+            cell_tips.append(j)
+        cell_offsets[i + 1] = len(cell_tips)
+
+    meta = np.frombuffer(json.dumps(spec.to_meta()).encode("utf-8"), dtype=np.uint8)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            meta=meta,
+            tip_offsets=np.asarray(tip_offsets, dtype=np.uint32),
+            tip_blob=np.frombuffer(b"".join(tip_chunks), dtype=np.uint8),
+            cell_offsets=cell_offsets,
+            cell_tips=np.asarray(cell_tips, dtype=np.uint32),
+        )
+
+
+class RecoGrid:
+    def __init__(self, spec: GridSpec, tip_offsets, tip_blob: bytes, cell_offsets, cell_tips):
+        self.spec = spec
+        self.tip_offsets = tip_offsets
+        self.tip_blob = tip_blob
+        self.cell_offsets = cell_offsets
+        self.cell_tips = cell_tips
+        self.filled = int((cell_offsets[1:] > cell_offsets[:-1]).sum())
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path) as data:
+            spec = GridSpec.from_meta(json.loads(data["meta"].tobytes()))
+            return cls(spec, data["tip_offsets"], data["tip_blob"].tobytes(), data["cell_offsets"], data["cell_tips"])
+
+    def lookup(self, totals: dict, profile: str):
+        i = self.spec.cell_index(totals, profile)
+        if i is None:
+            return None
+        start, end = int(self.cell_offsets[i]), int(self.cell_offsets[i + 1])
+        if start == end:
+            return None
+        tips = []
+        for j in self.cell_tips[start:end]:
+            a, b = int(self.tip_offsets[j]), int(self.tip_offsets[j + 1])
+            tips.append(json.loads(self.tip_blob[a:b]))
+        return tips
+
+
+# -----------------------------
+# Process-wide instance
+# -----------------------------
+_grid = None
+_grid_loaded = False
+_grid_lock = threading.Lock()
+
+
+def get_grid():
+    """The loaded grid, or None when no grid file has been built."""
+    global _grid, _grid_loaded
+    if not _grid_loaded:
+        with _grid_lock:
+            if not _grid_loaded:
+                path = Path(settings.RECO_GRID_PATH)
+                if path.exists():
+                    try:
+                        _grid = RecoGrid.load(path)
+                    except Exception as e:
+                        log.warning("could not load reco grid", extra={"path": str(path), "error": str(e)})
+                _grid_loaded = True
+    return _grid
+
+
+def grid_tips(totals: dict, profile: str, prompt_version: str):
+    grid = get_grid()
+    # a grid built for another (or an unrecorded) prompt version is stale
+    if grid is None or grid.spec.prompt_version != prompt_version:
+        return None
+    return grid.lookup(totals, profile)
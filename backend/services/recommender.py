@@ -1,12 +1,64 @@
+import asyncio
 import json
-import re
-import os
-from groq import Groq
-from dotenv import load_dotenv
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+from backend.core import deadline
+from backend.core.config import settings
+from backend.core.log import sampled
+from backend.services.microbatch import MicroBatcher
+from backend.services.llm_ledger import ledger
+from backend.services.llm_client import Provider, ResilientLLM, secondary_provider
+from backend.services.profile_clf import household_profile
+from backend.services.reco_cache import cache as reco_cache, cache_key
+from backend.services.singleflight import flights, prompt_hash
+from backend.services.tip_parser import TipStreamParser
+
+log = logging.getLogger(__name__)
+
+GROQ_MODEL = settings.GROQ_MODEL
+
+# -----------------------------
+# Lazy Groq client
+# -----------------------------
+# The SDK (and its httpx stack) is only imported and constructed on first
+# use, so importing this module stays cheap for workers, tests and pages.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                _client = Groq(api_key=settings.GROQ_API_KEY or None, base_url=settings.GROQ_BASE_URL or None)
+    return _client
+
+
+_async_client = None
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                from groq import AsyncGroq
+                _async_client = AsyncGroq(api_key=settings.GROQ_API_KEY or None, base_url=settings.GROQ_BASE_URL or None)
+    return _async_client
+
+
+# Deadlines, hedging, circuit breaking and failover around the raw clients;
+# all completions below go through this.
+llm = ResilientLLM(
+    [Provider("groq", get_client, GROQ_MODEL, get_async_client), secondary_provider()],
+    timeout_s=settings.LLM_CALL_TIMEOUT_S,
+    hedge=settings.LLM_HEDGE_ENABLED,
+    hedge_min_delay_s=settings.LLM_HEDGE_MIN_DELAY_S,
+)
 
 
 # -----------------------------
@@ -67,6 +119,11 @@ def fallback_recs(totals, highest, profile):
 # Extract JSON from model text
 # -----------------------------
 def _extract_json_from_text(text: str):
+    """First JSON value in a completion: bare, ```json-fenced, or after chatter.
+
+    Only linear-time scans are used (no backtracking regex), so long malformed
+    outputs cannot stall a worker.
+    """
     if not text:
         return None
     text = text.strip()
@@ -74,33 +131,35 @@ def _extract_json_from_text(text: str):
     # Try direct parse
     try:
         return json.loads(text)
-    except:
+    except ValueError:
         pass
 
     # Try ```json fenced block
-    m = re.search(r"```json\s*(\{.*?\}|\[.*?\])\s*```", text, re.DOTALL)
-    if m:
+    fence = text.find("```json")
+    if fence != -1:
+        body = text[fence + 7:]
+        end = body.find("```")
         try:
-            return json.loads(m.group(1))
-        except:
+            return json.loads(body if end == -1 else body[:end])
+        except ValueError:
             pass
 
-    # Try to extract first list/object
-    m2 = re.search(r"(\[.*\]|\{.*\})", text, re.DOTALL)
-    if m2:
+    # Decode from the first list/object opener
+    starts = [i for i in (text.find("["), text.find("{")) if i != -1]
+    if starts:
         try:
-            return json.loads(m2.group(1))
-        except:
+            return json.JSONDecoder().raw_decode(text, min(starts))[0]
+        except ValueError:
             pass
 
     return None
 
 
 # -----------------------------
-# Main Recommendation Generator
+# Payload helpers
 # -----------------------------
-def generate_tips(payload):
-    totals = {
+def totals_from_payload(payload):
+    return {
         "total": payload.get("total") or payload.get("total_kg") or 0,
         "energy": payload.get("energy") or payload.get("energy_kg") or 0,
         "travel": payload.get("travel") or payload.get("travel_kg") or 0,
@@ -108,18 +167,44 @@ def generate_tips(payload):
         "goods": payload.get("goods") or payload.get("goods_kg") or 0,
     }
 
-    profile = payload.get("profile", "your lifestyle")
 
-    highest = max(
+def _highest_category(totals):
+    return max(
         [
-            ("energy", totals["energy"]),
-            ("travel", totals["travel"]),
-            ("food", totals["food"]),
-            ("goods", totals["goods"])
+            ("energy", totals.get("energy", 0)),
+            ("travel", totals.get("travel", 0)),
+            ("food", totals.get("food", 0)),
+            ("goods", totals.get("goods", 0))
         ],
         key=lambda x: x[1]
     )[0]
 
+
+def fallback_tips_for(payload):
+    """Fallback tips for a /reco/generate payload (used when the LLM is skipped)."""
+    totals = totals_from_payload(payload)
+    return fallback_recs(totals, _highest_category(totals), payload.get("profile", "your lifestyle"))
+
+
+def fallback_chat_for(payload):
+    """Fallback chat answer for a /reco/chat payload."""
+    highest = _highest_category(payload.get("totals", {}))
+    return f"AI unavailable — based on your analyzer, your highest-impact area is **{highest}**."
+
+
+# -----------------------------
+# Main Recommendation Generator
+# -----------------------------
+# Bump whenever the tips prompt changes: it is part of the cache key.
+PROMPT_VERSION = "tips-v2"
+
+
+def _household_line(totals):
+    label = household_profile(totals)
+    return f"\nHousehold type: {label}" if label else ""
+
+
+def _tips_prompt(totals, profile, highest):
     # -----------------------------
     # Better / friendlier system prompt
     # -----------------------------
@@ -141,7 +226,7 @@ STRICT RULES:
 - Give advice suitable for an Indian urban user unless stated otherwise.
 - Keep tone friendly, helpful, and specific.
 
-User Profile: {profile}
+User Profile: {profile}{_household_line(totals)}
 
 CO₂ Analyzer Values:
 Total: {totals['total']} kg/month
@@ -156,36 +241,10 @@ Highest-impact area: {highest}
     user_prompt = """
 Return **ONLY a JSON list**, no intro text.
 """
+    return system_prompt, user_prompt
 
-    # -----------------------------
-    # Call Groq LLM
-    # -----------------------------
-    try:
-        resp = client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.25,
-            max_tokens=900,
-        )
-        raw = resp.choices[0].message.content
-
-    except Exception as e:
-        print("ERROR contacting Groq:", e)
-        return fallback_recs(totals, highest, profile)
-
-    print("=== RAW LLM OUTPUT START ===")
-    print(raw)
-    print("=== RAW LLM OUTPUT END ===")
-
-    parsed = _extract_json_from_text(raw)
-
-    if not parsed or not isinstance(parsed, list):
-        print("LLM returned NO valid JSON → fallback.")
-        return fallback_recs(totals, highest, profile)
 
+def _normalize_tips(parsed):
     recommendations = []
     for i, item in enumerate(parsed):
         if not isinstance(item, dict):
@@ -199,18 +258,662 @@ Return **ONLY a JSON list**, no intro text.
             "steps": item.get("steps") if isinstance(item.get("steps"), list) else [],
             "category": item.get("category", "General")
         })
+    return recommendations
+
+
+TIPS_TEMPERATURE = 0.25
+TIPS_MAX_TOKENS = 900
+# The prompt asks for 4–6 tips; stop generating once this many are usable
+TIPS_STOP_AFTER = 5
+
+
+def _tips_messages(totals, profile, highest):
+    system_prompt, user_prompt = _tips_prompt(totals, profile, highest)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def tips_prompt_key(payload):
+    """Hash of the exact tips prompt a payload would produce."""
+    totals = totals_from_payload(payload)
+    messages = _tips_messages(totals, payload.get("profile", "your lifestyle"), _highest_category(totals))
+    return prompt_hash(GROQ_MODEL, messages, TIPS_TEMPERATURE, TIPS_MAX_TOKENS)
+
+
+def _chunk_usage(chunk):
+    # Groq sends usage on the last chunk (x_groq.usage); OpenAI-style APIs on chunk.usage
+    x_groq = getattr(chunk, "x_groq", None)
+    return getattr(x_groq, "usage", None) or getattr(chunk, "usage", None)
+
+
+def stream_llm_tips(messages, enough=TIPS_STOP_AFTER, max_tokens=TIPS_MAX_TOKENS, kind="tips"):
+    """Yield normalised tips as soon as each object's closing brace streams in.
+
+    Generation is cut off (the upstream stream is closed) once ``enough``
+    usable tips have arrived, which saves the remaining completion tokens.
+    Raises if the call itself fails, and DeadlineExceeded (ledger outcome
+    ``abandoned``) when the caller's deadline passes mid-stream: a list cut
+    short that way must not be kept.
+    """
+    parser = TipStreamParser()
+    raw, n = [], 0
+    record = ledger.start(kind, PROMPT_VERSION, messages)
+    outcome = "error"
+    try:
+        stream = llm.stream(
+            record=record,
+            messages=messages,
+            temperature=TIPS_TEMPERATURE,
+            max_tokens=max_tokens,
+        )
+    except Exception:
+        record.finish(outcome)
+        raise
+    try:
+        for chunk in stream:
+            if deadline.expired():
+                # the caller has given up: stop paying for tokens nobody will read
+                deadline.abandoned("tips_stream")
+                outcome = "abandoned"
+                raise deadline.DeadlineExceeded(f"deadline passed after {n} streamed tips")
+            record.set_usage(_chunk_usage(chunk))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            record.add_output(delta)
+            raw.append(delta)
+            for tip in _normalize_tips(parser.feed(delta)):
+                if not tip["text"]:
+                    continue
+                n += 1
+                yield tip
+                if n >= enough:
+                    outcome = "parsed"
+                    return
+            if parser.done:
+                break
+        outcome = "parsed" if n else "fallback"
+    finally:
+        stream.close()
+        record.finish(outcome)
+        if sampled(log, settings.LOG_RAW_LLM_SAMPLE_RATE):
+            log.debug("raw llm output", extra={"kind": kind, "raw": "".join(raw)})
+
+
+def _call_llm_tips(messages):
+    # -----------------------------
+    # Call Groq LLM (streamed, parsed incrementally)
+    # -----------------------------
+    tips = []
+    try:
+        for tip in stream_llm_tips(messages):
+            tips.append(tip)
+    except deadline.DeadlineExceeded:
+        return None  # nobody is waiting for a list cut short
+    except Exception as e:
+        log.warning("llm tips call failed", extra={"error": str(e), "tips_kept": len(tips)})
+        # tips that arrived complete before the failure are still good
+
+    if not tips:
+        log.info("llm returned no valid tips, using fallback")
+        return None
+
+    return tips
+
+
+def _llm_tips(totals, profile, highest):
+    """One Groq call. Returns parsed tips, or None if the call or parsing failed.
+
+    Identical prompts already in flight (e.g. many users opening the same demo
+    profile at once) share a single upstream call.
+    """
+    messages = _tips_messages(totals, profile, highest)
+    key = "llm-tips:" + prompt_hash(GROQ_MODEL, messages, TIPS_TEMPERATURE, TIPS_MAX_TOKENS)
+    return flights.do(key, _collected, _call_llm_tips, totals, messages, min_tips=TIPS_STOP_AFTER)
+
+
+def add_to_corpus(tips, totals):
+    """Keep validated LLM tips in the retrieval corpus (see tip_corpus)."""
+    if not settings.RECO_CORPUS_ENABLED or not tips:
+        return
+    from backend.services.tip_corpus import corpus
+
+    try:
+        corpus.add_tips(tips, totals)
+    except Exception as e:
+        log.warning("tip corpus insert failed", extra={"error": str(e)})
+
+
+def _collected(fn, totals, *args, min_tips=1):
+    # inside the single-flight call, so waiters sharing the result don't re-add it;
+    # a short list (the stream failed part-way) is served but not kept
+    tips = fn(*args)
+    if tips and len(tips) >= min_tips:
+        add_to_corpus(tips, totals)
+    return tips
+
+
+# ---------------------------------------------------
+# Multi-user batches (see backend/services/microbatch.py)
+# ---------------------------------------------------
+# During bursts many users send the same long system prompt; one completion
+# with a section per user pays for the instructions once.
+BATCH_TIPS_PER_USER = 4
+BATCH_TOKENS_PER_USER = 450
+BATCH_MAX_TOKENS = 6000
+
+
+def _batch_tips_messages(entries):
+    system_prompt = """
+You are an expert carbon footprint coach who writes warm, motivating,
+and highly actionable recommendations for SEVERAL users at once.
+
+STRICT RULES:
+- Treat every USER section independently; use ONLY that user's values.
+- Provide exactly {n} recommendations per user.
+- Each recommendation MUST contain:
+  - title
+  - text (2–3 sentence explanation)
+  - impact_kg_month (INTEGER)
+  - confidence (0–1)
+  - steps (3–5 short bullet points)
+  - category (Energy, Travel, Food, Goods)
+- Add brief citations like: (Analyzer: 50 kg energy)
+- Give advice suitable for an Indian urban user unless stated otherwise.
+- Keep tone friendly, helpful, and specific.
+""".format(n=BATCH_TIPS_PER_USER)
+    sections = []
+    for i, (totals, profile, highest) in enumerate(entries, 1):
+        sections.append(
+            f"USER {i}\nProfile: {profile}{_household_line(totals)}\n"
+            f"Total: {totals['total']} kg/month | Energy: {totals['energy']} kg | Travel: {totals['travel']} kg | "
+            f"Food: {totals['food']} kg | Goods: {totals['goods']} kg\nHighest-impact area: {highest}"
+        )
+    user_prompt = (
+        "\n\n".join(sections)
+        + '\n\nReturn ONLY a JSON object: {"users": [{"user": 1, "tips": [...]}, ...]} with one entry per USER.'
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _split_batch(parsed, n):
+    """Per-user tip lists from a batch completion (None where a user is missing)."""
+    out = [None] * n
+    users = parsed.get("users") if isinstance(parsed, dict) else parsed
+    if not isinstance(users, list):
+        return out
+    for entry in users:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            i = int(entry.get("user")) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < n and isinstance(entry.get("tips"), list):
+            out[i] = _normalize_tips(entry["tips"]) or None
+    return out
+
+
+def llm_tips_batch(entries):
+    """One completion for several ``(totals, profile, highest)`` entries."""
+    if len(entries) == 1:
+        return [_llm_tips(*entries[0])]
+    messages = _batch_tips_messages(entries)
+    record = ledger.start("batch", PROMPT_VERSION, messages)
+    try:
+        resp = llm.create(
+            record=record,
+            messages=messages,
+            temperature=TIPS_TEMPERATURE,
+            max_tokens=min(BATCH_MAX_TOKENS, BATCH_TOKENS_PER_USER * len(entries)),
+            response_format={"type": "json_object"},
+            timeout_s=settings.RECO_MICROBATCH_TIMEOUT_S,
+        )
+        content = resp.choices[0].message.content
+        record.add_output(content)
+        record.set_usage(getattr(resp, "usage", None))
+        parsed = _extract_json_from_text(content)
+    except Exception as e:
+        log.warning("llm batch call failed", extra={"error": str(e), "users": len(entries)})
+        record.finish("error")
+        return [None] * len(entries)
+    tips = _split_batch(parsed, len(entries))
+    record.finish("parsed" if any(tips) else "fallback")
+    for entry, user_tips in zip(entries, tips):
+        add_to_corpus(user_tips, entry[0])
+    return tips
+
+
+def generate_tips_batch(payloads):
+    """Tips for many payloads with one LLM call. Users the batch missed get
+    None, so each caller can retry on its own gateway call."""
+    entries = []
+    for payload in payloads:
+        totals = totals_from_payload(payload)
+        entries.append((totals, payload.get("profile", "your lifestyle"), _highest_category(totals)))
+    results = []
+    for payload, tips in zip(payloads, llm_tips_batch(entries)):
+        if tips:
+            store_tips(payload, tips, min_tips=BATCH_TIPS_PER_USER)
+        results.append(tips or None)
+    return results
+
+
+def _dispatch_on_gateway(fn, batch):
+    from backend.services.llm_gateway import gateway, PRIORITY_TIPS
+
+    fut = gateway.submit(fn, batch, priority=PRIORITY_TIPS)
+    # shed like gateway.call does: a batch still queued at the queue deadline
+    # is cancelled (cancel() is a no-op once it runs) and its callers fall back
+    timer = threading.Timer(gateway.queue_deadline_s, fut.cancel)
+    timer.daemon = True
+    timer.start()
+    fut.add_done_callback(lambda _: timer.cancel())
+    return fut
+
+
+# One gateway job per batch; used by /reco/generate when RECO_MICROBATCH_ENABLED
+tip_batcher = MicroBatcher(
+    generate_tips_batch,
+    window_s=settings.RECO_MICROBATCH_WINDOW_MS / 1000.0,
+    max_batch=settings.RECO_MICROBATCH_MAX,
+    dispatch=_dispatch_on_gateway,
+    name="tips-microbatch",
+)
+
+
+# ---------------------------------------------------
+# Parallel per-category generation
+# ---------------------------------------------------
+# Four short completions run side by side instead of one long one, so the
+# wait is roughly one ~200-token generation rather than ~900 tokens.
+TIP_CATEGORIES = ("energy", "travel", "food", "goods")
+CATEGORY_TIPS = 2
+CATEGORY_MAX_TOKENS = 220
+MERGED_TIPS = 6
+
+_category_pool = None
+_category_pool_lock = threading.Lock()
+
+
+def _category_messages(totals, profile, category):
+    system_prompt, user_prompt = _tips_prompt(totals, profile, _highest_category(totals))
+    system_prompt = system_prompt.replace(
+        "- Provide **4–6 recommendations**.",
+        f"- Provide **{CATEGORY_TIPS} recommendations**, ALL in the {category.title()} category.",
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def category_order(totals):
+    """Categories worth a prompt (non-zero emissions), highest-impact first."""
+    cats = [c for c in TIP_CATEGORIES if float(totals.get(c) or 0) > 0] or [_highest_category(totals)]
+    return sorted(cats, key=lambda c: float(totals.get(c) or 0), reverse=True)
+
+
+def _call_category_tips(messages, category):
+    tips = []
+    try:
+        for tip in stream_llm_tips(messages, enough=CATEGORY_TIPS, max_tokens=CATEGORY_MAX_TOKENS, kind="category"):
+            tips.append(dict(tip, category=category.title()))
+    except deadline.DeadlineExceeded:
+        return None
+    except Exception as e:
+        log.warning("llm category call failed", extra={"category": category, "error": str(e)})
+    return tips or None
+
+
+def category_tips(totals, profile, category):
+    """Up to CATEGORY_TIPS LLM tips for one category, or None on failure."""
+    messages = _category_messages(totals, profile, category)
+    key = "llm-cat:" + prompt_hash(GROQ_MODEL, messages, TIPS_TEMPERATURE, CATEGORY_MAX_TOKENS)
+    return flights.do(key, _collected, _call_category_tips, totals, messages, category, min_tips=CATEGORY_TIPS)
+
+
+def _tip_key(tip):
+    return "".join(ch for ch in str(tip.get("title", "")).casefold() if ch.isalnum())
+
+
+def merge_tip_groups(groups, highest, k=MERGED_TIPS):
+    """Dedupe tips across categories and rank them: the highest-impact
+    category first, then by expected saving (impact × confidence)."""
+    ranked = []
+    for cat, tips in groups.items():
+        for tip in tips or []:
+            ranked.append((cat != highest, -tip["impact_kg_month"] * tip["confidence"], len(ranked), tip))
+    ranked.sort(key=lambda row: row[:3])
+    # duplicates keep their best-ranked copy
+    seen, merged = set(), []
+    for *_, tip in ranked:
+        key = _tip_key(tip)
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(tip)
+    return merged[:k]
+
+
+def _category_executor():
+    global _category_pool
+    if _category_pool is None:
+        with _category_pool_lock:
+            if _category_pool is None:
+                workers = max(len(TIP_CATEGORIES), settings.LLM_MAX_CONCURRENCY)
+                _category_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tips-category")
+    return _category_pool
+
+
+def iter_category_tips(totals, profile):
+    """Yield ``(category, tips)`` pairs: the highest-impact category first,
+    the rest as they finish. All prompts run concurrently."""
+    order = category_order(totals)
+    pool = _category_executor()
+    futures = {pool.submit(deadline.bind(category_tips), totals, profile, c): c for c in order}
+    first = next(f for f, c in futures.items() if c == order[0])
+    yield order[0], first.result()
+    rest = [f for f in futures if f is not first]
+    for fut in as_completed(rest):
+        yield futures[fut], fut.result()
+
+
+def parallel_llm_tips(totals, profile, highest):
+    """Merged per-category tips, or None when every category failed."""
+    groups = dict(iter_category_tips(totals, profile))
+    return merge_tip_groups(groups, highest) or None
+
+
+def _generate_llm_tips(totals, profile, highest):
+    if settings.RECO_PARALLEL_TIPS:
+        return parallel_llm_tips(totals, profile, highest)
+    return _llm_tips(totals, profile, highest)
+
+
+def generate_llm_tips(totals, profile):
+    """LLM tips for explicit totals (no cache, no fallback); None on failure."""
+    totals = {"total": 0, "energy": 0, "travel": 0, "food": 0, "goods": 0, **totals}
+    return _generate_llm_tips(totals, profile, _highest_category(totals))
+
+
+def precomputed_tips(payload):
+    """Tips from the offline grid (scripts/build_reco_grid.py), or None for a missing cell."""
+    from backend.services.reco_grid import grid_tips
+
+    totals = totals_from_payload(payload)
+    return grid_tips(totals, payload.get("profile", "your lifestyle"), PROMPT_VERSION)
+
+
+def tip_segment(totals):
+    """Feedback segment for a footprint: its household type, else its top area."""
+    return household_profile(totals) or f"{_highest_category(totals)}-heavy"
+
+
+def personalise_tips(tips, totals):
+    """Reorder instant (rules / corpus) tips by what similar users completed."""
+    if not tips or not settings.RECO_BANDIT_ENABLED:
+        return tips
+    from backend.services.bandit import get_bandit
+
+    try:
+        return get_bandit().rank(tips, tip_segment(totals))
+    except Exception as e:
+        log.warning("tip bandit failed", extra={"error": str(e)})
+        return tips
+
+
+def record_impressions(tips, payload):
+    """Count a tips list the client is actually shown (rules / corpus tips only)."""
+    if not tips or not settings.RECO_BANDIT_ENABLED:
+        return
+    from backend.services.bandit import get_bandit
+
+    totals = payload.get("totals") if isinstance(payload.get("totals"), dict) else totals_from_payload(payload)
+    try:
+        get_bandit().impressions(tips, tip_segment(totals))
+    except Exception as e:
+        log.warning("tip bandit failed", extra={"error": str(e)})
+
+
+def _rankable_tip(tip_id) -> bool:
+    """Whether ``tip_id`` names a rules or corpus tip this server can serve."""
+    tip_id = str(tip_id or "")
+    if tip_id.startswith("rule-"):
+        from backend.services.rules_engine import get_engine
+
+        return tip_id in get_engine().ids
+    if tip_id.startswith("corpus-") and tip_id[len("corpus-"):].isdigit():
+        from backend.services.tip_corpus import corpus
+
+        corpus.load()
+        return int(tip_id[len("corpus-"):]) in corpus.tips
+    return False
+
+
+def record_tip_feedback(payload):
+    """Count a "Done" tick (``done: false`` takes it back); returns the tip key,
+    or None for tips the bandit does not rank (LLM tips, unknown ids)."""
+    from backend.services.bandit import get_bandit
+
+    if not _rankable_tip(payload.get("tip_id")):
+        return None
+    totals = payload.get("totals") if isinstance(payload.get("totals"), dict) else totals_from_payload(payload)
+    tip = {"id": payload.get("tip_id"), "title": payload.get("title")}
+    return get_bandit().feedback(tip, tip_segment(totals), bool(payload.get("done", True)))
+
+
+def _corpus_retrieve(payload):
+    if not settings.RECO_CORPUS_ENABLED:
+        return None
+    from backend.services.tip_corpus import corpus
+
+    totals = totals_from_payload(payload)
+    profile = f"{payload.get('profile', '')} {household_profile(totals) or ''}"
+    return corpus.retrieve(totals, profile)
+
+
+def corpus_tips(payload):
+    """Tips retrieved from the corpus of earlier generations, or None when it
+    covers this footprint poorly (then the LLM is needed)."""
+    return personalise_tips(_corpus_retrieve(payload), totals_from_payload(payload))
+
+
+def cached_tips(payload):
+    """Cached tips for this footprint bucket, or None. Never calls the LLM inline."""
+    if not settings.RECO_CACHE_ENABLED:
+        return None
+    totals = totals_from_payload(payload)
+    profile = payload.get("profile", "your lifestyle")
+    highest = _highest_category(totals)
+    key = cache_key(totals, profile, PROMPT_VERSION)
+    # a stale entry is still returned; the refresh runs in the background
+    return reco_cache.get(key, refresh=lambda: _generate_llm_tips(totals, profile, highest))
+
+
+def generate_tips(payload, cache_checked=False):
+    totals = totals_from_payload(payload)
+
+    profile = payload.get("profile", "your lifestyle")
+
+    highest = _highest_category(totals)
+
+    # Near-identical footprints share one generation (see reco_cache)
+    if not cache_checked:
+        cached = cached_tips(payload) or corpus_tips(payload) or prefetched_tips(payload)
+        if cached:
+            return cached
+
+    recommendations = _generate_llm_tips(totals, profile, highest)
 
     if not recommendations:
         return fallback_recs(totals, highest, profile)
 
+    store_tips(payload, recommendations)
     return recommendations
 
+
 # ---------------------------------------------------
-# Chat Assistant (Groq)
+# Speculative prefetch (started by /footprint/compute)
 # ---------------------------------------------------
-def generate_chat_response(payload):
-    """Generate a higher-quality, memory-aware response using Groq."""
+def _prefetch_job(payload):
+    from backend.services.prefetch import prefetcher
+
+    # footprints the cheap sources cover need no generation
+    if cached_tips(payload) or precomputed_tips(payload) or _corpus_retrieve(payload):
+        prefetcher.count("covered")
+        return None
+    if not llm.available() or not prefetcher.take_budget():
+        return None
+    totals = totals_from_payload(payload)
+    tips = _generate_llm_tips(totals, payload.get("profile", "your lifestyle"), _highest_category(totals))
+    if tips:
+        store_tips(payload, tips)
+    return tips
+
+
+def prefetch_tips(payload, key=None):
+    """Start generating tips for this footprint before anyone asks for them."""
+    if not settings.RECO_PREFETCH_ENABLED:
+        return False
+    from backend.services.prefetch import prefetcher
+
+    return prefetcher.schedule(key or tips_prompt_key(payload), _prefetch_job, payload)
+
+
+def prefetched_tips(payload, key=None, wait_s=None):
+    """Tips from a prefetch for this footprint (waiting on a running one), or None."""
+    if not settings.RECO_PREFETCH_ENABLED:
+        return None
+    from backend.services.prefetch import prefetcher
+
+    return prefetcher.get(key or tips_prompt_key(payload), wait_s)
+
+
+async def aprefetched_tips(payload, key=None, wait_s=None):
+    if not settings.RECO_PREFETCH_ENABLED:
+        return None
+    from backend.services.prefetch import prefetcher
 
+    return await prefetcher.aget(key or tips_prompt_key(payload), wait_s)
+
+
+def _expected_tips(totals):
+    """How many tips a complete LLM answer for ``totals`` has (at least)."""
+    if settings.RECO_PARALLEL_TIPS:
+        return min(TIPS_STOP_AFTER, CATEGORY_TIPS * len(category_order(totals)))
+    return TIPS_STOP_AFTER
+
+
+def store_tips(payload, tips, min_tips=None):
+    """Cache LLM tips for this footprint bucket. Fallbacks and lists shorter
+    than a complete answer (``_expected_tips``) are never stored: the cache is
+    shared, so one caller's partial answer would be everyone's."""
+    if settings.RECO_CACHE_ENABLED and tips:
+        totals = totals_from_payload(payload)
+        if len(tips) < (_expected_tips(totals) if min_tips is None else min_tips):
+            return
+        reco_cache.put(cache_key(totals, payload.get("profile", "your lifestyle"), PROMPT_VERSION), tips)
+
+def stored_tips(payload):
+    """``(tips, source)`` from the cache, the offline grid or the tip corpus,
+    else ``(None, None)``. Blocking (SQLite), so async routes run it in a thread."""
+    tips = cached_tips(payload)
+    if tips:
+        return tips, "cache"
+    tips = precomputed_tips(payload)
+    if tips:
+        return tips, "grid"
+    tips = corpus_tips(payload)
+    if tips:
+        return tips, "corpus"
+    return None, None
+
+
+def instant_tips(payload):
+    """``(tips, source)`` without generating anything: stored tips, then — only
+    while every LLM provider is down — the rules."""
+    tips, source = stored_tips(payload)
+    if tips:
+        return tips, source
+    if not llm.available():
+        return recommend_actions(payload) or fallback_tips_for(payload), "rules"
+    return None, None
+
+
+def iter_tip_events(payload):
+    """Sync twin of /reco/generate/stream for the in-process Streamlit path:
+    ``("tips", {category, tips})`` per category, then ``("done", {tips, source})``."""
+    tips, source = instant_tips(payload)
+    if tips:
+        record_impressions(tips, payload)
+        yield "done", {"tips": tips, "source": source}
+        return
+    if not settings.RECO_PARALLEL_TIPS:
+        yield "done", {"tips": generate_tips(payload, cache_checked=True), "source": "llm"}
+        return
+    totals = totals_from_payload(payload)
+    groups = {}
+    for category, tips in iter_category_tips(totals, payload.get("profile", "your lifestyle")):
+        groups[category] = tips or []
+        yield "tips", {"category": category, "tips": tips or []}
+    merged = merge_tip_groups(groups, category_order(totals)[0])
+    if merged:
+        store_tips(payload, merged)
+        yield "done", {"tips": merged, "source": "llm"}
+    else:
+        yield "done", {"tips": fallback_tips_for(payload), "source": "fallback"}
+
+# ---------------------------------------------------
+# Rule-based fast path + background LLM enrichment
+# ---------------------------------------------------
+def recommend_actions(payload, k=6):
+    """Instant tips from the compiled ai/rules engine (no LLM call).
+
+    Accepts either a /reco/generate payload or ``{"totals": {...}}``.
+    """
+    from backend.services.rules_engine import rank_actions
+
+    totals = payload.get("totals") if isinstance(payload.get("totals"), dict) else totals_from_payload(payload)
+    return personalise_tips(rank_actions(totals, k), totals)
+
+
+_enriching = set()
+_enriching_lock = threading.Lock()
+
+
+def enrich_in_background(payload):
+    """Queue an LLM generation for this footprint so the cache holds richer tips next time."""
+    from backend.services.llm_gateway import gateway, PRIORITY_BACKGROUND
+
+    if not settings.RECO_CACHE_ENABLED:
+        return  # nowhere to keep the result
+    totals = totals_from_payload(payload)
+    key = cache_key(totals, payload.get("profile", "your lifestyle"), PROMPT_VERSION)
+    with _enriching_lock:
+        if key in _enriching:
+            return
+        _enriching.add(key)
+
+    def run():
+        try:
+            generate_tips(payload)
+        finally:
+            with _enriching_lock:
+                _enriching.discard(key)
+
+    gateway.submit(run, priority=PRIORITY_BACKGROUND)
+
+
+# ---------------------------------------------------
+# Chat Assistant (Groq)
+# ---------------------------------------------------
+def _chat_messages(payload):
+    """Build the Groq message list for a /reco/chat payload."""
     question = payload.get("user_question", "")
     history = payload.get("chat_history", [])
     totals = payload.get("totals", {})
@@ -224,10 +927,7 @@ def generate_chat_response(payload):
     profile = payload.get("profile", "your lifestyle")
 
     # Determine highest-impact category
-    highest = max(
-        [("energy", energy), ("travel", travel), ("food", food), ("goods", goods)],
-        key=lambda x: x[1]
-    )[0]
+    highest = _highest_category(totals)
 
     # Improved system message
     system_prompt = f"""
@@ -253,6 +953,10 @@ Goods: {goods} kg
 Highest-impact category: {highest}
 """
 
+    summary = payload.get("conversation_summary")
+    if summary:
+        system_prompt += f"\nSummary of the earlier conversation:\n{summary}\n"
+
     # Convert chat_history → proper LLM message format
     formatted_history = []
     for msg in history:
@@ -262,24 +966,167 @@ Highest-impact category: {highest}
             formatted_history.append({"role": "assistant", "content": msg["content"]})
 
     # Include conversation memory + new question
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         *formatted_history,
         {"role": "user", "content": question}
     ]
 
+
+CHAT_MAX_TOKENS = 350
+CHAT_PROMPT_VERSION = "chat-v1"
+
+
+def with_chat_history(payload):
+    """Attach the stored (or trimmed client-sent) history to a chat payload."""
+    from backend.services import conversations
+
     try:
-        resp = client.chat.completions.create(
-            model=GROQ_MODEL,
+        return conversations.with_history(payload)
+    except Exception as e:
+        log.warning("chat history unavailable", extra={"error": str(e)})
+        return payload
+
+
+def remember_chat_turn(payload, answer):
+    """Store the question/answer pair when the payload names a conversation."""
+    from backend.services import conversations
+
+    conversation_id = payload.get("conversation_id")
+    if not answer or not conversations.valid_conversation_id(conversation_id):
+        return
+    try:
+        conversations.record_turn(conversation_id, payload.get("user_question", ""), answer)
+    except Exception as e:
+        log.warning("chat history unavailable", extra={"error": str(e)})
+
+
+def faq_chat_answer(payload):
+    """Template answer for a common question (stored like an LLM answer), or None."""
+    if not settings.FAQ_ROUTER_ENABLED:
+        return None
+    from backend.services.faq_router import router as faq
+
+    try:
+        answer = faq.answer(payload.get("user_question", ""), payload.get("totals"))
+    except Exception as e:
+        log.warning("faq router failed", extra={"error": str(e)})
+        return None
+    if answer:
+        remember_chat_turn(payload, answer)
+    return answer
+
+
+def generate_chat_response(payload, faq_checked: bool = False):
+    """Generate a higher-quality, memory-aware response using Groq."""
+    answer = None if faq_checked else faq_chat_answer(payload)
+    if answer:
+        return answer
+    payload = with_chat_history(payload)
+    messages = _chat_messages(payload)
+    record = ledger.start("chat", CHAT_PROMPT_VERSION, messages)
+
+    try:
+        resp = llm.create(
+            record=record,
             messages=messages,
             temperature=0.25,
-            max_tokens=350
+            max_tokens=CHAT_MAX_TOKENS
         )
 
         # Groq returns ChatCompletionMessage object, not dict
         content = resp.choices[0].message.content
+        record.add_output(content)
+        record.set_usage(getattr(resp, "usage", None))
+        record.finish("parsed")
+        remember_chat_turn(payload, content)
         return content
 
     except Exception as e:
-        print("CHAT MODEL ERROR:", e)
-        return f"AI unavailable — based on your analyzer, your highest-impact area is **{highest}**."
+        log.warning("chat call failed", extra={"error": str(e)})
+        record.finish("error")
+        return fallback_chat_for(payload)
+
+
+# ---------------------------------------------------
+# Streaming chat (token by token)
+# ---------------------------------------------------
+def stream_chat_tokens(payload):
+    """Sync generator of answer fragments (used by the in-process Streamlit path)."""
+    answer = faq_chat_answer(payload)
+    if answer:
+        yield answer
+        return
+    payload = with_chat_history(payload)
+    messages = _chat_messages(payload)
+    record = ledger.start("chat_stream", CHAT_PROMPT_VERSION, messages)
+    stream = None
+    parts = []
+    outcome = "error"
+    try:
+        stream = llm.stream(
+            record=record,
+            messages=messages,
+            temperature=0.25,
+            max_tokens=CHAT_MAX_TOKENS,
+        )
+        for chunk in stream:
+            record.set_usage(_chunk_usage(chunk))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                record.add_output(delta)
+                parts.append(delta)
+                yield delta
+        outcome = "parsed"
+        remember_chat_turn(payload, "".join(parts))
+    except Exception as e:
+        log.warning("chat stream failed", extra={"error": str(e), "streamed": bool(parts)})
+        if not parts:
+            yield fallback_chat_for(payload)
+    finally:
+        if stream is not None:
+            stream.close()
+        record.finish(outcome)
+
+
+async def astream_chat_tokens(payload):
+    """Async generator of answer fragments from the async Groq client.
+
+    Closing the generator (e.g. when the HTTP client disconnects) closes the
+    upstream stream, which aborts generation on Groq's side. Only answers
+    that finished streaming are stored in the conversation.
+    """
+    answer = await asyncio.to_thread(faq_chat_answer, payload)
+    if answer:
+        yield answer
+        return
+    payload = await asyncio.to_thread(with_chat_history, payload)
+    messages = _chat_messages(payload)
+    record = ledger.start("chat_stream", CHAT_PROMPT_VERSION, messages)
+    stream = None
+    parts = []
+    outcome = "error"
+    try:
+        stream = await llm.astream(
+            record=record,
+            messages=messages,
+            temperature=0.25,
+            max_tokens=CHAT_MAX_TOKENS,
+        )
+        async for chunk in stream:
+            record.set_usage(_chunk_usage(chunk))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                record.add_output(delta)
+                parts.append(delta)
+                yield delta
+        outcome = "parsed"
+        await asyncio.to_thread(remember_chat_turn, payload, "".join(parts))
+    except Exception as e:
+        log.warning("chat stream failed", extra={"error": str(e), "streamed": bool(parts)})
+        if not parts:
+            yield fallback_chat_for(payload)
+    finally:
+        if stream is not None:
+            await stream.close()
+        record.finish(outcome)
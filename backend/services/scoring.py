@@ -4,3 +4,11 @@ def green_score(total_kg_month: float) -> int:
     # 0..600 kg/month mapped to 0..100 score (lower is better)
     score = 100 - (total_kg_month / 600) * 100
     return int(clamp(score, 0, 100))
+
+
+def green_score_batch(total_kg_month):
+    """Vectorized ``green_score`` for a NumPy array of monthly totals."""
+    import numpy as np
+
+    score = 100 - (np.asarray(total_kg_month, dtype=np.float64) / 600) * 100
+    return np.clip(score, 0, 100).astype(np.int32)
@@ -0,0 +1,131 @@
+# backend/services/singleflight.py
+"""
+Single-flight: concurrent callers asking for the same key share one call.
+
+The first caller for a key (the leader) runs the function; everyone who
+arrives while it is in flight waits for, and receives, the leader's result
+(or exception). Thread and asyncio callers share the same in-flight table,
+so a request on the threadpool and one on the event loop coalesce too.
+
+Async leaders run the call as a detached task and then wait on it like
+everyone else, so a cancelled caller (e.g. a client disconnect) — leader or
+not — never cancels the call the others are waiting for.
+
+The shared call runs without the leader's request deadline (see
+backend/core/deadline.py): callers with different deadlines share it, so
+the first one's deadline must not cut the answer short or shrink its token
+budget for everyone else. Each caller instead waits only until its own
+deadline and then gets DeadlineExceeded, while the call finishes for the
+rest (and for the caches it fills).
+
+A caller must never re-enter the key it is already leading (that would wait
+on itself) — namespace keys per call site, e.g. ``"route:<hash>"``.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from backend.core import deadline
+
+
+def prompt_hash(*parts) -> str:
+    """Stable hash of everything that determines an LLM completion."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._tasks = set()  # detached async leaders (the loop only keeps weak refs)
+        self._stats = {"calls": 0, "saved": 0}
+
+    def _join(self, key):
+        """Return ``(future, is_leader)`` for ``key``."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._stats["saved"] += 1
+                return fut, False
+            fut = Future()
+            self._inflight[key] = fut
+            self._stats["calls"] += 1
+            return fut, True
+
+    def _finish(self, key, fut, result=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def _gave_up(self):
+        deadline.abandoned("singleflight")
+        return deadline.DeadlineExceeded("caller's deadline passed while waiting for a shared call")
+
+    def do(self, key, fn, *args, **kwargs):
+        """Blocking variant for threadpool / gateway worker code."""
+        if deadline.expired():
+            raise self._gave_up()
+        fut, leader = self._join(key)
+        if not leader:
+            try:
+                return fut.result(timeout=deadline.limit(None))
+            except FutureTimeout:
+                if fut.done():
+                    raise  # the shared call itself timed out
+                raise self._gave_up()
+        try:
+            with deadline.scope(at=None):
+                result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            raise
+        self._finish(key, fut, result=result)
+        return result
+
+    async def ado(self, key, coro_fn, *args, **kwargs):
+        """Async variant; ``coro_fn(*args, **kwargs)`` must return an awaitable."""
+        if deadline.expired():
+            raise self._gave_up()
+        fut, leader = self._join(key)
+        if leader:
+            # the task copies the current context: start it with no deadline
+            with deadline.scope(at=None):
+                task = asyncio.ensure_future(self._lead(key, fut, coro_fn, *args, **kwargs))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # shield: one caller being cancelled must not cancel the shared call
+        shared = asyncio.shield(asyncio.wrap_future(fut))
+        left = deadline.limit(None)
+        if left is None:
+            return await shared
+        done, _ = await asyncio.wait({shared}, timeout=left)
+        if not done:
+            shared.cancel()
+            raise self._gave_up()
+        return shared.result()
+
+    async def _lead(self, key, fut, coro_fn, *args, **kwargs):
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        self._finish(key, fut, result=result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["in_flight"] = len(self._inflight)
+        return out
+
+
+flights = SingleFlight()
@@ -0,0 +1,320 @@
+# backend/services/tip_corpus.py
+"""
+Corpus of every validated LLM tip, searchable without calling the LLM.
+
+Insert: a tip is validated (reco_grid.validate_tips), its footprint-specific
+citation ("(Analyzer: 50 kg energy)") is stripped, and a 64-permutation
+MinHash of its word shingles is checked against an LSH table (16 bands of 4
+rows). A candidate whose estimated Jaccard similarity reaches
+``DUPLICATE_JACCARD`` is a near-duplicate: the stored tip's ``seen`` count
+goes up instead of adding a copy.
+
+Index: postings per category and per key term (content words of the title
+and text) are kept in memory; SQLite (``RECO_CORPUS_PATH``) holds the tips
+and their signatures so a restart reloads everything without re-hashing.
+
+Retrieval ranks a category's tips for a footprint by the category's share of
+the total, the tip's confidence, how close the footprint's category kg is to
+the one the tip was written for (its impact is rescaled to the new
+footprint), and key-term overlap with the profile. ``retrieve`` returns
+None when coverage is poor, so the caller falls through to the LLM.
+"""
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from backend.core.config import settings
+
+log = logging.getLogger(__name__)
+
+CATEGORIES = ("energy", "travel", "food", "goods")
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3
+DUPLICATE_JACCARD = 0.7
+MERSENNE = (1 << 61) - 1
+_CITATION = re.compile(r"\s*\((?:Analyzer|Analyser)[^)]*\)", re.IGNORECASE)
+_WORD = re.compile(r"[a-z]+")
+STOPWORDS = frozenset(
+    "about after also before being between could each every from have into just more most much only other "
+    "over same some such than that their them then there these they this those through under until very "
+    "what when where which while will with your you're yours week month day".split()
+)
+
+
+def _words(text: str):
+    return _WORD.findall((text or "").lower())
+
+
+def key_terms(text: str, limit: int = 12):
+    """Content words in first-seen order (the inverted-index keys)."""
+    out = []
+    for w in _words(text):
+        if len(w) >= 4 and w not in STOPWORDS and w not in out:
+            out.append(w)
+            if len(out) == limit:
+                break
+    return out
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str):
+        import numpy as np
+
+        words = _words(text)
+        shingles = {" ".join(words[i:i + SHINGLE]) for i in range(max(1, len(words) - SHINGLE + 1))}
+        h = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+        # (a*h + b) mod p for every (permutation, shingle); uint64 wraps, which
+        # keeps the hash family universal enough for similarity estimates
+        return ((np.outer(self.a, h) + self.b[:, None]) % MERSENNE).min(axis=1).astype(np.uint64)
+
+    @staticmethod
+    def similarity(sig_a, sig_b) -> float:
+        return float((sig_a == sig_b).mean())
+
+
+def _band_keys(sig):
+    return [(i, sig[i * ROWS:(i + 1) * ROWS].tobytes()) for i in range(BANDS)]
+
+
+class TipCorpus:
+    def __init__(self, path: str):
+        self.path = path
+        self._hasher = None  # built on first use: keeps NumPy out of startup imports
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._loaded = False
+        self.tips = {}  # id -> tip dict (+ src_kg, seen, terms)
+        self.signatures = {}
+        # postings per category, with parallel columns for vectorised ranking
+        self.by_category = {c: {"ids": [], "src_kg": [], "confidence": [], "seen": []} for c in CATEGORIES}
+        self._position = {}  # id -> (category, row in its postings)
+        self._arrays = {}  # category -> numpy columns, rebuilt after inserts
+        self.by_term = {}
+        self.bands = {}
+        self._stats = {"added": 0, "duplicates": 0, "rejected": 0, "retrievals": 0, "covered": 0}
+
+    @property
+    def hasher(self) -> MinHasher:
+        if self._hasher is None:
+            self._hasher = MinHasher()
+        return self._hasher
+
+    # -----------------------------
+    # Storage
+    # -----------------------------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tip_corpus ("
+                " id INTEGER PRIMARY KEY, category TEXT NOT NULL, tip TEXT NOT NULL,"
+                " src_kg REAL NOT NULL, seen INTEGER NOT NULL DEFAULT 1,"
+                " minhash BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def load(self):
+        """Read the stored corpus into the in-memory indexes (once per worker)."""
+        import numpy as np
+
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                rows = self._conn().execute("SELECT id, category, tip, src_kg, seen, minhash FROM tip_corpus").fetchall()
+            except sqlite3.Error as e:
+                log.warning("tip corpus load failed", extra={"error": str(e)})
+                rows = []
+            for tip_id, category, tip, src_kg, seen, blob in rows:
+                self._index(tip_id, category, json.loads(tip), src_kg, seen, np.frombuffer(blob, dtype=np.uint64))
+            self._loaded = True
+
+    def _index(self, tip_id, category, tip, src_kg, seen, sig):
+        terms = key_terms(f"{tip['title']} {tip['text']}")
+        self.tips[tip_id] = dict(tip, src_kg=src_kg, seen=seen, terms=terms)
+        self.signatures[tip_id] = sig
+        postings = self.by_category[category]
+        self._position[tip_id] = (category, len(postings["ids"]))
+        for key, value in (("ids", tip_id), ("src_kg", src_kg), ("confidence", tip["confidence"]), ("seen", seen)):
+            postings[key].append(value)
+        self._arrays.pop(category, None)
+        for t in terms:
+            self.by_term.setdefault(t, set()).add(tip_id)
+        for key in _band_keys(sig):
+            self.bands.setdefault(key, []).append(tip_id)
+
+    def _near_duplicate(self, sig):
+        seen = set()
+        for key in _band_keys(sig):
+            for tip_id in self.bands.get(key, ()):
+                if tip_id not in seen:
+                    seen.add(tip_id)
+                    if MinHasher.similarity(sig, self.signatures[tip_id]) >= DUPLICATE_JACCARD:
+                        return tip_id
+        return None
+
+    # -----------------------------
+    # Insert
+    # -----------------------------
+    def add_tips(self, tips, totals: dict) -> int:
+        """Store the valid, new tips of one generation; returns how many were added."""
+        from backend.services.reco_grid import validate_tips
+
+        self.load()
+        valid = validate_tips(tips, min_valid=1) or []
+        with self._lock:
+            self._stats["rejected"] += len(tips or []) - len(valid)
+        added = 0
+        for tip in valid:
+            category = str(tip["category"]).strip().lower()
+            if category not in CATEGORIES:
+                continue
+            tip = {
+                "title": tip["title"].strip(),
+                "text": _CITATION.sub("", tip["text"]).strip(),
+                "impact_kg_month": tip["impact_kg_month"],
+                "confidence": tip["confidence"],
+                "steps": tip.get("steps") if isinstance(tip.get("steps"), list) else [],
+                "category": category.title(),
+            }
+            sig = self.hasher.signature(f"{tip['title']} {tip['text']}")
+            src_kg = float(totals.get(category) or 0)
+            try:
+                with self._lock:
+                    dup = self._near_duplicate(sig)
+                    if dup is not None:
+                        self.tips[dup]["seen"] += 1
+                        c, row = self._position[dup]
+                        self.by_category[c]["seen"][row] += 1
+                        self._arrays.pop(c, None)
+                        self._stats["duplicates"] += 1
+                        self._conn().execute("UPDATE tip_corpus SET seen = seen + 1 WHERE id = ?", (dup,))
+                        continue
+                    cur = self._conn().execute(
+                        "INSERT INTO tip_corpus (category, tip, src_kg, seen, minhash, created_at) VALUES (?, ?, ?, 1, ?, ?)",
+                        (category, json.dumps(tip, ensure_ascii=False), src_kg, sig.tobytes(), time.time()),
+                    )
+                    self._index(cur.lastrowid, category, tip, src_kg, 1, sig)
+                    self._stats["added"] += 1
+                    added += 1
+            except sqlite3.Error as e:
+                log.warning("tip corpus write failed", extra={"error": str(e)})
+        return added
+
+    # -----------------------------
+    # Retrieval
+    # -----------------------------
+    def search(self, terms, category: str = None):
+        """Tip ids matching any of ``terms`` (optionally within one category)."""
+        self.load()
+        with self._lock:
+            ids = set().union(*(self.by_term.get(t, set()) for t in terms)) if terms else set()
+            if category:
+                ids &= set(self.by_category[category]["ids"]) if category in self.by_category else set()
+        return ids
+
+    def _columns(self, category):
+        import numpy as np
+
+        cols = self._arrays.get(category)
+        if cols is None:
+            postings = self.by_category[category]
+            cols = self._arrays[category] = {
+                "ids": np.asarray(postings["ids"], dtype=np.int64),
+                "src_kg": np.maximum(np.asarray(postings["src_kg"], dtype=np.float64), 1.0),
+                "confidence": np.asarray(postings["confidence"], dtype=np.float64),
+                "boost": 1 + 0.05 * np.log(np.asarray(postings["seen"], dtype=np.float64)),
+            }
+        return cols
+
+    def _ranked(self, totals, terms):
+        """``(score, fit, id, category, kg)`` for every candidate, best first."""
+        import numpy as np
+
+        total = sum(float(totals.get(c) or 0) for c in CATEGORIES) or 1.0
+        scored = []
+        with self._lock:
+            # key-term overlap via the inverted index: only tips sharing a term get a count
+            hits = {}
+            for t in terms:
+                for tip_id in self.by_term.get(t, ()):
+                    hits[tip_id] = hits.get(tip_id, 0) + 1
+            for c in CATEGORIES:
+                kg = float(totals.get(c) or 0)
+                if kg <= 0 or not self.by_category[c]["ids"]:
+                    continue
+                cols = self._columns(c)
+                # 1.0 when the tip was written for the same category kg, 0.5 at 2x off
+                fit = np.exp2(-np.abs(np.log2(kg / cols["src_kg"])))
+                overlap = np.zeros(len(cols["ids"]))
+                for tip_id, count in hits.items():
+                    cat, row = self._position[tip_id]
+                    if cat == c:
+                        overlap[row] = count / len(terms)
+                score = kg / total * cols["confidence"] * fit * (1 + 0.5 * overlap) * cols["boost"]
+                top = np.argsort(-score)[:32]
+                scored += [(float(score[i]), float(fit[i]), int(cols["ids"][i]), c, kg) for i in top]
+        scored.sort(reverse=True)
+        return scored
+
+    def retrieve(self, totals: dict, profile: str = "", k: int = 6):
+        """Ranked tips for this footprint, or None when the corpus covers it poorly."""
+        self.load()
+        with self._lock:
+            self._stats["retrievals"] += 1
+        highest = max(CATEGORIES, key=lambda c: float(totals.get(c) or 0))
+        picked, per_category, sigs = [], {}, []
+        for _, fit, tip_id, category, kg in self._ranked(totals, key_terms(profile or "")):
+            if fit < 0.5 or per_category.get(category, 0) >= 3:
+                continue
+            sig = self.signatures[tip_id]
+            if any(MinHasher.similarity(sig, s) >= 0.5 for s in sigs):
+                continue  # keep the list diverse
+            tip = self.tips[tip_id]
+            picked.append({
+                "id": f"corpus-{tip_id}",
+                "title": tip["title"],
+                "text": tip["text"],
+                # rescaled from the footprint the tip was written for
+                "impact_kg_month": max(1, round(tip["impact_kg_month"] * kg / max(tip["src_kg"], 1.0))),
+                "confidence": tip["confidence"],
+                "steps": tip["steps"],
+                "category": tip["category"],
+            })
+            per_category[category] = per_category.get(category, 0) + 1
+            sigs.append(sig)
+            if len(picked) == k:
+                break
+        if len(picked) < settings.RECO_CORPUS_MIN_TIPS or per_category.get(highest, 0) < 2:
+            return None
+        with self._lock:
+            self._stats["covered"] += 1
+        return picked
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["size"] = len(self.tips)
+            out["terms"] = len(self.by_term)
+        return out
+
+
+corpus = TipCorpus(settings.RECO_CORPUS_PATH)
@@ -0,0 +1,92 @@
+# backend/services/tip_parser.py
+"""
+Incremental parser for a streamed JSON list of tips.
+
+Feed it completion fragments as they arrive; every time the closing brace
+of a top-level object inside the list is seen, that object is decoded and
+returned. The scan is a single pass over each character (string/escape
+state plus a depth counter), so malformed or truncated output costs linear
+time, and the objects completed before the damage are still usable.
+
+The list starts at the first ``[`` followed (whitespace aside) by ``{``;
+anything before it (chatter, a ```json fence, a stray ``[`` that never
+closes) is skipped. A list that closes without yielding any object is
+forgotten and the scan waits for the next one.
+"""
+import json
+
+
+class TipStreamParser:
+    def __init__(self):
+        self._buf = []          # characters of the tip object being read
+        self._capturing = False
+        self._in_list = False
+        self._opening = False   # saw "[", waiting to see whether "{" follows
+        self._depth = 0         # nesting below the list itself
+        self._in_string = False
+        self._escape = False
+        self.objects = 0        # objects decoded so far
+        self.done = False       # the list has been closed
+
+    def feed(self, chunk: str) -> list:
+        """Consume a fragment; return the tip dicts completed by it."""
+        out = []
+        if self.done or not chunk:
+            return out
+        for ch in chunk:
+            if not self._in_list:
+                if ch == "[":
+                    self._opening = True
+                elif self._opening and ch == "{":
+                    self._opening, self._in_list = False, True
+                elif not ch.isspace():
+                    self._opening = False
+                if not self._in_list:
+                    continue
+            if self._capturing:
+                self._buf.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._capturing, self._buf = True, ["{"]
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    if ch == "]":
+                        if self.objects:
+                            self.done = True
+                            break
+                        self._in_list = False  # a stray "[...]" in the preamble
+                    continue
+                self._depth -= 1
+                if self._depth == 0 and self._capturing:
+                    self._capturing = False
+                    obj = self._decode()
+                    if obj is not None:
+                        out.append(obj)
+        return out
+
+    def _decode(self):
+        text, self._buf = "".join(self._buf), []
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(obj, dict):
+            return None
+        self.objects += 1
+        return obj
+
+
+def parse_tips(text: str) -> list:
+    """All complete tip objects in ``text`` (possibly truncated output)."""
+    return TipStreamParser().feed(text or "")
@@ -0,0 +1,156 @@
+# backend/services/warmup.py
+"""
+Start-up warm-up, run from the FastAPI lifespan before traffic is accepted.
+
+Every step is timed and its outcome recorded; ``/ready`` reports ready only
+once all *required* steps have succeeded. Optional steps (e.g. the LLM
+connection) may fail without keeping the worker out of rotation, since
+those code paths already degrade to fallbacks.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+log = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_report = {"steps": {}, "started_at": None, "finished_at": None}
+
+
+# -----------------------------
+# Steps
+# -----------------------------
+def _warm_database():
+    from backend.db import models
+    from backend.db.session import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    # open (and return) enough connections to fill the pool's steady-state size
+    size = getattr(engine.pool, "size", lambda: 1)()
+    conns = []
+    try:
+        for _ in range(max(1, min(size, 5))):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def _warm_mappers():
+    from backend.db import models  # noqa: F401  (registers the mappers)
+
+    configure_mappers()
+
+
+def _warm_factors():
+    from backend.services.calculator import compute_footprint
+
+    # exercises the emission-factor registry and the calculator's code path
+    compute_footprint({"electricityKwh": 1, "carKm": 1, "busKm": 1})
+
+
+def _warm_llm():
+    from backend.core.config import settings
+    from backend.services.recommender import get_client
+
+    if not settings.GROQ_API_KEY:
+        raise RuntimeError("GROQ_API_KEY not set")
+    # imports the SDK, then a cheap authenticated request leaves a live TLS
+    # connection in the client's pool
+    get_client().with_options(timeout=3.0, max_retries=0).models.list()
+
+
+def _warm_rules():
+    from backend.services.rules_engine import get_engine
+
+    engine = get_engine()
+    # first ranking pays for NumPy's lazy ufunc setup
+    engine.rank({"energy": 100, "travel": 50, "food": 150, "goods": 20})
+
+
+def _warm_caches():
+    from backend.core.config import settings
+    from backend.services.bandit import get_bandit
+    from backend.services.faq_router import router as faq_router
+    from backend.services.reco_cache import cache
+    from backend.services.profile_clf import get_classifier
+    from backend.services.reco_grid import get_grid
+    from backend.services.tip_corpus import corpus
+
+    cache.warm()
+    get_grid()
+    get_classifier()
+    corpus.load()
+    get_bandit().load()
+    if settings.FAQ_ROUTER_ENABLED:
+        faq_router.load()
+
+
+def _warm_neighbours():
+    from backend.core.config import settings
+    from backend.services.neighbours import neighbours
+
+    # builds in the background; queries use the delta buffer until it is ready
+    if settings.NN_ENABLED:
+        neighbours.start()
+
+
+# (name, function, required)
+STEPS = [
+    ("database", _warm_database, True),
+    ("mappers", _warm_mappers, True),
+    ("factors", _warm_factors, True),
+    ("rules", _warm_rules, True),
+    ("caches", _warm_caches, False),
+    ("neighbours", _warm_neighbours, False),
+    ("llm", _warm_llm, False),
+]
+
+
+def register_step(name, fn, required=False):
+    """Let other modules add their own warm-up (rules, caches, indexes...)."""
+    STEPS.append((name, fn, required))
+
+
+# -----------------------------
+# Runner / readiness
+# -----------------------------
+def warm_up():
+    _ready.clear()
+    _report["started_at"] = time.time()
+    ok = True
+    for name, fn, required in STEPS:
+        t0 = time.perf_counter()
+        try:
+            fn()
+            status, error = "ok", None
+        except Exception as e:
+            status, error = ("failed" if required else "skipped"), str(e)
+            ok = ok and not required
+            log.warning("warm-up step %s %s", name, status, extra={"error": str(e)})
+        _report["steps"][name] = {
+            "status": status,
+            "ms": round((time.perf_counter() - t0) * 1000, 1),
+            "error": error,
+        }
+    _report["finished_at"] = time.time()
+    if ok:
+        _ready.set()
+    return ok
+
+
+def mark_not_ready():
+    _ready.clear()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def readiness_report() -> dict:
+    return {"ready": is_ready(), **_report}
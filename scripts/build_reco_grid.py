@@ -0,0 +1,73 @@
+"""
+Offline job: precompute tips for every cell of the quantised footprint grid.
+
+    python scripts/build_reco_grid.py --source auto --workers 4
+
+--source llm    ask Groq for each cell (bounded worker pool)
+--source rules  use the compiled ai/rules engine only (fully offline)
+--source auto   LLM when GROQ_API_KEY is set, rules otherwise / on failure
+
+Every result is validated before it is stored; cells that do not produce
+enough valid tips are left empty so /reco/generate falls through to the
+live path for them.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.core.config import settings  # noqa: E402
+from backend.services import recommender  # noqa: E402
+from backend.services.reco_grid import GridSpec, save_grid, validate_tips  # noqa: E402
+from backend.services.rules_engine import rank_actions  # noqa: E402
+
+
+def cell_tips(spec, idx, source):
+    totals, profile = spec.cell_totals(idx)
+    tips = None
+    if source in ("llm", "auto"):
+        tips = validate_tips(recommender.generate_llm_tips(totals, profile))
+    if tips is None and source in ("rules", "auto"):
+        tips = validate_tips(rank_actions(totals), min_valid=1)
+    return idx, tips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=settings.RECO_GRID_PATH)
+    parser.add_argument("--source", choices=("llm", "rules", "auto"), default="auto")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--limit", type=int, default=0, help="only build the first N cells (0 = all)")
+    parser.add_argument("--profiles", nargs="*", help="profile labels (default: demo profiles)")
+    args = parser.parse_args()
+
+    source = args.source
+    if source == "auto" and not settings.GROQ_API_KEY:
+        source = "rules"
+    # rules grids are stamped too: they are only served for the prompt they were built under
+    spec = GridSpec(profiles=args.profiles, prompt_version=recommender.PROMPT_VERSION)
+    n = min(spec.n_cells, args.limit) if args.limit else spec.n_cells
+    workers = max(1, args.workers) if source != "rules" else 1
+    print(f"Building {n} of {spec.n_cells} cells from '{source}' with {workers} worker(s)…")
+
+    cells, missing, t0 = {}, 0, time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(cell_tips, spec, i, source) for i in range(n)]
+        for done, fut in enumerate(as_completed(futures), 1):
+            idx, tips = fut.result()
+            if tips:
+                cells[idx] = tips
+            else:
+                missing += 1
+            if done % 5000 == 0:
+                print(f"  {done}/{n} cells ({time.time() - t0:.0f}s)")
+
+    save_grid(args.out, spec, cells)
+    print(f"✅ Wrote {args.out}: {len(cells)} cells filled, {missing} missing.")
+
+
+if __name__ == "__main__":
+    main()
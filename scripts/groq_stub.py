@@ -0,0 +1,190 @@
+"""
+Offline stand-in for the Groq API (OpenAI chat-completions protocol).
+
+    python scripts/groq_stub.py --port 8765 --latency-p50-ms 400 --latency-p99-ms 2500 \
+        --error-rate 0.02 --malformed-rate 0.05
+
+Then start the backend against it:
+
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8765 uvicorn backend.main:app
+
+Tip prompts (the ones asking for a JSON list) are answered with a JSON list
+of tips built from the Analyzer values in the prompt, multi-user batch
+prompts with ``{"users": [...]}``; everything else gets a short coaching
+answer. ``stream=true`` is answered with SSE chunks paced at
+``--tokens-per-s``. Latency is log-normal with the given p50/p99 (time to
+first token when streaming); ``--error-rate`` answers with HTTP errors and
+``--malformed-rate`` with truncated, unparsable JSON.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CATEGORIES = ("Energy", "Travel", "Food", "Goods")
+Z_99 = 2.326  # standard-normal quantile of p99
+
+
+class StubConfig:
+    def __init__(self, latency_p50_ms=300.0, latency_p99_ms=1500.0, error_rate=0.0, error_status=500,
+                 malformed_rate=0.0, tokens_per_s=400.0, seed=None):
+        self.latency_p50_ms = latency_p50_ms
+        self.latency_p99_ms = max(latency_p99_ms, latency_p50_ms)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.malformed_rate = malformed_rate
+        self.tokens_per_s = tokens_per_s
+        self.rng = random.Random(seed)
+
+    def latency_s(self):
+        if self.latency_p50_ms <= 0:
+            return 0.0
+        sigma = math.log(self.latency_p99_ms / self.latency_p50_ms) / Z_99
+        return self.rng.lognormvariate(math.log(self.latency_p50_ms), sigma) / 1000.0
+
+
+# -----------------------------
+# Canned completions
+# -----------------------------
+def _analyzer_value(text, label):
+    m = re.search(rf"{label}:\s*([\d.]+)", text)
+    return float(m.group(1)) if m else 0.0
+
+
+def tips_completion(prompt: str) -> str:
+    tips = []
+    for cat in CATEGORIES:
+        kg = _analyzer_value(prompt, cat)
+        tips.append({
+            "title": f"Trim your {cat.lower()} footprint",
+            "text": f"Small changes add up (Analyzer: {kg:g} kg {cat.lower()}).",
+            "impact_kg_month": max(1, int(kg * 0.1)),
+            "confidence": 0.7,
+            "steps": ["Pick one habit", "Track it for a week", "Make it routine"],
+            "category": cat,
+        })
+    return json.dumps(tips, ensure_ascii=False)
+
+
+def batch_completion(prompt: str) -> str:
+    # one "USER n" section per user in the multi-user tips prompt
+    parts = re.split(r"^USER (\d+)\s*$", prompt, flags=re.MULTILINE)
+    users = [
+        {"user": int(num), "tips": json.loads(tips_completion(section))}
+        for num, section in zip(parts[1::2], parts[2::2])
+    ]
+    return json.dumps({"users": users}, ensure_ascii=False)
+
+
+def chat_completion(question: str) -> str:
+    return (
+        f"Good question — \"{question[:80]}\". Start with your highest-impact area, "
+        "set one measurable goal for this week, and check your Analyzer again next month."
+    )
+
+
+def completion_text(messages: list, cfg: StubConfig) -> str:
+    last_user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    prompt = "\n".join(m.get("content") or "" for m in messages)
+    if '"users"' in last_user or "JSON list" in last_user:
+        text = batch_completion(last_user) if '"users"' in last_user else tips_completion(prompt)
+        if cfg.rng.random() < cfg.malformed_rate:
+            # cut mid-object and add chatter, like a real model that ran off the rails
+            text = "Here are your tips:\n" + text[: len(text) // 2]
+        return text
+    return chat_completion(last_user)
+
+
+def _tokens(text: str):
+    # ~4 characters per token, close enough for pacing and usage numbers
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def _usage(messages, text):
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = len(_tokens(text))
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+# -----------------------------
+# App
+# -----------------------------
+def create_app(cfg: StubConfig = None) -> FastAPI:
+    cfg = cfg or StubConfig()
+    app = FastAPI(title="Groq stub")
+    app.state.cfg = cfg
+
+    @app.get("/openai/v1/models")
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+    @app.post("/openai/v1/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        model = body.get("model", "stub")
+
+        await asyncio.sleep(cfg.latency_s())
+        if cfg.rng.random() < cfg.error_rate:
+            return JSONResponse(
+                {"error": {"message": "stub: injected failure", "type": "server_error"}},
+                status_code=cfg.error_status,
+            )
+
+        text = completion_text(messages, cfg)
+        cid, created = "chatcmpl-" + uuid.uuid4().hex, int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": cid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": _usage(messages, text),
+            }
+
+        async def chunks():
+            delay = 1.0 / cfg.tokens_per_s if cfg.tokens_per_s > 0 else 0.0
+            base = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model}
+            for i, tok in enumerate(_tokens(text)):
+                delta = {"role": "assistant", "content": tok} if i == 0 else {"content": tok}
+                yield f"data: {json.dumps(dict(base, choices=[{'index': 0, 'delta': delta, 'finish_reason': None}]))}\n\n"
+                if delay:
+                    await asyncio.sleep(delay)
+            yield f"data: {json.dumps(dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-p50-ms", type=float, default=300.0)
+    parser.add_argument("--latency-p99-ms", type=float, default=1500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with an HTTP error")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of tip answers with broken JSON")
+    parser.add_argument("--tokens-per-s", type=float, default=400.0, help="streaming pace")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    cfg = StubConfig(args.latency_p50_ms, args.latency_p99_ms, args.error_rate, args.error_status,
+                     args.malformed_rate, args.tokens_per_s, args.seed)
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Open-loop load test for /reco/generate and /reco/chat.
+
+    python scripts/load_test.py --spawn --rps 20 --duration 30 --chat-ratio 0.3
+
+--spawn starts scripts/groq_stub.py and the backend (pointed at the stub)
+as subprocesses, so the whole run is offline; without it the harness
+targets an already running backend at --url. Requests are fired on a fixed
+schedule (``--rps``) whether or not earlier ones have finished, so queueing
+shows up as latency instead of silently lowering the offered load.
+
+Reported per endpoint: requests, HTTP status counts, fallback rate,
+p50/p95/p99 latency and throughput (successful responses per second).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from backend.services.recommender import fallback_recs  # noqa: E402
+
+FALLBACK_TITLES = {t["title"] for t in fallback_recs({}, "energy", "")}
+CHAT_FALLBACK_PREFIX = "AI unavailable"
+PROFILES = ["your profile", "urban commuter", "student hostel", "frequent flyer"]
+QUESTIONS = [
+    "How can I reduce my energy footprint?",
+    "Is taking the bus really better than driving?",
+    "What is the easiest change I can make this week?",
+    "How much would going vegetarian twice a week save?",
+]
+
+
+# -----------------------------
+# Workload
+# -----------------------------
+def footprint(rng, distinct):
+    # a bounded set of footprints, so cache behaviour is part of the measurement
+    r = random.Random(rng.randrange(distinct))
+    totals = {a: round(r.uniform(10, 300), 1) for a in ("energy", "travel", "food", "goods")}
+    totals["total"] = round(sum(totals.values()), 1)
+    return totals, r.choice(PROFILES)
+
+
+def make_request(rng, args):
+    totals, profile = footprint(rng, args.distinct)
+    if rng.random() < args.chat_ratio:
+        return "chat", "/reco/chat", {"user_question": rng.choice(QUESTIONS), "totals": totals, "profile": profile}
+    return "generate", "/reco/generate", dict(totals, profile=profile)
+
+
+def is_fallback(kind, body):
+    if kind == "chat":
+        return str(body.get("response", "")).startswith(CHAT_FALLBACK_PREFIX)
+    tips = body.get("tips") or []
+    return bool(tips) and all(t.get("title") in FALLBACK_TITLES for t in tips)
+
+
+async def fire(client, kind, path, payload, client_id, results):
+    t0 = time.perf_counter()
+    try:
+        r = await client.post(path, json=payload, headers={"X-Client-Id": client_id})
+        status = r.status_code
+        fallback = status == 200 and is_fallback(kind, r.json())
+    except httpx.HTTPError as e:
+        status, fallback = type(e).__name__, False
+    results.append({"kind": kind, "status": status, "fallback": fallback, "latency": time.perf_counter() - t0})
+
+
+async def run_load(args):
+    rng = random.Random(args.seed)
+    client_ids = [uuid.uuid4().hex for _ in range(max(1, args.clients))]
+    results, tasks = [], []
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        n = int(args.rps * args.duration)
+        for i in range(n):
+            delay = start + i / args.rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind, path, payload = make_request(rng, args)
+            tasks.append(asyncio.create_task(fire(client, kind, path, payload, rng.choice(client_ids), results)))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+    return results, wall
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[i]
+
+
+def summarize(results, wall):
+    report = {}
+    for kind in sorted({r["kind"] for r in results}):
+        rows = [r for r in results if r["kind"] == kind]
+        ok = [r for r in rows if r["status"] == 200]
+        lat = sorted(r["latency"] * 1000 for r in ok)
+        statuses = {}
+        for r in rows:
+            statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+        report[kind] = {
+            "requests": len(rows),
+            "status": statuses,
+            "fallback_rate": round(sum(r["fallback"] for r in ok) / len(ok), 3) if ok else 0.0,
+            "p50_ms": round(percentile(lat, 50), 1),
+            "p95_ms": round(percentile(lat, 95), 1),
+            "p99_ms": round(percentile(lat, 99), 1),
+            "throughput_rps": round(len(ok) / wall, 2) if wall else 0.0,
+        }
+    return report
+
+
+def print_report(report, wall):
+    print(f"\nWall time: {wall:.1f}s")
+    print(f"{'endpoint':<10} {'reqs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fallback':>9} {'ok/s':>7}  status")
+    for kind, r in report.items():
+        print(
+            f"{kind:<10} {r['requests']:>6} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+            f"{r['fallback_rate']:>9.1%} {r['throughput_rps']:>7}  {r['status']}"
+        )
+
+
+# -----------------------------
+# Offline stack (--spawn)
+# -----------------------------
+def wait_until_up(url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def spawn_stack(args):
+    stub_cmd = [
+        sys.executable, os.path.join(ROOT, "scripts", "groq_stub.py"), "--port", str(args.stub_port),
+        "--latency-p50-ms", str(args.stub_p50_ms), "--latency-p99-ms", str(args.stub_p99_ms),
+        "--error-rate", str(args.stub_error_rate), "--malformed-rate", str(args.stub_malformed_rate),
+    ]
+    env = dict(os.environ, GROQ_API_KEY="stub", GROQ_BASE_URL=f"http://127.0.0.1:{args.stub_port}")
+    # the simulated clients' X-Client-Id is only honoured from a trusted proxy
+    env.setdefault("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1")
+    for kv in args.backend_env or []:
+        key, _, value = kv.partition("=")
+        env[key] = value
+    backend_cmd = [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"]
+
+    procs = [subprocess.Popen(stub_cmd, cwd=ROOT)]
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.stub_port}/v1/models")
+        procs.append(subprocess.Popen(backend_cmd, cwd=ROOT, env=env))
+        wait_until_up(f"http://127.0.0.1:{args.port}/ready")
+    except Exception:
+        stop_stack(procs)
+        raise
+    return procs
+
+
+def stop_stack(procs):
+    for p in reversed(procs):
+        p.terminate()
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of offered load")
+    parser.add_argument("--chat-ratio", type=float, default=0.3)
+    parser.add_argument("--distinct", type=int, default=200, help="number of distinct footprints")
+    parser.add_argument("--clients", type=int, default=100, help="distinct X-Client-Id values (honoured only from RATE_LIMIT_TRUSTED_PROXIES)")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    spawn = parser.add_argument_group("offline stack")
+    spawn.add_argument("--spawn", action="store_true", help="start the Groq stub and the backend")
+    spawn.add_argument("--port", type=int, default=8000)
+    spawn.add_argument("--stub-port", type=int, default=8765)
+    spawn.add_argument("--stub-p50-ms", type=float, default=300.0)
+    spawn.add_argument("--stub-p99-ms", type=float, default=1500.0)
+    spawn.add_argument("--stub-error-rate", type=float, default=0.0)
+    spawn.add_argument("--stub-malformed-rate", type=float, default=0.0)
+    spawn.add_argument("--backend-env", action="append", metavar="KEY=VALUE",
+                       help="extra backend settings, e.g. RECO_CACHE_ENABLED=false")
+    args = parser.parse_args()
+
+    procs = []
+    if args.spawn:
+        args.url = f"http://127.0.0.1:{args.port}"
+        procs = spawn_stack(args)
+    try:
+        results, wall = asyncio.run(run_load(args))
+    finally:
+        stop_stack(procs)
+
+    report = summarize(results, wall)
+    if args.json:
+        print(json.dumps({"wall_s": round(wall, 2), "endpoints": report}, indent=2))
+    else:
+        print_report(report, wall)
+
+
+if __name__ == "__main__":
+    main()
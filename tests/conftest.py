@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+# The caches, ledger, corpus and feedback store are module-level singletons
+# bound to their paths at import, so the paths are set before any backend
+# import: test runs never write into (or read state from) the repo root.
+_STATE_DIR = tempfile.mkdtemp(prefix="carbonlens-tests-")
+
+for _name, _file in (
+    ("RECO_CACHE_PATH", "reco_cache.db"),
+    ("LLM_LEDGER_PATH", "llm_ledger.db"),
+    ("RECO_CORPUS_PATH", "tip_corpus.db"),
+    ("RECO_BANDIT_PATH", "tip_feedback.db"),
+):
+    os.environ[_name] = os.path.join(_STATE_DIR, _file)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_STATE_DIR, "carbonlens.db")
+
+
+def pytest_unconfigure(config):
+    import shutil
+
+    shutil.rmtree(_STATE_DIR, ignore_errors=True)
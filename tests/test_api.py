@@ -6,3 +6,9 @@ client = TestClient(app)
 def test_health():
     r = client.get("/api/health")
     assert r.status_code == 200
+
+def test_ready_after_warmup():
+    with TestClient(app) as c:
+        r = c.get("/ready")
+        assert r.status_code == 200
+        assert r.json()["steps"]["database"]["status"] == "ok"
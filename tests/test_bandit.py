@@ -0,0 +1,78 @@
+from backend.services.bandit import TipBandit, tip_key
+
+
+def _tip(tip_id, impact, confidence=0.8):
+    return {"id": tip_id, "title": tip_id.upper(), "impact_kg_month": impact, "confidence": confidence}
+
+
+TIPS = [_tip("rule-energy-0", 20), _tip("rule-energy-1", 15), _tip("rule-food-0", 10)]
+
+
+def test_order_is_unchanged_until_a_tip_is_completed(tmp_path):
+    bandit = TipBandit(str(tmp_path / "fb.db"), seed=0)
+    for _ in range(5):
+        assert bandit.rank(TIPS, "car commuter") == TIPS
+    assert bandit.stats()["reordered"] == 0
+
+
+def test_completed_tips_rise_within_their_segment(tmp_path):
+    bandit = TipBandit(str(tmp_path / "fb.db"), seed=0)
+    for _ in range(30):
+        bandit.impressions(bandit.rank(TIPS, "car commuter"), "car commuter")
+        bandit.feedback(TIPS[2], "car commuter")
+    first = [bandit.rank(TIPS, "car commuter")[0]["id"] for _ in range(20)]
+    assert first.count("rule-food-0") >= 18
+    # other segments keep the original order
+    assert bandit.rank(TIPS, "meat-heavy diet") == TIPS
+
+    # counters survive a restart; unticking takes a completion back
+    reloaded = TipBandit(bandit.path, seed=0)
+    reloaded.load()
+    assert reloaded.stats()["completions"] == 30
+    reloaded.feedback(TIPS[2], "car commuter", done=False)
+    assert reloaded.stats()["completions"] == 29
+
+
+def test_llm_tips_are_keyed_by_title():
+    a = tip_key({"id": "rec_3_1234", "title": "Take the  Metro"})
+    assert a == tip_key({"title": "take the metro"}) and a.startswith("title-")
+    assert tip_key({"id": "corpus-12", "title": "x"}) == "corpus-12"
+
+
+def test_only_served_lists_count_as_impressions(tmp_path):
+    bandit = TipBandit(str(tmp_path / "fb.db"), seed=0)
+    for _ in range(3):
+        bandit.rank(TIPS, "car commuter")
+    assert bandit.stats()["impressions"] == 0 and int(bandit.shown.sum()) == 0
+    bandit.impressions(TIPS + [{"title": "LLM tip"}], "car commuter")
+    assert bandit.stats()["impressions"] == 3 and int(bandit.shown.sum()) == 3
+
+
+def test_process_wide_bandit_is_created_on_first_use():
+    import subprocess
+    import sys
+
+    code = "import backend.main; from backend.services import bandit; assert bandit._bandit is None"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_only_rankable_tips_get_counters(tmp_path, monkeypatch):
+    bandit = TipBandit(str(tmp_path / "fb.db"), seed=0)
+    llm_tips = [{"title": f"LLM tip {i}"} for i in range(50)]
+    assert bandit.rank(llm_tips + TIPS, "car commuter") == llm_tips + TIPS
+    assert bandit.feedback({"title": "x" * 500}, "car commuter") is None
+    assert bandit.stats()["tips"] == 0 and bandit.stats()["pending"] == 0
+
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    from backend.services import bandit as bandit_module
+    from backend.services.rules_engine import get_engine
+
+    monkeypatch.setattr(bandit_module, "_bandit", bandit)
+    client = TestClient(app)
+    totals = {"total": 300, "energy": 100, "travel": 100, "food": 80, "goods": 20}
+    rule_id = get_engine().ids[0]
+    assert client.post("/reco/feedback", json={"title": "x" * 500, **totals}).json()["tip"] is None
+    assert client.post("/reco/feedback", json={"tip_id": "rule-made-up-7", **totals}).json()["tip"] is None
+    assert client.post("/reco/feedback", json={"tip_id": rule_id, **totals}).json()["tip"] == rule_id
+    assert bandit.stats()["tips"] == 1
@@ -0,0 +1,70 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils_batch_client import ARROW, JSON, MSGPACK, decode_columns
+from backend.api import routes_footprint
+from backend.services.calculator import compute_footprint, compute_footprint_batch
+
+app = FastAPI()
+app.include_router(routes_footprint.router)
+client = TestClient(app)
+
+ROWS = [
+    {"electricityKwh": 200, "carKm": 250, "busKm": 100, "diet": "mixed"},
+    {"electricityKwh": 120, "naturalGasTherms": 3, "foodEmissions": 2.5, "goodsEmissions": 40},
+]
+
+
+def test_batch_matches_scalar():
+    fields = ("electricityKwh", "naturalGasTherms", "carKm", "busKm", "diet", "foodEmissions", "goodsEmissions")
+    columns = {k: [r.get(k, "mixed" if k == "diet" else 0) for r in ROWS] for k in fields}
+    batch = compute_footprint_batch(columns)
+    for i, row in enumerate(ROWS):
+        assert batch["total"][i] == compute_footprint(row)["total"]
+
+
+def test_batch_endpoint_formats_roundtrip():
+    decoded = []
+    for media in (JSON, MSGPACK, ARROW):
+        r = client.post("/footprint/compute/batch", json=ROWS, headers={"Accept": media})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith(media)
+        decoded.append(decode_columns(r.headers["content-type"], r.content))
+    for cols in decoded[1:]:
+        np.testing.assert_allclose(cols["total"], decoded[0]["total"])
+        np.testing.assert_array_equal(cols["score"], decoded[0]["score"])
+
+
+def test_arrow_keeps_bool_columns():
+    import pyarrow as pa
+    from backend.api.negotiation import _to_arrow
+
+    flags = np.array([True, False, True, True])
+    table = pa.ipc.open_stream(_to_arrow({"flag": flags})).read_all()
+    assert table.column("flag").to_pylist() == flags.tolist()
+
+
+def test_invalid_batches_are_rejected():
+    for rows in (
+        [{"carKm": "abc"}],
+        {"columns": {"carKm": [1, 2], "busKm": [1]}},
+        [{"carKm": 1, "diet": "carnivore"}],
+    ):
+        assert client.post("/footprint/compute/batch", json=rows).status_code == 422
+    assert client.get("/footprint/export", params={"limit": 10**9}).status_code == 422
+
+
+def test_bad_binary_columns_are_a_client_error():
+    import msgpack
+
+    for col in (
+        {"dtype": "zzz", "data": b"\0" * 8},
+        {"dtype": "O", "data": b"\0" * 8},
+        {"dtype": "<f8", "data": b"\0" * 7},
+    ):
+        body = msgpack.packb({"columns": {"carKm": col}}, use_bin_type=True)
+        r = client.post("/footprint/compute/batch", content=body, headers={"Content-Type": MSGPACK})
+        assert r.status_code == 400, col
+    body = msgpack.packb({"columns": {"carKm": {"dtype": "<f8", "data": np.ones(2).tobytes()}}}, use_bin_type=True)
+    assert client.post("/footprint/compute/batch", content=body, headers={"Content-Type": MSGPACK}).status_code == 200
@@ -0,0 +1,45 @@
+import json
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import routes_reco
+from backend.services import recommender
+
+
+class FakeStream:
+    def __init__(self, parts):
+        self.parts = parts
+        self.closed = False
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for p in self.parts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p))])
+
+    async def close(self):
+        self.closed = True
+
+
+def test_chat_stream_forwards_tokens_as_sse(monkeypatch):
+    stream = FakeStream(["Cut ", "AC ", "use."])
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(recommender, "_async_client", fake)
+
+    app = FastAPI()
+    app.include_router(routes_reco.router)
+    r = TestClient(app).post("/reco/chat/stream", json={"user_question": "hi", "totals": {"energy": 10}})
+
+    assert r.headers["content-type"].startswith("text/event-stream")
+    data = [json.loads(line[6:]) for line in r.text.splitlines() if line.startswith("data: ")]
+    assert "".join(d.get("token", "") for d in data) == "Cut AC use."
+    assert "event: done" in r.text
+    assert stream.closed
@@ -0,0 +1,66 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.core.config import settings
+from backend.db.models import Base
+from backend.services import conversations
+
+
+def _memory_store(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(conversations, "session_factory", sessionmaker(bind=engine))
+    # summaries are refreshed explicitly in these tests
+    monkeypatch.setattr(conversations, "schedule_summary", lambda cid: False)
+
+
+def test_fit_budget_keeps_newest_turns_starting_with_a_question():
+    msgs = [
+        {"role": "user", "content": "a" * 400},
+        {"role": "assistant", "content": "b" * 400},
+        {"role": "user", "content": "c" * 40},
+        {"role": "assistant", "content": "d" * 40},
+    ]
+    dropped, kept = conversations.fit_budget(msgs, budget=130)
+    assert [m["content"][0] for m in kept] == ["c", "d"]
+    assert len(dropped) == 2
+
+    # a window that would open on an answer drops that answer too
+    dropped, kept = conversations.fit_budget(msgs, budget=20)
+    assert kept == []
+
+
+def test_history_is_bounded_and_older_turns_are_summarised(monkeypatch):
+    _memory_store(monkeypatch)
+    monkeypatch.setattr(settings, "CHAT_HISTORY_TOKEN_BUDGET", 200)
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "")
+
+    for i in range(5):
+        conversations.record_turn("c1", f"question {i} " + "x" * 120, f"answer {i} " + "y" * 120)
+
+    summary, recent, dropped = conversations.load_context("c1")
+    assert summary == ""
+    assert recent[-1]["content"].startswith("answer 4")
+    assert sum(conversations.estimate_tokens(m["content"]) for m in recent) <= 200
+    assert dropped and dropped[0]["content"].startswith("question 0")
+
+    conversations.refresh_summary("c1")
+    summary, recent, dropped = conversations.load_context("c1")
+    assert "question 0" in summary
+    # summarised messages are never sent again
+    assert not any(m["content"].startswith("question 0") for m in dropped + recent)
+    assert recent[-1]["content"].startswith("answer 4")
+
+
+def test_with_history_prefers_the_stored_transcript(monkeypatch):
+    _memory_store(monkeypatch)
+    conversations.record_turn("c2", "How do I save energy?", "Use LED bulbs.")
+
+    payload = conversations.with_history({
+        "conversation_id": "c2",
+        "user_question": "And travel?",
+        "chat_history": [{"role": "user", "content": "ignored"}],
+    })
+    assert [m["content"] for m in payload["chat_history"]] == ["How do I save energy?", "Use LED bulbs."]
+    assert payload["conversation_summary"] == ""
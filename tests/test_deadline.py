@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.core import deadline
+from backend.services.llm_client import Provider, ResilientLLM
+from backend.services.llm_gateway import LLMGateway
+
+
+def test_header_sets_the_request_deadline():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(deadline.remaining())
+
+    mw = deadline.DeadlineMiddleware(app)
+    asyncio.run(mw({"type": "http", "headers": [(b"x-deadline-ms", b"2000")]}, None, None))
+    asyncio.run(mw({"type": "http", "headers": [(b"x-deadline-ms", b"soon")]}, None, None))
+    assert 1.5 < seen[0] <= 2.0
+    assert seen[1] is None
+    assert deadline.current() is None  # reset after the request
+
+
+def test_max_tokens_fit_the_time_left():
+    assert deadline.max_tokens(600, 60) == 600
+    assert deadline.max_tokens(600, 1.0) < 600
+    assert deadline.max_tokens(600, 0.01) > 0
+    assert deadline.max_tokens(None, 1.0) is None
+
+
+def test_gateway_drops_a_job_whose_caller_gave_up():
+    gw = LLMGateway(max_concurrency=1, queue_deadline_s=5)
+    release = threading.Event()
+    gw.submit(release.wait)
+    ran = []
+    with deadline.scope(0.05):
+        assert gw.call(ran.append, 1, fallback="fallback") == "fallback"
+        fut = gw.submit(ran.append, 2)
+    release.set()
+    with pytest.raises(deadline.DeadlineExceeded):
+        fut.result(timeout=2)
+    assert not ran
+    assert gw.stats()["abandoned"] == 1
+    gw.shutdown()
+
+
+def test_llm_call_is_shortened_to_the_deadline():
+    sent = []
+
+    def create(**kwargs):
+        sent.append(kwargs)
+        return "ok"
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    llm = ResilientLLM([Provider("primary", lambda: client, model="m")], timeout_s=30)
+    with deadline.scope(1.0):
+        assert llm.create(messages=[], max_tokens=600) == "ok"
+    assert sent[0]["max_tokens"] < 600
+
+    with deadline.scope(0.05), pytest.raises(deadline.DeadlineExceeded):
+        llm.create(messages=[], max_tokens=600)
+    assert len(sent) == 1
+    assert deadline.stats()["abandoned"].get("llm", 0) >= 1
@@ -0,0 +1,59 @@
+from backend.services import recommender
+from backend.services.faq_router import CountMinSketch, FaqRouter
+
+TOTALS = {"energy": 150, "travel": 60, "food": 160, "goods": 40, "total": 410}
+
+
+def test_common_questions_are_answered_with_the_users_numbers():
+    router = FaqRouter(0.6)
+    answer = router.answer("How can I reduce my energy footprint?", TOTALS)
+    assert "150.0 kg" in answer and "37%" in answer
+    assert "LED" in answer
+    assert "**food**" in router.answer("what's my biggest area", TOTALS)
+    assert "above" in router.answer("Am I above average?", TOTALS)
+
+
+def test_novel_questions_and_empty_totals_go_to_the_llm():
+    router = FaqRouter(0.6)
+    assert router.answer("hi", TOTALS) is None
+    assert router.answer("should I buy an electric car or a hybrid", TOTALS) is None
+    assert router.answer("How can I reduce my energy footprint?", {}) is None
+    stats = router.stats()
+    assert stats["questions"] == 2 and stats["answered"] == 0
+
+
+def test_sketch_never_undercounts_and_tracks_frequent_questions():
+    sketch = CountMinSketch(width=64, depth=4)
+    for i in range(500):
+        sketch.add(f"q{i % 50}")
+    assert all(sketch.estimate(f"q{i}") >= 10 for i in range(50))
+
+    router = FaqRouter(0.6)
+    for _ in range(3):
+        router.answer("What's my biggest area?", TOTALS)
+    router.answer("is nuclear power green", TOTALS)
+    top = router.stats()["top_questions"]
+    assert top[0] == {"question": "what's my biggest area", "count": 3, "intent": "biggest_area"}
+    assert top[1]["intent"] is None
+
+
+def test_chat_skips_the_llm_for_faq_intents(monkeypatch):
+    def create(**kwargs):
+        raise AssertionError("LLM called for an FAQ question")
+
+    monkeypatch.setattr(recommender.llm, "create", create)
+    monkeypatch.setattr(recommender.llm, "stream", create)
+    payload = {"user_question": "How much CO2 do I emit?", "totals": TOTALS}
+    assert "410.0 kg" in recommender.generate_chat_response(payload)
+    assert "410.0 kg" in "".join(recommender.stream_chat_tokens(payload))
+
+
+def test_sketch_rows_hash_independently():
+    sketch = CountMinSketch(width=64, depth=4)
+    cols = {f"q{i}": sketch._cols(f"q{i}") for i in range(2000)}
+    first_row = {}
+    for key, c in cols.items():
+        first_row.setdefault(c[0], []).append(c)
+    # keys sharing a column in row 0 mostly part ways in the other rows
+    pairs = [(x, y) for group in first_row.values() for x, y in zip(group, group[1:])]
+    assert sum(x[1:] == y[1:] for x, y in pairs) / len(pairs) < 0.05
@@ -0,0 +1,49 @@
+import importlib.util
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from groq import Groq
+
+from backend.services import recommender
+
+_spec = importlib.util.spec_from_file_location(
+    "groq_stub", Path(__file__).resolve().parents[1] / "scripts" / "groq_stub.py"
+)
+groq_stub = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(groq_stub)
+
+
+def _client(**cfg):
+    app = groq_stub.create_app(groq_stub.StubConfig(latency_p50_ms=0, tokens_per_s=0, seed=1, **cfg))
+    return Groq(api_key="stub", base_url="http://testserver", http_client=TestClient(app), max_retries=0)
+
+
+def test_stub_answers_tip_prompts_with_parsable_tips():
+    messages = recommender._tips_messages(
+        {"total": 300, "energy": 150, "travel": 50, "food": 80, "goods": 20}, "urban commuter", "energy"
+    )
+    resp = _client().chat.completions.create(model="stub", messages=messages)
+    tips = recommender._extract_json_from_text(resp.choices[0].message.content)
+    assert [t["category"] for t in tips] == ["Energy", "Travel", "Food", "Goods"]
+    assert tips[0]["impact_kg_month"] == 15
+    assert resp.usage.completion_tokens > 0
+
+
+def test_stub_streams_chunks_and_injects_faults():
+    stream = _client().chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "How do I save energy?"}], stream=True
+    )
+    text = "".join(c.choices[0].delta.content or "" for c in stream)
+    assert text.startswith("Good question")
+
+    malformed = _client(malformed_rate=1.0).chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "Return ONLY a JSON list"}]
+    )
+    assert recommender._extract_json_from_text(malformed.choices[0].message.content) is None
+
+    try:
+        _client(error_rate=1.0).chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}])
+    except Exception as e:
+        assert getattr(e, "status_code", None) == 500
+    else:
+        raise AssertionError("expected an injected failure")
@@ -0,0 +1,73 @@
+"""
+Import-time budgets for the API worker and the Streamlit pages.
+
+Each target is imported in a fresh interpreter under ``python -X importtime``
+and the cumulative time of everything imported after start-up is compared
+with the budget stored in ``import_budgets.json``. Streamlit pages render
+when executed, so for them only their module-level import statements are
+timed. Set ``IMPORT_BUDGET_SCALE`` (e.g. ``2``) on slow CI machines.
+"""
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGETS = json.loads((Path(__file__).parent / "import_budgets.json").read_text())
+SCALE = float(os.environ.get("IMPORT_BUDGET_SCALE", "1"))
+MARKER = "--import-budget-start--"
+
+
+def _page_imports(path: Path) -> str:
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            nodes.append(node)
+        elif isinstance(node, ast.Try):
+            nodes += [n for n in node.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+
+def _import_ms(code: str) -> float:
+    """Cumulative import time (ms) of top-level imports made by ``code``."""
+    script = f"import sys; sys.stderr.write({MARKER!r} + '\\n')\n{code}\n"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    lines = proc.stderr.split(MARKER, 1)[1].splitlines()
+    total_us = 0
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level entry (children are indented)
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def _best_of(code: str, runs: int = 3) -> float:
+    return min(_import_ms(code) for _ in range(runs))
+
+
+def test_backend_main_import_budget():
+    ms = _best_of("import backend.main")
+    assert ms <= BUDGETS["backend.main"] * SCALE, f"backend.main imports in {ms:.0f} ms"
+
+
+def test_backend_main_leaves_numpy_to_first_use():
+    code = "import sys, backend.main; assert 'numpy' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, timeout=120)
+
+
+@pytest.mark.parametrize("page", sorted(p.name for p in (ROOT / "app" / "pages").glob("[0-9]*.py")))
+def test_streamlit_page_import_budget(page):
+    ms = _best_of(_page_imports(ROOT / "app" / "pages" / page))
+    budget = BUDGETS[f"app/pages/{page}"]
+    assert ms <= budget * SCALE, f"{page} imports in {ms:.0f} ms (budget {budget} ms)"
@@ -0,0 +1,108 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.llm_client import CircuitBreaker, Provider, ProviderUnavailable, ResilientLLM
+
+
+def _provider(name, create):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return Provider(name, lambda: client, model=name)
+
+
+def _answer(text, delay=0.0):
+    def create(**kwargs):
+        time.sleep(delay)
+        return text
+    return create
+
+
+def _fail(**kwargs):
+    raise ConnectionError("provider down")
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    breaker = CircuitBreaker(failures=2, cooldown_s=0.05)
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()       # the trial call
+    assert not breaker.allow()   # nobody else until it reports back
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_slow_primary_is_hedged_to_the_secondary():
+    slow = _provider("primary", _answer("slow", delay=0.5))
+    fast = _provider("secondary", _answer("fast"))
+    for _ in range(20):
+        slow.observe("call", 0.01)  # primary's p95 is 10 ms
+
+    client = ResilientLLM([slow, fast], timeout_s=2.0, hedge_min_delay_s=0.05)
+    t0 = time.monotonic()
+    assert client.create(messages=[]) == "fast"
+    assert time.monotonic() - t0 < 0.4
+    assert slow.stats["hedges"] == 1 and fast.stats["hedge_wins"] == 1
+
+
+def test_failures_fail_over_and_open_the_breaker():
+    down = _provider("primary", _fail)
+    backup = _provider("secondary", _answer("ok"))
+    client = ResilientLLM([down, backup], timeout_s=1.0)
+    for _ in range(5):
+        assert client.create(messages=[]) == "ok"
+    assert down.breaker.state == "open"
+    assert down.stats["calls"] == 5  # skipped from now on
+    client.create(messages=[])
+    assert down.stats["calls"] == 5
+
+    alone = ResilientLLM([_provider("solo", _fail)], timeout_s=1.0)
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            alone.create(messages=[])
+    assert not alone.available()
+    with pytest.raises(ProviderUnavailable):
+        alone.create(messages=[])
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+def test_only_outages_count_against_the_breaker():
+    def bad_request(**kwargs):
+        raise _BadRequest("invalid max_tokens")
+
+    client = ResilientLLM([_provider("primary", bad_request)], timeout_s=1.0)
+    for _ in range(10):
+        with pytest.raises(_BadRequest):
+            client.create(messages=[])
+    assert client.available()
+
+    # a half-open trial whose client cannot even be built gives its slot back
+    broken = Provider("primary", lambda: 1 / 0, model="m")
+    broken.breaker = CircuitBreaker(failures=1, cooldown_s=0.01)
+    broken.breaker.record(False)
+    time.sleep(0.02)
+    with pytest.raises(ZeroDivisionError):
+        ResilientLLM([broken], timeout_s=1.0).create(messages=[])
+    assert broken.breaker.allow()
+
+
+def test_hedge_loser_failing_late_is_not_a_breaker_failure():
+    def slow_then_timeout(**kwargs):
+        time.sleep(0.3)
+        raise TimeoutError("read timed out")
+
+    slow = _provider("primary", slow_then_timeout)
+    fast = _provider("secondary", _answer("fast"))
+    for _ in range(20):
+        slow.observe("call", 0.01)
+    client = ResilientLLM([slow, fast], timeout_s=2.0, hedge_min_delay_s=0.05)
+    assert client.create(messages=[]) == "fast"
+    time.sleep(0.4)
+    assert slow.stats["failures"] == 1 and slow.breaker._consecutive == 0
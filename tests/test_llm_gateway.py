@@ -0,0 +1,52 @@
+import threading
+import time
+
+from backend.services.llm_gateway import LLMGateway, PRIORITY_CHAT, PRIORITY_TIPS
+
+
+def test_chat_jumps_ahead_of_queued_tips():
+    gw = LLMGateway(max_concurrency=1, queue_deadline_s=5)
+    release = threading.Event()
+    order = []
+    blocker = gw.submit(release.wait)
+    tips = gw.submit(order.append, "tips", priority=PRIORITY_TIPS)
+    chat = gw.submit(order.append, "chat", priority=PRIORITY_CHAT)
+    release.set()
+    for f in (blocker, tips, chat):
+        f.result(timeout=2)
+    assert order == ["chat", "tips"]
+    gw.shutdown()
+
+
+def test_queued_job_is_shed_to_fallback_after_deadline():
+    gw = LLMGateway(max_concurrency=1, queue_deadline_s=0.05)
+    release = threading.Event()
+    gw.submit(release.wait)
+    result = gw.call(lambda: "llm", fallback=lambda: "fallback")
+    release.set()
+    assert result == "fallback"
+    assert gw.stats()["shed"] == 1
+    gw.shutdown()
+
+
+def test_full_queue_sheds_on_submit_and_shutdown_fails_waiters():
+    import pytest
+
+    from backend.services.llm_gateway import GatewayUnavailable, PRIORITY_BACKGROUND
+
+    gw = LLMGateway(max_concurrency=1, queue_deadline_s=5, max_queue=2)
+    release = threading.Event()
+    gw.submit(release.wait)
+    while gw.stats()["running"] == 0:  # the blocker has left the queue
+        time.sleep(0.01)
+    queued = gw.submit(lambda: "tips")
+    with pytest.raises(GatewayUnavailable):
+        gw.submit(lambda: "refresh", priority=PRIORITY_BACKGROUND).result(timeout=0)
+    gw.submit(lambda: "tips")
+    assert gw.call(lambda: "llm", fallback="fallback") == "fallback"
+    assert gw.stats()["shed"] == 2
+
+    gw.shutdown()
+    with pytest.raises(GatewayUnavailable):
+        queued.result(timeout=1)
+    release.set()
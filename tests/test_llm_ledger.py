@@ -0,0 +1,69 @@
+import sqlite3
+
+from backend.services.llm_ledger import LLMLedger
+
+
+class _Usage:
+    prompt_tokens = 1000
+    completion_tokens = 500
+
+
+def test_calls_are_aggregated_and_flushed(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger = LLMLedger(path, flush_s=60)
+
+    for i in range(10):
+        rec = ledger.start("tips", "tips-v1", [{"role": "user", "content": "x" * 400}])
+        rec.set_source("groq", "llama")
+        rec.add_output("y" * 40)
+        if i % 2:
+            rec.set_usage(_Usage())
+        rec.finish("parsed" if i < 8 else "error")
+        rec.finish("parsed")  # a second finish is ignored
+
+    hour = ledger.usage(1)["hours"][0]
+    assert hour["calls"] == 10
+    assert hour["outcomes"] == {"parsed": 8, "fallback": 0, "error": 2, "discarded": 0, "abandoned": 0}
+    assert hour["models"] == {"llama": 10}
+    # five calls with exact usage, five estimated from characters (~4 chars per token)
+    assert hour["prompt_tokens"] == 5 * 1000 + 5 * 100
+    assert hour["completion_tokens"] == 5 * 500 + 5 * 10
+    assert hour["cost_usd"] > 0
+    assert hour["latency_ms"]["p50"] is not None and hour["ttft_ms"]["p99"] is not None
+
+    ledger.flush()
+    rows = sqlite3.connect(path).execute("SELECT kind, outcome, model FROM llm_calls").fetchall()
+    assert len(rows) == 10 and rows[0] == ("tips", "parsed", "llama")
+    assert ledger.usage(1)["pending_writes"] == 0
+
+
+def test_hedge_loser_gets_its_own_row(tmp_path):
+    import time
+    from types import SimpleNamespace
+
+    from backend.services.llm_client import Provider, ResilientLLM
+
+    def answer(delay):
+        def create(**kwargs):
+            time.sleep(delay)
+            return SimpleNamespace(usage=_Usage())
+        return create
+
+    def provider(name, delay):
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=answer(delay))))
+        return Provider(name, lambda: client, model=name)
+
+    slow, fast = provider("primary", 0.3), provider("secondary", 0.0)
+    for _ in range(20):
+        slow.observe("call", 0.01)
+    ledger = LLMLedger(str(tmp_path / "ledger.db"), flush_s=60)
+    rec = ledger.start("tips", "tips-v1", [{"role": "user", "content": "x" * 400}])
+    resp = ResilientLLM([slow, fast], timeout_s=2.0, hedge_min_delay_s=0.05).create(record=rec, messages=[])
+    rec.set_usage(resp.usage)
+    rec.finish("parsed")
+    time.sleep(0.4)  # the loser lands after the winner
+
+    hour = ledger.usage(1)["hours"][0]
+    assert hour["outcomes"]["parsed"] == 1 and hour["outcomes"]["discarded"] == 1
+    assert hour["models"] == {"primary": 1, "secondary": 1}
+    assert hour["prompt_tokens"] == 2000 and hour["completion_tokens"] == 1000
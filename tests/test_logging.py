@@ -0,0 +1,48 @@
+import json
+import logging
+
+from backend.core import log as log_setup
+
+
+def test_records_are_written_as_json_by_the_listener(tmp_path):
+    out = tmp_path / "out.log"
+    conf = tmp_path / "logging.conf"
+    conf.write_text(
+        "[loggers]\nkeys=root\n[handlers]\nkeys=file\n[formatters]\nkeys=json\n"
+        "[logger_root]\nlevel=DEBUG\nhandlers=file\n"
+        f"[handler_file]\nclass=FileHandler\nlevel=DEBUG\nformatter=json\nargs=({str(out)!r},)\n"
+        "[formatter_json]\nclass=backend.core.log.JsonFormatter\n"
+    )
+    root = logging.getLogger()
+    saved = (list(root.handlers), root.level)
+    try:
+        log_setup.setup_logging(str(conf))
+        assert any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers)
+        logger = logging.getLogger("backend.test")
+        logger.warning("call failed for %s", "tips", extra={"kind": "tips"})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("with traceback")
+        log_setup.shutdown_logging()  # drains the queue
+
+        first, second = [json.loads(line) for line in out.read_text().splitlines()]
+        assert first["msg"] == "call failed for tips" and first["kind"] == "tips"
+        assert first["level"] == "WARNING" and first["logger"] == "backend.test"
+        assert "ValueError: boom" in second["exc"]
+    finally:
+        log_setup.shutdown_logging()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+            h.close()
+        for h in saved[0]:
+            root.addHandler(h)
+        root.setLevel(saved[1])
+
+
+def test_raw_output_sampling_needs_debug_and_a_rate():
+    logger = logging.getLogger("backend.sampling")
+    logger.setLevel(logging.INFO)
+    assert not log_setup.sampled(logger, 1.0)
+    logger.setLevel(logging.DEBUG)
+    assert log_setup.sampled(logger, 1.0) and not log_setup.sampled(logger, 0.0)
@@ -0,0 +1,72 @@
+import importlib.util
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from groq import Groq
+
+from backend.services import recommender
+from backend.services.microbatch import MicroBatcher
+
+_spec = importlib.util.spec_from_file_location(
+    "groq_stub", Path(__file__).resolve().parents[1] / "scripts" / "groq_stub.py"
+)
+groq_stub = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(groq_stub)
+
+
+def test_calls_in_one_window_share_a_batch():
+    seen = []
+
+    def run(items):
+        seen.append(list(items))
+        return [x * 10 for x in items]
+
+    batcher = MicroBatcher(run, window_s=0.1, max_batch=3)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.call(i, timeout=2))) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i * 10 for i in range(5)}
+    assert sorted(len(b) for b in seen) == [2, 3]  # max_batch splits the burst
+    assert batcher.stats()["largest"] == 3
+
+
+def test_batch_prompt_is_split_back_per_user(monkeypatch):
+    app = groq_stub.create_app(groq_stub.StubConfig(latency_p50_ms=0, seed=1))
+    client = Groq(api_key="stub", base_url="http://testserver", http_client=TestClient(app), max_retries=0)
+    monkeypatch.setattr(recommender, "_client", client)
+
+    entries = [
+        ({"total": 100, "energy": 100, "travel": 0, "food": 0, "goods": 0}, "student hostel", "energy"),
+        ({"total": 300, "energy": 0, "travel": 300, "food": 0, "goods": 0}, "frequent flyer", "travel"),
+    ]
+    first, second = recommender.llm_tips_batch(entries)
+    assert {t["category"]: t["impact_kg_month"] for t in first}["Energy"] == 10
+    assert {t["category"]: t["impact_kg_month"] for t in second}["Travel"] == 30
+
+    # users the model skipped come back as None (and are retried on their own)
+    assert recommender._split_batch({"users": [{"user": 2, "tips": [{"title": "x"}]}]}, 2)[0] is None
+
+
+def test_slow_batch_falls_back_and_misses_are_left_to_the_caller(monkeypatch):
+    import asyncio
+
+    release = threading.Event()
+    batcher = MicroBatcher(lambda items: release.wait(2) and items, window_s=0.01, max_batch=4)
+
+    async def main():
+        return await batcher.acall(1, timeout=0.05, fallback=lambda: "fallback")
+
+    assert asyncio.run(main()) == "fallback"
+    release.set()
+    assert batcher.stats()["timeouts"] == 1
+
+    tips = [{"title": "Carpool"}]
+    monkeypatch.setattr(recommender, "llm_tips_batch", lambda entries: [tips, None])
+    monkeypatch.setattr(recommender, "store_tips", lambda payload, tips, **kwargs: None)
+    payloads = [{"energy": 10, "total": 10}, {"travel": 20, "total": 20}]
+    assert recommender.generate_tips_batch(payloads) == [tips, None]
@@ -0,0 +1,60 @@
+import numpy as np
+
+from backend.services.neighbours import ExactIndex, NeighbourService, ProjectionIndex, summarise, vectors
+
+
+def _runs(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.lognormal(np.log([110, 70, 150, 45]), [0.7, 1.0, 0.45, 0.9], (n, 4)).astype(np.float32)
+
+
+def test_projection_index_recall_against_exact():
+    runs = _runs()
+    exact, approx = ExactIndex(runs), ProjectionIndex(runs, leaf_size=128, probes=3)
+    recall = []
+    for q in _runs(50, seed=1):
+        v = vectors(q)[0]
+        _, truth = exact.query(v, 50)
+        _, got = approx.query(v, 50)
+        found = {tuple(r) for r in approx.totals[got]}
+        recall.append(np.mean([tuple(r) in found for r in runs[truth]]))
+    assert np.mean(recall) > 0.6
+
+
+def test_summary_reports_savings_against_the_median():
+    neighbours = np.array([[100, 50, 150, 40], [120, 60, 150, 40], [110, 55, 150, 40]], dtype=np.float64)
+    out = summarise({"energy": 200, "travel": 40, "food": 150, "goods": 40}, neighbours)
+    assert out["median_by_category"]["energy"] == 110
+    assert out["savings_by_category"] == {"energy": 90, "travel": 0, "food": 0, "goods": 0}
+    assert out["savings_kg_month"] == 90 and out["share_emitting_less"] == 1.0
+
+
+def test_unindexed_runs_are_searched_from_the_delta_buffer():
+    service = NeighbourService()
+    assert service.similar({"energy": 100}) is None
+    for i in range(5):
+        service.add(i + 1, {"energy": 100 + i, "travel": 50, "food": 150, "goods": 20})
+    out = service.similar({"energy": 100, "travel": 50, "food": 150, "goods": 20}, k=3)
+    assert out["k"] == 3 and out["mode"] == "delta"
+    assert out["median_by_category"]["energy"] == 101
+
+
+def test_similar_leaves_out_the_callers_run_and_repeated_forms():
+    service = NeighbourService()
+    mine = {"energy": 500, "travel": 5, "food": 100, "goods": 5}
+    service.add(1, {"energy": 100, "travel": 50, "food": 150, "goods": 20})
+    service.add(2, mine)
+    service.add(3, mine)  # the same form computed again
+    service.add(2, mine)
+    assert service.stats()["delta"] == 2
+    out = service.similar(mine, k=5, exclude=2)
+    assert out["k"] == 1 and out["median_by_category"]["energy"] == 100
+
+    runs = _runs(500)
+    service = NeighbourService()
+    service._index = ExactIndex(runs, ids=np.arange(1, 501))
+    service._built_upto = 500
+    twin = dict(zip(("energy", "travel", "food", "goods"), map(float, runs[9])))
+    assert service.similar(twin, k=1)["savings_kg_month"] == 0
+    out = service.similar(twin, k=1, exclude=10)
+    assert out["median_by_category"] != {a: round(v, 1) for a, v in twin.items()}
@@ -0,0 +1,95 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import routes_reco
+from backend.services.recommender import category_order, merge_tip_groups
+
+
+def _tip(title, impact, category):
+    return {"title": title, "text": "t", "impact_kg_month": impact, "confidence": 1.0, "steps": [], "category": category}
+
+
+def test_merge_dedupes_and_puts_the_highest_category_first():
+    groups = {
+        "travel": [_tip("Take the bus", 30, "Travel"), _tip("Fix drafts", 5, "Travel")],
+        "energy": [_tip("Fix drafts!", 10, "Energy"), _tip("LED bulbs", 4, "Energy")],
+    }
+    merged = merge_tip_groups(groups, "energy")
+    assert [t["title"] for t in merged] == ["Fix drafts!", "LED bulbs", "Take the bus"]
+    assert category_order({"energy": 10, "travel": 50, "food": 0, "goods": 20}) == ["travel", "goods", "energy"]
+
+
+def test_stream_sends_highest_category_first_then_merged(monkeypatch):
+    def fake_category_tips(totals, profile, category):
+        # the highest-impact category is the slowest one here
+        time.sleep(0.2 if category == "food" else 0.0)
+        return [_tip(f"{category} tip", int(totals[category] / 10), category.title())]
+
+    monkeypatch.setattr(routes_reco.settings, "RECO_PARALLEL_TIPS", True)
+    monkeypatch.setattr(routes_reco, "instant_tips", lambda payload: (None, None))
+    monkeypatch.setattr(routes_reco, "category_tips", fake_category_tips)
+    monkeypatch.setattr(routes_reco, "store_tips", lambda payload, tips: None)
+
+    app = FastAPI()
+    app.include_router(routes_reco.router)
+    r = TestClient(app).post("/reco/generate/stream", json={"energy": 50, "travel": 30, "food": 120, "goods": 10})
+    assert r.status_code == 200
+
+    events, event = [], None
+    for line in r.text.splitlines():
+        if line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[6:])))
+
+    tip_events = [d["category"] for e, d in events if e == "tips"]
+    assert tip_events[0] == "food" and sorted(tip_events) == ["energy", "food", "goods", "travel"]
+    kind, done = events[-1]
+    assert kind == "done" and done["source"] == "llm"
+    assert done["tips"][0]["title"] == "food tip" and len(done["tips"]) == 4
+
+
+def test_stream_without_parallel_tips_answers_like_generate(monkeypatch):
+    monkeypatch.setattr(routes_reco.settings, "RECO_PARALLEL_TIPS", False)
+    monkeypatch.setattr(routes_reco, "stored_tips", lambda payload: (None, None))
+    monkeypatch.setattr(routes_reco, "aprefetched_tips", _no_prefetch)
+    monkeypatch.setattr(routes_reco.settings, "RECO_RULES_FAST_PATH", True)
+    monkeypatch.setattr(routes_reco.settings, "RECO_LLM_ENRICHMENT", False)
+    monkeypatch.setattr(routes_reco, "category_tips", lambda *a: 1 / 0)  # never called
+
+    app = FastAPI()
+    app.include_router(routes_reco.router)
+    r = TestClient(app).post("/reco/generate/stream", json={"energy": 50, "travel": 30, "food": 120, "goods": 10})
+    assert r.status_code == 200
+    assert "event: tips" not in r.text
+    assert '"source": "rules"' in r.text
+
+
+async def _no_prefetch(*args):
+    return None
+
+
+def test_stream_still_ends_with_done_when_a_category_fails(monkeypatch):
+    from backend.services.llm_gateway import GatewayUnavailable
+
+    def fake_category_tips(totals, profile, category):
+        if category == "travel":
+            raise GatewayUnavailable("queue full")
+        return [_tip(f"{category} tip", int(totals[category] / 10), category.title())]
+
+    monkeypatch.setattr(routes_reco.settings, "RECO_PARALLEL_TIPS", True)
+    monkeypatch.setattr(routes_reco, "instant_tips", lambda payload: (None, None))
+    monkeypatch.setattr(routes_reco, "aprefetched_tips", _no_prefetch)
+    monkeypatch.setattr(routes_reco, "category_tips", fake_category_tips)
+    monkeypatch.setattr(routes_reco, "store_tips", lambda payload, tips: None)
+
+    app = FastAPI()
+    app.include_router(routes_reco.router)
+    r = TestClient(app).post("/reco/generate/stream", json={"energy": 50, "travel": 30, "food": 120, "goods": 10})
+    assert r.status_code == 200
+    done = json.loads(r.text.rsplit("data: ", 1)[1])
+    assert "event: done" in r.text and done["source"] == "llm"
+    assert sorted(t["title"] for t in done["tips"]) == ["energy tip", "food tip", "goods tip"]
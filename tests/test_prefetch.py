@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import wait
+
+from backend.core.config import settings
+from backend.services import llm_gateway, recommender
+from backend.services.llm_gateway import LLMGateway
+from backend.services.prefetch import TipPrefetcher
+
+
+def _started(pf):
+    # a job still in the queue would be taken over rather than waited on
+    wait([fut for fut, _ in list(pf._entries.values()) if fut is not None], timeout=5)
+
+
+TIPS = [{"title": "Switch to LEDs", "text": "t", "impact_kg_month": 9, "confidence": 0.9, "category": "Energy"}]
+
+
+def test_compute_prefetch_is_served_once_and_respects_the_budget(monkeypatch):
+    pf = TipPrefetcher(per_min=0, burst=1, max_pending=8, ttl_s=60)
+    monkeypatch.setattr("backend.services.prefetch.prefetcher", pf)
+    monkeypatch.setattr(settings, "RECO_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "RECO_CORPUS_ENABLED", False)
+    monkeypatch.setattr(recommender, "precomputed_tips", lambda payload: None)
+    monkeypatch.setattr(recommender.llm, "available", lambda: True)
+    calls = []
+    monkeypatch.setattr(recommender, "_generate_llm_tips", lambda *a: calls.append(a) or TIPS)
+
+    first = {"energy": 123.4, "travel": 40, "food": 150, "goods": 20, "total": 333.4, "profile": "Urban"}
+    assert recommender.prefetch_tips(first)
+    assert not recommender.prefetch_tips(first)  # same run content: one job
+    _started(pf)
+    assert recommender.prefetched_tips(first, wait_s=5) == TIPS
+    assert recommender.prefetched_tips(first, wait_s=0) is None  # collected once
+
+    # the burst of one generation is spent: the next prefetch makes no LLM call
+    second = dict(first, energy=321.0)
+    assert recommender.prefetch_tips(second)
+    _started(pf)
+    assert recommender.prefetched_tips(second, wait_s=5) is None
+    assert len(calls) == 1
+    assert pf.stats()["over_budget"] == 1 and pf.stats()["hits"] == 1
+
+
+def test_a_still_queued_prefetch_is_taken_over(monkeypatch):
+    gw = LLMGateway(1, 5)
+    monkeypatch.setattr(llm_gateway, "gateway", gw)
+    pf = TipPrefetcher(per_min=60, burst=5, max_pending=8, ttl_s=60)
+    release = threading.Event()
+    gw.submit(release.wait)  # occupies the only worker
+    ran = []
+    assert pf.schedule("k", lambda: ran.append(1) or TIPS)
+
+    assert pf.get("k", wait_s=1) is None
+    release.set()
+    gw.shutdown()
+    assert pf.stats()["taken_over"] == 1 and pf.stats()["pending"] == 0
+    assert not ran
@@ -0,0 +1,95 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import routes_profile
+from backend.services import profile_clf
+from backend.services.profile_clf import LABELS, ProfileClassifier, fit, label_footprints
+
+
+def _footprints(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.lognormal(np.log([110, 70, 150, 45]), [0.7, 1.0, 0.45, 0.9], (n, 4))
+
+
+def test_fit_save_and_memory_mapped_load(tmp_path):
+    x = _footprints()
+    clf = fit(x)
+    assert clf.info["train_accuracy"] > 0.85
+    clf.save(tmp_path / "clf.npy", tmp_path / "map.json")
+
+    loaded = ProfileClassifier.load(tmp_path / "clf.npy", tmp_path / "map.json")
+    assert isinstance(loaded.weights, np.memmap)
+    idx, confidence = loaded.predict_batch(x)
+    assert np.array_equal(idx, clf.predict_batch(x)[0])
+    assert ((confidence > 0) & (confidence <= 1)).all()
+    assert loaded.classify({"energy": 40, "travel": 500, "food": 120, "goods": 20})["profile"] == "frequent traveller"
+
+
+def test_rule_labels():
+    rows = [[30, 20, 60, 10], [60, 400, 150, 20], [400, 50, 150, 20], [100, 60, 150, 300]]
+    assert [LABELS[i] for i in label_footprints(rows)] == [
+        "low-impact household", "frequent traveller", "energy-heavy home", "high consumer",
+    ]
+
+
+def test_classify_endpoint_accepts_totals_or_raw_inputs(monkeypatch):
+    monkeypatch.setattr(profile_clf, "_clf", fit(_footprints()))
+    monkeypatch.setattr(profile_clf, "_clf_loaded", True)
+    app = FastAPI()
+    app.include_router(routes_profile.router)
+    client = TestClient(app)
+
+    r = client.post("/profile/classify", json={"columns": {"energy": [40, 400], "travel": [500, 50], "food": [120, 150], "goods": [20, 20]}})
+    cols = r.json()["columns"]
+    assert cols["profile"] == ["frequent traveller", "energy-heavy home"]
+    assert len(cols["delta_pct_vs_peers"]) == 2
+
+    r = client.post("/profile/classify", json=[{"electricityKwh": 150, "carKm": 100, "diet": "veg"}])
+    assert r.json()["rows"] == 1 and r.json()["columns"]["profile"][0] in LABELS
+
+
+def test_shipped_model_covers_every_label():
+    from scripts.train_profile_clf import synthetic_runs
+
+    clf = ProfileClassifier.load("ai/models/profile_clf.npy", "ai/models/feature_map.json")
+    assert all(acc > 0.6 for acc in clf.info["class_accuracy"].values())
+    x = synthetic_runs(7000, seed=7)
+    idx, _ = clf.predict_batch(x)
+    y = label_footprints(x)
+    for i, label in enumerate(LABELS):
+        assert (idx[y == i] == i).mean() > 0.6, label
+    assert clf.classify({"energy": 0, "travel": 0, "food": 0, "goods": 0})["profile"] == "low-impact household"
+    assert clf.classify({"energy": 20, "travel": 10, "food": 40, "goods": 5})["profile"] == "low-impact household"
+
+
+def test_classify_endpoint_rejects_bad_columns(monkeypatch):
+    monkeypatch.setattr(profile_clf, "_clf", fit(_footprints()))
+    monkeypatch.setattr(profile_clf, "_clf_loaded", True)
+    app = FastAPI()
+    app.include_router(routes_profile.router)
+    client = TestClient(app)
+
+    r = client.post("/profile/classify", json={"columns": {"energy": ["a lot"], "travel": [1]}})
+    assert r.status_code == 422
+    r = client.post("/profile/classify", json={"columns": {"energy": [1, 2], "travel": [1]}})
+    assert r.status_code == 422
+
+
+def test_labels_come_from_the_rules_unless_a_good_model_is_enabled(monkeypatch):
+    from backend.core.config import settings
+
+    x = _footprints(500, seed=3)
+    for enabled in (False, True):  # the shipped model is below PROFILE_CLF_MIN_AGREEMENT
+        monkeypatch.setattr(settings, "PROFILE_CLF_MODEL_ENABLED", enabled)
+        monkeypatch.setattr(profile_clf, "_clf", None)
+        monkeypatch.setattr(profile_clf, "_clf_loaded", False)
+        clf = profile_clf.get_classifier()
+        assert clf.weights is None and clf.info["source"] == "rules"
+        idx, confidence = clf.predict_batch(x)
+        assert np.array_equal(idx, label_footprints(x)) and (confidence == 1).all()
+        assert clf.peer_avg["low-impact household"] > 0
+
+    monkeypatch.setattr(settings, "PROFILE_CLF_MIN_AGREEMENT", 0.5)
+    monkeypatch.setattr(profile_clf, "_clf_loaded", False)
+    assert profile_clf.get_classifier().weights is not None
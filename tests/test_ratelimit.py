@@ -0,0 +1,49 @@
+from backend.services.ratelimit import MemoryBucketStore, RateLimiter, SQLiteBucketStore
+
+
+def test_token_bucket_refills_and_reports_retry_after():
+    store = MemoryBucketStore()
+    # 1 token/s, burst 2
+    assert store.take("k", 1.0, 2, now=0.0)[0]
+    assert store.take("k", 1.0, 2, now=0.0)[0]
+    allowed, retry_after = store.take("k", 1.0, 2, now=0.0)
+    assert not allowed and retry_after == 1.0
+    assert store.take("k", 1.0, 2, now=1.0)[0]
+
+
+def test_budgets_are_separate_and_sqlite_store_is_shared(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    a = RateLimiter({"tips": (0.001, 1), "chat": (0.001, 1)}, SQLiteBucketStore(path))
+    b = RateLimiter({"tips": (0.001, 1), "chat": (0.001, 1)}, SQLiteBucketStore(path))
+    assert a.check("tips", "client-1")[0]
+    assert a.check("chat", "client-1")[0]
+    # second worker sees the bucket the first one drained
+    allowed, retry_after = b.check("tips", "client-1")
+    assert not allowed and retry_after > 0
+    assert b.check("tips", "client-2")[0]
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryBucketStore(max_keys=2)
+    store.take("a", 0.001, 1, now=0.0)
+    store.take("b", 0.001, 1, now=0.0)
+    assert not store.take("a", 0.001, 1, now=0.0)[0]  # "a" is now the most recent
+    store.take("c", 0.001, 1, now=0.0)  # evicts "b"
+    assert len(store) == 2
+    assert not store.take("a", 0.001, 1, now=0.0)[0]
+
+
+def test_identity_headers_need_a_trusted_proxy(monkeypatch):
+    from types import SimpleNamespace
+
+    from backend.core.config import settings
+    from backend.core.security import get_client_id
+
+    def request(peer, **headers):
+        return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers)
+
+    assert get_client_id(request("203.0.113.9", **{"x-client-id": "spoofed"})) == "203.0.113.9"
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1, 10.0.0.2")
+    assert get_client_id(request("127.0.0.1", **{"x-client-id": "session-1"})) == "session-1"
+    xff = {"x-forwarded-for": "1.1.1.1, 198.51.100.7, 10.0.0.2"}
+    assert get_client_id(request("127.0.0.1", **xff)) == "198.51.100.7"
@@ -0,0 +1,44 @@
+import time
+
+from backend.services.reco_cache import RecoCache, cache_key
+
+
+def test_nearby_footprints_share_a_bucket():
+    a = cache_key({"energy": 101, "travel": 52, "food": 160, "goods": 0}, "Urban Commuter", "v1")
+    b = cache_key({"energy": 108.4, "travel": 59.9, "food": 165, "goods": 3}, "urban commuter ", "v1")
+    assert a == b
+    assert a != cache_key({"energy": 111, "travel": 52, "food": 160, "goods": 0}, "Urban Commuter", "v1")
+    assert a != cache_key({"energy": 101, "travel": 52, "food": 160, "goods": 0}, "Urban Commuter", "v2")
+
+
+def test_hit_rate_and_lru_eviction(tmp_path):
+    cache = RecoCache(str(tmp_path / "c.db"), ttl_s=60, max_stale_s=120, max_entries=2)
+    assert cache.get("a") is None
+    cache.put("a", [{"title": "A"}])
+    cache.put("b", [{"title": "B"}])
+    assert cache.get("a") == [{"title": "A"}]  # "a" is now most recently used
+    time.sleep(0.01)
+    cache.put("c", [{"title": "C"}])  # over capacity: evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == [{"title": "C"}]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["hit_rate"] == 0.5
+
+
+def test_stale_entry_is_served_and_refreshed(tmp_path):
+    cache = RecoCache(str(tmp_path / "c.db"), ttl_s=0, max_stale_s=60, max_entries=10)
+    cache.put("k", [{"title": "old"}])
+    assert cache.get("k", refresh=lambda: [{"title": "new"}]) == [{"title": "old"}]
+    deadline = time.time() + 2
+    while cache.stats()["refreshes"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get("k") == [{"title": "new"}]
+
+
+def test_puts_below_capacity_do_not_count_rows(tmp_path):
+    cache = RecoCache(str(tmp_path / "c.db"), ttl_s=60, max_stale_s=120, max_entries=100)
+    statements = []
+    cache._conn().set_trace_callback(statements.append)
+    for i in range(20):
+        cache.put(f"k{i}", [{"title": str(i)}])
+    assert sum("COUNT(*)" in s for s in statements) == 1  # the first put only
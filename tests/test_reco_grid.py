@@ -0,0 +1,43 @@
+from backend.services.reco_grid import GridSpec, RecoGrid, save_grid, validate_tips
+
+TIP = {"title": "Carpool", "text": "Share rides.", "impact_kg_month": 10, "confidence": 0.8, "category": "Travel"}
+
+
+def test_cell_index_roundtrip():
+    spec = GridSpec(profiles=["Urban Commuter", "Student Hostel"])
+    for idx in (0, 17, spec.n_cells - 1):
+        totals, profile = spec.cell_totals(idx)
+        assert spec.cell_index(totals, profile) == idx
+    assert spec.cell_index({"energy": 10_000}, "Urban Commuter") is None
+    assert spec.cell_index({"energy": 10}, "Unknown") is None
+
+
+def test_grid_file_lookup_and_missing_cells(tmp_path):
+    spec = GridSpec(profiles=["urban commuter"], prompt_version="tips-v1")
+    filled = spec.cell_index({"energy": 110, "travel": 60, "food": 150, "goods": 10}, "urban commuter")
+    save_grid(tmp_path / "g.npz", spec, {filled: [TIP, dict(TIP, title="Bus")]})
+
+    grid = RecoGrid.load(tmp_path / "g.npz")
+    assert grid.filled == 1
+    tips = grid.lookup({"energy": 101, "travel": 74, "food": 159, "goods": 0}, "Urban Commuter")
+    assert [t["title"] for t in tips] == ["Carpool", "Bus"]
+    assert grid.lookup({"energy": 300, "travel": 60, "food": 150, "goods": 10}, "urban commuter") is None
+
+
+def test_validation_drops_malformed_tips():
+    bad = [dict(TIP, confidence=7), dict(TIP, category="Astrology"), {"title": "x"}]
+    assert validate_tips([TIP] + bad, min_valid=1) == [TIP]
+    assert validate_tips([TIP] + bad) is None
+
+
+def test_grid_is_only_served_for_its_prompt_version(tmp_path, monkeypatch):
+    from backend.services import reco_grid
+
+    totals = {"energy": 110, "travel": 60, "food": 150, "goods": 10}
+    for version in ("", "tips-v1"):
+        spec = GridSpec(profiles=["urban commuter"], prompt_version=version)
+        save_grid(tmp_path / "g.npz", spec, {spec.cell_index(totals, "urban commuter"): [TIP]})
+        monkeypatch.setattr(reco_grid, "_grid", RecoGrid.load(tmp_path / "g.npz"))
+        monkeypatch.setattr(reco_grid, "_grid_loaded", True)
+        assert reco_grid.grid_tips(totals, "urban commuter", "tips-v2") is None
+    assert reco_grid.grid_tips(totals, "urban commuter", "tips-v1") == [TIP]
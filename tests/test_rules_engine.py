@@ -0,0 +1,19 @@
+from backend.services.rules_engine import get_engine
+
+
+def test_all_yaml_rules_compile():
+    engine = get_engine()
+    assert len(engine) == 7
+    assert set(engine.by_area) >= {"energy", "travel", "food"}
+
+
+def test_impact_scales_with_user_activity_and_ranks_heaviest_area():
+    engine = get_engine()
+    light = engine.rank({"energy": 40, "travel": 10, "food": 100, "goods": 0})
+    heavy = engine.rank({"energy": 40, "travel": 200, "food": 100, "goods": 0})
+    assert heavy[0]["category"] == "Travel"
+    light_travel = max(t["impact_kg_month"] for t in light if t["category"] == "Travel")
+    heavy_travel = max(t["impact_kg_month"] for t in heavy if t["category"] == "Travel")
+    assert heavy_travel > light_travel
+    # never claims more than half of what the user emits in that area
+    assert all(t["impact_kg_month"] <= 0.5 * 10 + 1 for t in light if t["category"] == "Travel")
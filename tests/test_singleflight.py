@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+from backend.services.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    sf = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return ["tip"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sf.do("k", slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [["tip"]] * 5
+    assert sf.stats()["saved"] == 4
+
+
+def test_async_waiters_share_leader_result():
+    sf = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        return await asyncio.gather(*(sf.ado("k", slow) for _ in range(4)))
+
+    assert asyncio.run(main()) == [{"ok": True}] * 4
+    assert len(calls) == 1 and sf.stats()["saved"] == 3
+
+
+def test_cancelled_leader_does_not_cancel_the_waiters():
+    sf = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return ["tip"]
+
+    async def main():
+        leader = asyncio.ensure_future(sf.ado("k", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(sf.ado("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # e.g. the leader's client disconnected
+        return await waiter, leader.cancelled()
+
+    assert asyncio.run(main()) == (["tip"], True)
+    assert sf.stats()["in_flight"] == 0
+
+
+def test_shared_call_runs_without_the_callers_deadline():
+    from backend.core import deadline
+
+    sf = SingleFlight()
+    seen = []
+
+    def slow():
+        seen.append(deadline.current())
+        time.sleep(0.15)
+        return ["tip"]
+
+    results = []
+
+    def waiter():
+        with deadline.scope(0.05):
+            try:
+                results.append(sf.do("k", slow))
+            except deadline.DeadlineExceeded:
+                results.append("gave up")
+
+    with deadline.scope(0.05):
+        leader = threading.Thread(target=lambda: results.append(sf.do("k", slow)))
+        leader.start()
+    time.sleep(0.01)
+    t = threading.Thread(target=waiter)
+    t.start()
+    t.join()
+    leader.join()
+    assert seen == [None]
+    assert results == ["gave up", ["tip"]]
+
+    async def main():
+        async def aslow():
+            seen.append(deadline.current())
+            await asyncio.sleep(0.1)
+            return ["tip"]
+
+        async def impatient():
+            with deadline.scope(0.02):
+                try:
+                    return await sf.ado("a", aslow)
+                except deadline.DeadlineExceeded:
+                    return "gave up"
+
+        return await asyncio.gather(impatient(), sf.ado("a", aslow))
+
+    assert asyncio.run(main()) == ["gave up", ["tip"]]
+    assert seen == [None, None]
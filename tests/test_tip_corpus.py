@@ -0,0 +1,45 @@
+from backend.services.tip_corpus import TipCorpus, key_terms
+
+
+def _tip(title, text, impact, category, confidence=0.8):
+    return {"title": title, "text": text, "impact_kg_month": impact, "confidence": confidence,
+            "steps": ["a", "b"], "category": category}
+
+
+TIPS = [
+    _tip("Switch to LED bulbs", "Replace the ten most used bulbs with LEDs to cut lighting power. (Analyzer: 200 kg energy)", 20, "Energy"),
+    _tip("Run the AC at 26°C", "Every degree warmer on the thermostat saves cooling energy in summer months.", 30, "Energy"),
+    _tip("Take the metro twice a week", "Swap two car commutes for the metro and save fuel on the busiest days.", 25, "Travel"),
+    _tip("Cook more lentil dishes", "Plant protein such as lentils and beans has a far lower footprint than meat.", 15, "Food"),
+    _tip("Repair before replacing", "Fix clothes and gadgets before buying new ones to avoid embodied emissions.", 8, "Goods"),
+]
+TOTALS = {"energy": 200, "travel": 100, "food": 150, "goods": 40}
+
+
+def test_near_duplicates_are_counted_not_stored(tmp_path):
+    corpus = TipCorpus(str(tmp_path / "corpus.db"))
+    assert corpus.add_tips(TIPS, TOTALS) == 5
+    rephrased = dict(TIPS[0], text="Replace the ten most used bulbs with LEDs to cut lighting power at home.")
+    assert corpus.add_tips([rephrased, {"title": "broken"}], TOTALS) == 0
+    stats = corpus.stats()
+    assert stats["size"] == 5 and stats["duplicates"] == 1 and stats["rejected"] == 1
+    # citations of the original footprint are not kept
+    assert all("Analyzer" not in t["text"] for t in corpus.tips.values())
+
+    # a fresh worker reloads the same index from SQLite
+    reloaded = TipCorpus(corpus.path)
+    reloaded.load()
+    assert reloaded.stats()["size"] == 5
+    assert reloaded.search(key_terms("metro commute"), "travel")
+
+
+def test_retrieval_rescales_impact_and_requires_coverage(tmp_path):
+    corpus = TipCorpus(str(tmp_path / "corpus.db"))
+    corpus.add_tips(TIPS, TOTALS)
+
+    tips = corpus.retrieve({"energy": 400, "travel": 100, "food": 150, "goods": 40})
+    assert tips and tips[0]["category"] == "Energy"
+    assert {t["title"]: t["impact_kg_month"] for t in tips}["Switch to LED bulbs"] == 40  # 2x the energy
+
+    # far from anything stored -> poor coverage, so the LLM is needed
+    assert corpus.retrieve({"energy": 5000, "travel": 3000, "food": 150, "goods": 40}) is None
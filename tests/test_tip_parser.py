@@ -0,0 +1,82 @@
+import json
+from types import SimpleNamespace
+
+from backend.services import recommender
+from backend.services.tip_parser import TipStreamParser, parse_tips
+
+
+def _tip(i):
+    return {"title": f"Tip {i}", "text": 'Use "eco" mode {not [this]} \\ please.', "impact_kg_month": i,
+            "confidence": 0.8, "steps": ["a", "b"], "category": "Energy"}
+
+
+def test_objects_are_emitted_as_soon_as_they_close():
+    text = "Sure! Here are [4] tips:\n```json\n" + json.dumps([_tip(1), _tip(2)]) + "\n```"
+    parser = TipStreamParser()
+    seen = []
+    for ch in text:  # worst case: one character per chunk
+        got = parser.feed(ch)
+        if got:
+            seen.append((got[0]["title"], parser.done))
+    assert seen == [("Tip 1", False), ("Tip 2", False)]
+    assert parser.done
+
+
+def test_truncated_output_keeps_complete_objects():
+    text = json.dumps([_tip(1), _tip(2), _tip(3)])
+    assert [t["title"] for t in parse_tips(text[: len(text) - 40])] == ["Tip 1", "Tip 2"]
+    assert parse_tips("no json here {") == []
+
+
+def test_unclosed_bracket_in_the_preamble_is_skipped():
+    text = "Tips [energy first:\n" + json.dumps([_tip(1), _tip(2)], indent=2)
+    assert [t["title"] for t in parse_tips(text)] == ["Tip 1", "Tip 2"]
+
+
+class FakeStream:
+    def __init__(self, text):
+        self.text = text
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for i in range(0, len(self.text), 7):
+            self.sent = i + 7
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.text[i:i + 7]))])
+
+    def close(self):
+        self.closed = True
+
+
+def test_generation_stops_once_enough_tips_arrived(monkeypatch):
+    stream = FakeStream(json.dumps([_tip(i) for i in range(8)]))
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: stream)))
+    monkeypatch.setattr(recommender, "_client", fake)
+
+    tips = recommender._call_llm_tips([{"role": "user", "content": "tips"}])
+    assert len(tips) == recommender.TIPS_STOP_AFTER
+    assert stream.closed
+    assert stream.sent < len(stream.text)
+
+
+def test_a_stream_cut_short_by_the_deadline_is_not_kept(monkeypatch):
+    stream = FakeStream(json.dumps([_tip(i) for i in range(8)]))
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: stream)))
+    monkeypatch.setattr(recommender, "_client", fake)
+    # the caller's deadline passes once two tips have streamed in
+    monkeypatch.setattr(recommender.deadline, "expired", lambda: stream.sent > 2 * len(json.dumps(_tip(0))) + 14)
+    added, stored = [], []
+    monkeypatch.setattr(recommender, "add_to_corpus", lambda tips, totals: added.append(tips))
+    monkeypatch.setattr(recommender.reco_cache, "put", lambda key, tips: stored.append(tips))
+
+    totals = recommender.totals_from_payload({"total": 100, "energy": 100})
+    assert recommender._llm_tips(totals, "you", "energy") is None
+    assert stream.closed and not added and stream.sent < len(stream.text)
+
+    # a complete stream is kept; a short list is served but never cached
+    monkeypatch.setattr(recommender.deadline, "expired", lambda: False)
+    assert recommender._collected(lambda: [_tip(1)] * 2, {}, min_tips=recommender.TIPS_STOP_AFTER)
+    recommender.store_tips({"total": 100, "energy": 100}, [_tip(1)] * 2)
+    assert not added and not stored
+    recommender.store_tips({"total": 100, "energy": 100}, [_tip(i) for i in range(5)])
+    assert len(stored) == 1